@@ -18,6 +18,8 @@ from sklearn.svm import SVC
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 from src import config
+sys.path.append(os.path.join(project_root, 'src'))
+from feature_store import open_feature_store
 
 
 DATA_PATH = config.PROCESSED_DATA_DIR
@@ -27,29 +29,24 @@ def train_svm_benchmark():
     print(" -> Loading Data Manually (Subject Isolation Strategy)")
 
     try:
-        X = np.load('data/processed/X_stew.npy')
-        Y = np.load('data/processed/Y_stew.npy')
+        store = open_feature_store(DATA_PATH)
     except FileNotFoundError:
         print("ERROR: .npy files not found. Run preprocessing.py first.")
         return
 
-    print(f" -> Original Shape (3D) {X.shape}")
+    print(f" -> Original Shape (3D) {(len(store),) + store.sample_shape}")
+
+    # Divisão dos dados (80/20) por sujeito, direto pelo índice do Feature Store
+    train_idx, test_idx = store.subject_split(test_fraction=0.2)
 
     # Pré-processamento para SVM (Flatten)
     # O SVM não entende 3D, ele precisa ser 2D
     # Transformar (3552, 14, 33, 17) em (3552, 7854)
-    num_samples = X.shape[0]
-    X_flat = X.reshape(num_samples, -1)
-
-    # Divisão dos dados (80/20)
-    # Fatiamento manual
-    split_index = int(0.8 * num_samples)
-
-    X_train = X_flat[:split_index]
-    Y_train = Y[:split_index]
+    X_train = store.get(train_idx).reshape(len(train_idx), -1)
+    Y_train = store.labels[train_idx]
 
-    X_test = X_flat[split_index:]
-    Y_test = Y[split_index:]
+    X_test = store.get(test_idx).reshape(len(test_idx), -1)
+    Y_test = store.labels[test_idx]
 
     print(f" -> Split: {len(X_train)} Train samples | {len(X_test)} Test samples")
 
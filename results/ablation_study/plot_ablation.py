@@ -1,20 +1,44 @@
+import os
+import sys
+import json
 import matplotlib.pyplot as plt
 import numpy as np
 
-# Dados obtidos nos experimentos (Médias e Desvios Padrão)
-# Cenário A: Isolamento de Sujeito (O "Correto")
-mean_iso = 92.44
-std_iso = 0.97
+# Resultados da validação cruzada (run_batch.py / src/cross_validation.py)
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+results_path = os.path.join(curren_dir, 'cv_results.json')
 
-# Cenário B: Random Split (O "Misturado")
-mean_rnd = 89.06
-std_rnd = 0.40
+# Um cenário por split: (rótulo do eixo, cor)
+SCENARIOS = {
+    # Cenário A: Isolamento de Sujeito (O "Correto")
+    "subject": ('Isolamento de Sujeito\n(Metodologia Correta)', '#2ecc71'), # Verde (Bom)
+    # Cenário B: Random Split (O "Misturado")
+    "random": ('Random Split\n(Sem Isolamento)', '#e74c3c'), # Vermelho (Ruim/Controle)
+}
+
+if os.path.exists(results_path):
+    with open(results_path, 'r') as f:
+        summary = json.load(f)["summary"]
+    # O cross_validation.py pode ter rodado só um dos splits (--splits): plota os que existirem
+    splits = [split for split in SCENARIOS if split in summary]
+    if not splits:
+        sys.exit(f"{results_path} has no 'subject' or 'random' results (found: {sorted(summary) or 'none'}). "
+                 f"Run run_batch.py to regenerate.")
+    missing = [split for split in SCENARIOS if split not in summary]
+    if missing:
+        print(f"No results for {', '.join(missing)} in {results_path}: plotting only {', '.join(splits)}")
+    results = {split: (summary[split]["acc_mean"] * 100, summary[split]["acc_std"] * 100) for split in splits}
+    print(f"Results loaded from {results_path}")
+else:
+    # Sem o JSON: valores publicados no TCC (Médias e Desvios Padrão)
+    print(f"{results_path} not found. Run run_batch.py to regenerate. Using the published values.")
+    results = {"subject": (92.44, 0.97), "random": (89.06, 0.40)}
 
 # Configuração do Gráfico
-labels = ['Isolamento de Sujeito\n(Metodologia Correta)', 'Random Split\n(Sem Isolamento)']
-means = [mean_iso, mean_rnd]
-stds = [std_iso, std_rnd]
-colors = ['#2ecc71', '#e74c3c'] # Verde (Bom) e Vermelho (Ruim/Controle)
+labels = [SCENARIOS[split][0] for split in results]
+means = [mean for mean, _ in results.values()]
+stds = [std for _, std in results.values()]
+colors = [SCENARIOS[split][1] for split in results]
 
 x_pos = np.arange(len(labels))
 
@@ -28,7 +52,7 @@ ax.set_ylabel('Acurácia (%)', fontsize=12)
 ax.set_title('Ablation Study: Impacto da Metodologia de Validação', fontsize=14, fontweight='bold')
 ax.set_xticks(x_pos)
 ax.set_xticklabels(labels, fontsize=11)
-ax.set_ylim(80, 100) # Focando a escala entre 80% e 100% para ver a diferença
+ax.set_ylim(min(80, min(means) - max(stds) - 5), 100) # Focando a escala entre 80% e 100% para ver a diferença
 ax.yaxis.grid(True, linestyle='--', alpha=0.7)
 
 # Adicionar os valores em cima das barras
@@ -45,6 +69,6 @@ add_labels(bars)
 
 # Salvar e Mostrar
 plt.tight_layout()
-plt.savefig('results/ablation_study/ablation_chart_validation.png', dpi=300)
+plt.savefig(os.path.join(curren_dir, 'ablation_chart_validation.png'), dpi=300)
 print("Gráfico salvo em: results/ablation_study/ablation_chart_validation.png")
 plt.show() # Descomente se quiser ver na tela
\ No newline at end of file
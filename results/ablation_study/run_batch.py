@@ -1,57 +1,42 @@
-import subprocess
-import re
-import numpy as np
-
-def run_training_loop(n_runs=5):
-    losses = []
-    accuracies = []
-    print(f"Initiating {n_runs} Trainings Sessions.")
-
-    for i in range(n_runs):
-        print(f"\nRunning {i+1}/{n_runs} Training Session.")
-
-        # Chama o script de treino e captura o que ele imprime na tela
-        result = subprocess.run(
-            ['python', 'src/train_fewshot.py'],
-            capture_output=True,
-            text=True
-        )
-
-        # Procura pelo valor de Loss no console
-        output = result.stdout
-        match = re.search(r"Test\s+->\s+Error\s+\(Loss\):\s+(\d+\.\d+)\s+\|\s+Acc(?:uracy)?:\s+(\d+\.\d+)%", output)
-
-        if match:
-            loss = float(match.group(1))
-            acc = float(match.group(2))
-            losses.append(loss)
-            accuracies.append(acc)
-            print(f"Registered Loss: {loss} | Acc: {acc}")
-        else:
-            print("Error to read Loss. Check the training output.")
-            print(output)
-        
-        if not losses:
-            print("\nNo results captured. Something went wrong.")
-            return None, None
-
-        losses_mean = np.mean(losses)
-        std = np.std(losses)
-
-        acc_mean = np.mean(accuracies)
-        acc_std = np.std(accuracies)
+import sys
+import os
+import argparse
+
+# Diretório atual do arquivo run_batch.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+from cross_validation import run_cross_validation, SPLITS
+
+def run_training_loop(n_runs=5, num_epochs=50, n_workers=None, threads_per_worker=1, splits=SPLITS):
+    # Cada "sessão" agora é um fold da validação cruzada, treinado em paralelo dentro do Python
+    # (sem subprocess e sem ler o Loss do print). Os resultados vão para cv_results.json
+    print(f"Initiating {n_runs} Trainings Sessions per split.")
+    results = run_cross_validation(splits=splits, n_folds=n_runs, num_epochs=num_epochs,
+                                   n_workers=n_workers, threads_per_worker=threads_per_worker,
+                                   output_path=os.path.join(curren_dir, 'cv_results.json'))
 
     print("\n" + "="*50)
     print(f"Final Results ({n_runs} Sessions)")
     print("="*50)
-    print(f"LOSS     -> Mean: {losses_mean:.4f}  | Std Dev: {std:.4f}")
-    print(f"ACCURACY -> Mean: {acc_mean:.2f}% | Std Dev: {acc_std:.2f}")
-    print("-" * 50)
-    print(f"Raw Losses: {losses}")
-    print(f"Raw Accs:   {accuracies}")
+    for split, stats in results["summary"].items():
+        print(f"[{split}]")
+        print(f"LOSS     -> Mean: {stats['loss_mean']:.4f}  | Std Dev: {stats['loss_std']:.4f}")
+        print(f"ACCURACY -> Mean: {stats['acc_mean']*100:.2f}% | Std Dev: {stats['acc_std']*100:.2f}")
+        print("-" * 50)
     print("="*50)
 
-    return losses, losses_mean, std
+    return results
 
 if __name__ == "__main__":
-    run_training_loop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ablation study: subject-isolated vs random split")
+    parser.add_argument("--runs", type=int, default=5, help="Folds per split")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    run_training_loop(args.runs, args.epochs, args.workers, args.threads)
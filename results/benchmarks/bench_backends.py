@@ -0,0 +1,80 @@
+import sys
+import os
+import time
+import argparse
+
+# Diretório atual do arquivo bench_backends.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import numpy as np
+import torch
+import config
+from backends import BACKENDS, EagerBackend, TorchScriptBackend, OnnxBackend, Int8Backend, export_paths
+from execution import ExecutionMode
+from export_model import load_scorer, export_model
+from quantization import export_int8
+
+def run_benchmark(backends=BACKENDS, patient_windows=37, throughput_batch=512, repeats=200):
+    model_path = config.MODELS_DIR / "eeg_model.pth"
+    paths = export_paths(model_path)
+    missing = [b for b in backends if b not in ("eager", "int8") and not paths[b].exists()]
+    if missing:
+        export_model(model_path, missing)
+    if "int8" in backends and not paths["int8"].exists():
+        export_int8(model_path)
+
+    scorer, metadata, store = load_scorer(model_path)
+    rng = np.random.default_rng(0)
+    # Um paciente (~2.5 min de EEG = 37 janelas de 4s) e um lote grande para a vazão
+    patient = torch.from_numpy(store.get(np.sort(rng.choice(len(store), patient_windows, replace=False))))
+    big = torch.from_numpy(store.get(rng.choice(len(store), throughput_batch, replace=True)))
+    reference = EagerBackend(scorer.model, scorer.prototypes, ExecutionMode.parse("fp32"))
+
+    print(f"Inference Backends Benchmark: patient of {patient_windows} windows, batch of {throughput_batch}, "
+          f"{torch.get_num_threads()} threads")
+    print(f"{'backend':<13}{'load ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'windows/s':>11}{'max diff':>11}")
+    for name in backends:
+        start = time.perf_counter()
+        if name == "eager":
+            backend = reference
+        elif name == "torchscript":
+            backend = TorchScriptBackend(paths[name], metadata)
+        elif name == "int8":
+            backend = Int8Backend(paths[name], metadata)
+        else:
+            backend = OnnxBackend(paths[name], metadata, threads=torch.get_num_threads())
+        load_ms = (time.perf_counter() - start) * 1000
+
+        # Aquecimento (TorchScript otimiza o grafo nas primeiras chamadas)
+        for _ in range(3):
+            backend(patient)
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            backend(patient)
+            latencies.append(time.perf_counter() - start)
+
+        backend(big)
+        start = time.perf_counter()
+        for _ in range(5):
+            backend(big)
+        rate = 5 * throughput_batch / (time.perf_counter() - start)
+
+        embeddings, distances = backend(patient)
+        ref_embeddings, ref_distances = reference(patient)
+        diff = max((embeddings - ref_embeddings).abs().max().item(), (distances - ref_distances).abs().max().item())
+
+        p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+        print(f"{name:<13}{load_ms:>9.1f}{p50:>9.2f}{p95:>9.2f}{rate:>11.0f}{diff:>11.1e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency/throughput of the eager, TorchScript, ONNX and int8 backends")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--windows", type=int, default=37)
+    args = parser.parse_args()
+
+    run_benchmark(args.backends, patient_windows=args.windows)
@@ -0,0 +1,95 @@
+import sys
+import os
+import glob
+import time
+import asyncio
+import argparse
+
+# Diretório atual do arquivo bench_backpressure.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto (o app importa src.*)
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(project_root)
+sys.path.append(os.path.join(project_root, 'src'))
+
+import numpy as np
+import httpx
+import config
+from web.backend import app as server
+
+async def run(n_requests, workers, queue_depth, page_interval, batching=True):
+    # O app roda no mesmo event loop (ASGI direto, sem rede): o que travar o loop aparece na latência das páginas
+    recordings = sorted(glob.glob(os.path.join(config.RAW_DATA_DIR, "STEW_Dataset", "*.txt")))
+    if not recordings:
+        raise FileNotFoundError(f"No .txt recordings in {config.RAW_DATA_DIR / 'STEW_Dataset'}")
+    contents = [(os.path.basename(p), open(p, 'rb').read()) for p in recordings]
+
+    async with server.lifespan(server.app):
+        # Resultado de cada gravação analisada sozinha (sem concorrência), para conferir as respostas sob carga:
+        # as requisições simultâneas dividem o mesmo BurnoutSystem (Grad-CAM, micro-batcher)
+        reference = {os.path.basename(p): server.burnout_system.predict_patient(p) for p in recordings}
+        # Mesma classe que o app importou (src.admission), com os limites pedidos
+        server.executor.shutdown()
+        server.executor = server.BoundedExecutor(workers, queue_depth)
+        if not batching and server.batcher is not None:
+            await server.batcher.stop()
+            server.batcher = None
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            results = []
+
+            async def upload(i):
+                name, data = contents[i % len(contents)]
+                start = time.perf_counter()
+                response = await client.post("/predict", files={"file": (name, data, "text/plain")})
+                elapsed = time.perf_counter() - start
+                wrong = response.status_code == 200 and response.json()["details"] != reference[name]
+                results.append((response.status_code, elapsed, response.headers.get("retry-after"), wrong))
+
+            # Páginas estáticas pedidas durante toda a carga
+            page_latencies = []
+            done = asyncio.Event()
+
+            async def pages():
+                while not done.is_set():
+                    start = time.perf_counter()
+                    await client.get("/")
+                    page_latencies.append(time.perf_counter() - start)
+                    await asyncio.sleep(page_interval)
+
+            page_task = asyncio.create_task(pages())
+            start = time.perf_counter()
+            await asyncio.gather(*(upload(i) for i in range(n_requests)))
+            elapsed = time.perf_counter() - start
+            done.set()
+            await page_task
+
+    accepted = [r for r in results if r[0] == 200]
+    rejected = [r for r in results if r[0] == config.SERVER_OVERLOAD_STATUS]
+    print(f"Backpressure Benchmark: {n_requests} simultaneous uploads, {workers} workers + {queue_depth} queued, "
+          f"micro-batching {'on' if batching else 'off'}")
+    print(f"  {len(accepted)} x 200, {len(rejected)} x {config.SERVER_OVERLOAD_STATUS}, "
+          f"{len(results) - len(accepted) - len(rejected)} other, in {elapsed:.1f}s")
+    if accepted:
+        p50, p99 = np.percentile([r[1] for r in accepted], [50, 99])
+        print(f"  accepted latency: p50 {p50:.2f}s p99 {p99:.2f}s")
+        # Previsão, distâncias e as três imagens (Grad-CAM incluído) iguais às da análise sem concorrência
+        print(f"  accepted results different from the serial run: {sum(r[3] for r in accepted)}/{len(accepted)}")
+    if rejected:
+        print(f"  rejected latency: max {max(r[1] for r in rejected) * 1000:.1f} ms, "
+              f"Retry-After {sorted(set(r[2] for r in rejected))}")
+    if page_latencies:
+        p50, p99 = np.percentile(page_latencies, [50, 99]) * 1000
+        print(f"  static page during load: {len(page_latencies)} requests, p50 {p50:.1f} ms p99 {p99:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load shedding (503 + Retry-After) and event-loop responsiveness of /predict")
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=config.SERVER_WORKERS)
+    parser.add_argument("--queue-depth", type=int, default=config.SERVER_QUEUE_DEPTH)
+    parser.add_argument("--page-interval", type=float, default=0.1, help="Seconds between static page requests")
+    parser.add_argument("--no-batching", action="store_true", help="One forward per request (no micro-batcher)")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.requests, args.workers, args.queue_depth, args.page_interval, not args.no_batching))
@@ -0,0 +1,99 @@
+import sys
+import os
+import glob
+import time
+import argparse
+import tempfile
+
+# Diretório atual do arquivo bench_batch_inference.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import torch
+import config
+from inference import BurnoutSystem
+from preprocessing import preprocess_file
+
+def one_by_one(system, filepaths):
+    # O caminho do predict_patient sem os gráficos: um arquivo, um forward, uma decisão por vez
+    results = []
+    for filepath in filepaths:
+        input_tensor = preprocess_file(filepath, device=system.device)
+        with torch.no_grad():
+            _, distances = system.backend(input_tensor)
+        results.append(system.decide(distances[0], len(input_tensor)))
+    return results
+
+def crop_recordings(filepaths, seconds, output_dir):
+    # Cópias só com os primeiros segundos de cada gravação (pacientes com poucas janelas, que dividem um forward)
+    n_lines = int(seconds * config.SAMPLE_RATE)
+    cropped = []
+    for filepath in filepaths:
+        path = os.path.join(output_dir, os.path.basename(filepath))
+        with open(filepath) as src, open(path, 'w') as dst:
+            for _, line in zip(range(n_lines), src):
+                dst.write(line)
+        cropped.append(path)
+    return cropped
+
+def run_benchmark(backend=None, n_files=None, max_batch_size=None, workers=None, repeats=3, seconds=None, copies=1):
+    # Gravações do STEW (mesma pasta do preprocessing.py)
+    filepaths = sorted(glob.glob(os.path.join(config.RAW_DATA_DIR, "STEW_Dataset", "*.txt")))[:n_files]
+    if not filepaths:
+        raise FileNotFoundError(f"No .txt recordings in {config.RAW_DATA_DIR / 'STEW_Dataset'}")
+    filepaths = filepaths * copies
+    if seconds is not None:
+        with tempfile.TemporaryDirectory() as tmp:
+            return run_benchmark_files(crop_recordings(filepaths, seconds, tmp), backend, max_batch_size, workers,
+                                       repeats)
+    return run_benchmark_files(filepaths, backend, max_batch_size, workers, repeats)
+
+def run_benchmark_files(filepaths, backend=None, max_batch_size=None, workers=None, repeats=3):
+    system = BurnoutSystem(backend=backend)
+    if not system.load_resources(config.MODELS_DIR / "eeg_model.pth", config.PROCESSED_DATA_DIR):
+        raise RuntimeError("Could not load the inference system")
+
+    print(f"Batched Inference Benchmark: {len(filepaths)} recordings, backend {system.backend.name}, "
+          f"max batch {max_batch_size or config.INFERENCE_MAX_BATCH}, pack below {config.INFERENCE_PACK_WINDOWS} windows, "
+          f"{workers or config.INFERENCE_PREPROCESS_WORKERS} preprocessing threads, {torch.get_num_threads()} torch threads")
+
+    # Aquecimento (cache do filtro, primeira chamada do backend)
+    one_by_one(system, filepaths[:1])
+    timings = {"predict_patient loop": [], "predict_patients": []}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        single = one_by_one(system, filepaths)
+        timings["predict_patient loop"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        batched = system.predict_patients(filepaths, max_batch_size=max_batch_size, workers=workers)
+        timings["predict_patients"].append(time.perf_counter() - start)
+
+    # Mesmas previsões e distâncias nos dois caminhos
+    same = all(a["prediction"] == b["prediction"] for a, b in zip(single, batched))
+    diff = max(abs(a["distances"][k] - b["distances"][k]) for a, b in zip(single, batched) for k in a["distances"])
+    windows = sum(r["windows_analyzed"] for r in batched)
+
+    base = min(timings["predict_patient loop"])
+    print(f"{'path':<22}{'seconds':>9}{'patients/s':>12}{'windows/s':>11}{'x':>7}")
+    for name, values in timings.items():
+        best = min(values)
+        print(f"{name:<22}{best:>9.3f}{len(filepaths) / best:>12.1f}{windows / best:>11.0f}{base / best:>6.2f}x")
+    print(f"Same predictions: {same} | max distance diff {diff:.1e} | {windows / len(filepaths):.0f} windows per recording")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="predict_patients (batched) vs one predict_patient per recording")
+    parser.add_argument("--backend", default=None, help="eager, torchscript, onnx or int8 (default: config)")
+    parser.add_argument("--files", type=int, default=None, help="Number of recordings (default: all)")
+    parser.add_argument("--max-batch", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--copies", type=int, default=1, help="Times each recording is analyzed")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=None,
+                        help="Use only the first seconds of each recording (small patients share a forward)")
+    args = parser.parse_args()
+
+    run_benchmark(args.backend, args.files, args.max_batch, args.workers, args.repeats, args.seconds, args.copies)
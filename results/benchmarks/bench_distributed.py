@@ -0,0 +1,72 @@
+import sys
+import os
+import time
+import argparse
+import tempfile
+
+# Diretório atual do arquivo bench_distributed.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import torch
+import config
+from data_loader import EEGDataset
+from train_fewshot import train_model
+from distributed import launch, split_indices
+
+def run_benchmark(nproc=2, num_epochs=5, seed=0, threads=1):
+    # 1 processo pelo caminho distribuído = o train_model (mesma semente, mesmos episódios): paridade exata.
+    # Com nproc processos, cada um faz ~1/nproc dos episódios da época e cada passo usa a média dos gradientes de nproc episódios:
+    # a curva muda (outro tamanho de passo), então só o tempo e a acurácia final são comparados
+    train_indices, test_indices = split_indices(len(EEGDataset()), seed)
+    # Mesma validação do run_worker (sujeitos tirados do treino), passada explicitamente aos dois lados
+    train_indices, val_indices = EEGDataset().store.subject_split(config.VAL_FRACTION, indices=train_indices)
+    print(f"Data-Parallel Benchmark: {len(train_indices)} train / {len(val_indices)} val / {len(test_indices)} test windows, "
+          f"{num_epochs} epochs, {nproc} processes x {threads} threads")
+
+    torch.set_num_threads(threads * nproc)
+    torch.manual_seed(seed)
+    start = time.perf_counter()
+    _, single = train_model(EEGDataset(indices=train_indices), EEGDataset(indices=test_indices),
+                            num_epochs=num_epochs, eval_every=1, num_workers=0, verbose=False,
+                            val_dataset=EEGDataset(indices=val_indices))
+    t_single = time.perf_counter() - start
+
+    runs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for port, n in enumerate(sorted({1, nproc})):
+            start = time.perf_counter()
+            history = launch(n, master_port=29500 + port, num_epochs=num_epochs, eval_every=1, seed=seed,
+                             threads=threads * nproc // n, train_indices=train_indices, test_indices=test_indices,
+                             val_indices=val_indices,
+                             model_path=os.path.join(tmp, f"ddp_model_{n}.pth"))
+            runs[n] = (history, time.perf_counter() - start)
+
+    max_diff = 0.0
+    for a, b in zip(single, runs[1][0]):
+        diff = max(abs(a[k] - b[k]) for k in ("train_loss", "train_acc", "val_loss", "val_acc"))
+        max_diff = max(max_diff, diff)
+    # O teste (uma vez no fim) também tem que bater
+    max_diff = max(max_diff, *(abs(single[-1][k] - runs[1][0][-1][k]) for k in ("test_loss", "test_acc")))
+    print(f" -> train_model vs 1 distributed process: max difference {max_diff:.1e}")
+
+    parallel, t_parallel = runs[nproc]
+    for a, b in zip(single, parallel):
+        print(f" -> Epoch {a['epoch']}: loss {a['train_loss']:.4f} vs {b['train_loss']:.4f} | "
+              f"val acc {a['val_acc']*100:.2f}% vs {b['val_acc']*100:.2f}%")
+    print(f" -> Test acc: {single[-1]['test_acc']*100:.2f}% vs {parallel[-1]['test_acc']*100:.2f}%")
+    print(f" -> 1 process: {t_single:.1f}s | {nproc} processes: {t_parallel:.1f}s (includes process start-up)")
+    return max_diff < 1e-3
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single-process vs data-parallel few-shot training")
+    parser.add_argument("--nproc", type=int, default=2)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    ok = run_benchmark(args.nproc, args.epochs, threads=args.threads)
+    print("Single-process parity OK" if ok else "SINGLE-PROCESS PARITY FAILED")
@@ -0,0 +1,52 @@
+import sys
+import os
+import time
+
+# Diretório atual do arquivo bench_episodes.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import numpy as np
+import torch
+import config
+import utils
+from episodes import EpisodeSampler, split_episode, evaluate_episodes
+
+def loop_evaluation(embeddings, labels, n_episodes):
+    # Caminho ingênuo: um episódio por vez, sorteado pelo EpisodeSampler
+    sampler = EpisodeSampler(labels, n_episodes=n_episodes, seed=0)
+    accuracies = []
+    for episode in sampler:
+        prototypes, query, targets = split_episode(embeddings[episode], config.EPISODE_N_WAY, config.EPISODE_K_SHOT)
+        predictions = utils.calc_distance_matrix(query, prototypes).argmin(dim=1)
+        accuracies.append((predictions == targets).float().mean().item())
+    return float(np.mean(accuracies))
+
+def run_benchmark(n_windows=3552, n_episodes=10000, dim=64, seed=42):
+    # Embeddings sintéticos com as classes um pouco separadas (como um modelo treinado)
+    generator = torch.Generator().manual_seed(seed)
+    labels = torch.randint(0, 2, (n_windows,), generator=generator)
+    embeddings = torch.randn(n_windows, dim, generator=generator) + labels[:, None] * 0.3
+    labels = labels.numpy()
+
+    print(f"Episodic Evaluation Benchmark: {n_windows} windows, {n_episodes} episodes "
+          f"({config.EPISODE_N_WAY}-way {config.EPISODE_K_SHOT}-shot {config.EPISODE_N_QUERY} queries)")
+
+    start = time.perf_counter()
+    acc_loop = loop_evaluation(embeddings, labels, n_episodes)
+    t_loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = evaluate_episodes(embeddings, labels, n_episodes=n_episodes)
+    t_batch = time.perf_counter() - start
+
+    # Sorteios diferentes: as médias devem concordar dentro do intervalo de confiança
+    print(f" -> Per-episode loop: {acc_loop*100:.2f}% in {t_loop:.2f}s")
+    print(f" -> Batched engine:   {result['accuracy']*100:.2f}% ± {result['ci95']*100:.2f} in {t_batch:.2f}s")
+    print(f" -> Speedup:          {t_loop / t_batch:.1f}x")
+
+if __name__ == "__main__":
+    run_benchmark()
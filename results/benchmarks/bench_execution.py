@@ -0,0 +1,159 @@
+import sys
+import os
+import json
+import time
+import argparse
+
+# Diretório atual do arquivo bench_execution.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import numpy as np
+import torch
+import config
+import utils
+from model import EEGEmbedding
+from execution import ExecutionMode
+from episodes import split_episode, evaluate_episodes
+from feature_store import open_feature_store
+
+MODES = ["fp32", "channels_last", "bf16", "bf16+channels_last", "compile", "bf16+channels_last+compile"]
+
+def load_inputs(n_windows, seed):
+    # Janelas reais do Feature Store quando existirem; senão, espectrogramas sintéticos com as classes separadas
+    try:
+        store = open_feature_store()
+        rng = np.random.default_rng(seed)
+        indices = np.sort(rng.choice(len(store), size=min(n_windows, len(store)), replace=False))
+        X, Y = store.get(indices), store.labels[indices]
+        return torch.from_numpy(np.ascontiguousarray(X, dtype=np.float32)), torch.from_numpy(Y).long(), "feature store"
+    except FileNotFoundError:
+        generator = torch.Generator().manual_seed(seed)
+        Y = torch.randint(0, 2, (n_windows,), generator=generator)
+        X = torch.randn(n_windows, len(config.CHANNELS), 33, 17, generator=generator) + Y[:, None, None, None] * 0.5
+        return X, Y, "synthetic"
+
+def load_weights():
+    # Pesos treinados se existirem (a acurácia faz mais sentido); senão, uma inicialização fixa
+    model_path = config.MODELS_DIR / "eeg_model.pth"
+    torch.manual_seed(0)
+    model = EEGEmbedding()
+    if model_path.exists():
+        model.load_state_dict(torch.load(model_path, map_location="cpu"))
+        return model.state_dict(), "eeg_model.pth"
+    return model.state_dict(), "random init"
+
+def embed_all(mode, runner, X, batch_size):
+    with torch.no_grad():
+        return torch.cat([mode.embed(runner, X[i:i + batch_size], "cpu") for i in range(0, len(X), batch_size)])
+
+def inference_throughput(mode, runner, X, batch_size, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        embed_all(mode, runner, X, batch_size)
+        best = min(best, time.perf_counter() - start)
+    return len(X) / best
+
+def training_throughput(mode, state_dict, X, Y, steps):
+    # Passos de treino em episódios (mesma conta do train_one_epoch), a partir dos mesmos pesos
+    model = EEGEmbedding()
+    model.load_state_dict(state_dict)
+    runner = mode.prepare(model)
+    runner.train()
+    optimizer = torch.optim.Adam(model.parameters(), lr=1e-4)
+    n_way, k_shot, n_query = config.EPISODE_N_WAY, config.EPISODE_K_SHOT, config.EPISODE_N_QUERY
+    rng = np.random.default_rng(0)
+    tables = [np.flatnonzero(Y.numpy() == c) for c in range(n_way)]
+
+    def step():
+        draws = [rng.choice(t, size=k_shot + n_query, replace=False) for t in tables]
+        episode = np.concatenate([d[:k_shot] for d in draws] + [d[k_shot:] for d in draws])
+        optimizer.zero_grad()
+        embeddings = mode.embed(runner, X[episode], "cpu")
+        prototypes, query, targets = split_episode(embeddings, n_way, k_shot)
+        loss = torch.nn.functional.cross_entropy(-utils.calc_distance_matrix(query, prototypes), targets)
+        loss.backward()
+        torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+        optimizer.step()
+
+    # Aquecimento (no compile, é aqui que os kernels são gerados)
+    start = time.perf_counter()
+    for _ in range(3):
+        step()
+    warmup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        step()
+    return steps * n_way * (k_shot + n_query) / (time.perf_counter() - start), warmup
+
+def run_benchmark(modes=MODES, n_windows=2048, batch_size=256, repeats=5, train_steps=50, seed=42, output=None):
+    X, Y, source = load_inputs(n_windows, seed)
+    state_dict, weights = load_weights()
+    print(f"Execution Modes Benchmark: {len(X)} windows ({source}), weights: {weights}, "
+          f"{torch.get_num_threads()} threads")
+
+    report = {"source": source, "weights": weights, "windows": len(X), "threads": torch.get_num_threads(), "modes": {}}
+    reference = None
+    for name in modes:
+        mode = ExecutionMode.parse(name)
+        model = EEGEmbedding()
+        model.load_state_dict(state_dict)
+        model.eval()
+        runner = mode.prepare(model)
+
+        start = time.perf_counter()
+        embeddings = embed_all(mode, runner, X, batch_size) # primeira passada (compila, se for o caso)
+        first_pass = time.perf_counter() - start
+        if reference is None:
+            reference = embeddings
+        prototypes = utils.get_prototypes(reference, Y, 2)
+
+        # Acurácia: erro dos embeddings contra o fp32, concordância da classe mais próxima e acurácia em episódios
+        rel_error = ((embeddings - reference).norm(dim=1) / reference.norm(dim=1).clamp(min=1e-12)).max().item()
+        agreement = (utils.calc_distance_matrix(embeddings, prototypes).argmin(1)
+                     == utils.calc_distance_matrix(reference, prototypes).argmin(1)).float().mean().item()
+        episodic = evaluate_episodes(embeddings, Y.numpy(), n_episodes=config.EVAL_EPISODES)
+
+        infer_rate = inference_throughput(mode, runner, X, batch_size, repeats)
+        train_rate, warmup = training_throughput(mode, state_dict, X, Y, train_steps)
+
+        report["modes"][name] = {
+            "inference_windows_per_sec": infer_rate,
+            "train_samples_per_sec": train_rate,
+            "first_pass_seconds": first_pass,
+            "train_warmup_seconds": warmup,
+            "max_rel_error_vs_fp32": rel_error,
+            "prediction_agreement": agreement,
+            "episodic_accuracy": episodic["accuracy"],
+            "episodic_ci95": episodic["ci95"],
+        }
+
+    base = report["modes"][modes[0]]
+    print(f"{'mode':<28}{'infer win/s':>13}{'x':>7}{'train smp/s':>13}{'x':>7}{'rel err':>10}{'agree':>8}{'episodic acc':>15}")
+    for name, r in report["modes"].items():
+        print(f"{name:<28}{r['inference_windows_per_sec']:>13.0f}"
+              f"{r['inference_windows_per_sec'] / base['inference_windows_per_sec']:>6.2f}x"
+              f"{r['train_samples_per_sec']:>13.0f}"
+              f"{r['train_samples_per_sec'] / base['train_samples_per_sec']:>6.2f}x"
+              f"{r['max_rel_error_vs_fp32']:>10.1e}{r['prediction_agreement']*100:>7.1f}%"
+              f"{r['episodic_accuracy']*100:>9.2f}% ± {r['episodic_ci95']*100:.2f}")
+
+    output = output or os.path.join(curren_dir, 'execution_report.json')
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved in {output}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy vs throughput of the EEGEmbedding execution modes")
+    parser.add_argument("--modes", nargs="+", default=MODES)
+    parser.add_argument("--windows", type=int, default=2048)
+    parser.add_argument("--steps", type=int, default=50, help="Training steps per mode")
+    args = parser.parse_args()
+
+    run_benchmark(args.modes, n_windows=args.windows, train_steps=args.steps)
@@ -0,0 +1,83 @@
+import sys
+import os
+import time
+
+# Diretório atual do arquivo bench_filters.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import numpy as np
+import mne
+import config
+from filters import bandpass_filter, design_bandpass_fir
+
+SFREQ = config.SAMPLE_RATE
+# Erro relativo máximo aceito (em relação à amplitude do sinal filtrado do MNE)
+TOLERANCE = 1e-10
+
+def mne_path(data):
+    # Caminho antigo: Info + RawArray + raw.filter a cada arquivo
+    info = mne.create_info(ch_names=config.CHANNELS, sfreq=SFREQ, ch_types='eeg')
+    raw = mne.io.RawArray(data, info, verbose=False)
+    raw.filter(config.FILTER_LOW, config.FILTER_HIGH, verbose=False)
+    return raw.get_data()
+
+def lean_path(data):
+    # Caminho novo: FIR em cache aplicado direto no array.
+    # A paridade com o MNE é conferida em float64; o float32 tem a sua tolerância em bench_precision.py
+    return bandpass_filter(data.astype(np.float64), SFREQ, config.FILTER_LOW, config.FILTER_HIGH)
+
+def time_it(fn, data, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def check_design():
+    # Os coeficientes devem ser os mesmos que o MNE projeta para o raw.filter
+    h_mne = mne.filter.create_filter(None, SFREQ, config.FILTER_LOW, config.FILTER_HIGH, verbose=False)
+    h_lean = design_bandpass_fir(float(SFREQ), config.FILTER_LOW, config.FILTER_HIGH)
+    max_diff = float(np.max(np.abs(h_mne - h_lean))) if h_mne.shape == h_lean.shape else float('inf')
+    print(f"Filter Design: {len(h_lean)} taps | Max Abs Difference vs MNE: {max_diff:.3e}")
+    return max_diff < 1e-12
+
+def run_benchmark(duration, repeats=10, seed=42):
+    n_samples = int(duration * SFREQ)
+    print(f"Bandpass Filter Benchmark: {len(config.CHANNELS)} channels x {n_samples} samples ({duration}s)")
+
+    # Sinal parecido com o do Emotiv: offset DC (~4000 µV) + ruído, em float32 como sai do stew_reader
+    rng = np.random.default_rng(seed)
+    data = (4000 + rng.standard_normal((len(config.CHANNELS), n_samples)) * 20).astype(np.float32)
+
+    # Paridade numérica
+    reference = mne_path(data)
+    result = lean_path(data)
+    rel_diff = float(np.max(np.abs(reference - result)) / np.max(np.abs(reference)))
+    print(f" -> Max Relative Difference: {rel_diff:.3e} (tolerance {TOLERANCE:.0e})")
+    if reference.shape != result.shape or rel_diff > TOLERANCE:
+        print("ERROR: lean filter diverges from MNE raw.filter.")
+        return None
+
+    # Tempo
+    t_mne = time_it(mne_path, data, repeats)
+    t_lean = time_it(lean_path, data, repeats)
+    print(f" -> MNE raw.filter: {t_mne*1000:.2f} ms")
+    print(f" -> Cached FIR:     {t_lean*1000:.2f} ms")
+    print(f" -> Speedup:        {t_mne / t_lean:.2f}x")
+    return t_mne, t_lean
+
+if __name__ == "__main__":
+    if not check_design():
+        print("ERROR: filter design diverges from MNE.")
+        sys.exit(1)
+    print("-" * 30)
+    # Gravação curta (upload mínimo), gravação STEW completa (2.5 min)
+    for duration in (10, config.DURATION):
+        if run_benchmark(duration) is None:
+            sys.exit(1)
+        print("-" * 30)
@@ -0,0 +1,94 @@
+import sys
+import os
+import time
+import asyncio
+import argparse
+
+# Diretório atual do arquivo bench_microbatch.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import numpy as np
+import torch
+import config
+from batching import MicroBatcher
+from feature_store import open_feature_store
+from inference import BurnoutSystem
+
+async def load_test(handle, patients, concurrency, duration):
+    # concurrency clientes, cada um mandando uma requisição assim que a anterior responde (como o /predict)
+    latencies = []
+    stop_at = time.perf_counter() + duration
+
+    async def client(i):
+        n = i
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            await handle(patients[n % len(patients)])
+            latencies.append(time.perf_counter() - start)
+            n += concurrency
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return len(latencies) / elapsed, p50, p99
+
+async def run_modes(system, patients, concurrency_levels, duration, max_windows, max_wait_ms):
+    # Sem micro-batching: cada requisição faz o próprio forward numa thread (run_in_threadpool do FastAPI)
+    async def unbatched(windows):
+        embeddings = await asyncio.to_thread(system.embed_windows, windows)
+        return system.build_result(windows, embeddings, plots=False)
+
+    batcher = MicroBatcher(system.embed_windows, max_windows=max_windows, max_wait_ms=max_wait_ms)
+    await batcher.start()
+
+    async def batched(windows):
+        embeddings = await batcher.submit(windows)
+        return system.build_result(windows, embeddings, plots=False)
+
+    print(f"{'clients':>8}{'mode':>11}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'req/batch':>11}")
+    for concurrency in concurrency_levels:
+        for name, handle in (("unbatched", unbatched), ("batched", batched)):
+            before = dict(batcher.stats)
+            rate, p50, p99 = await load_test(handle, patients, concurrency, duration)
+            per_batch = ""
+            if name == "batched":
+                batches = batcher.stats["batches"] - before["batches"]
+                per_batch = f"{(batcher.stats['requests'] - before['requests']) / max(batches, 1):.1f}"
+            print(f"{concurrency:>8}{name:>11}{rate:>9.1f}{p50:>9.1f}{p99:>9.1f}{per_batch:>11}")
+    await batcher.stop()
+
+def run_benchmark(backend=None, windows_per_request=37, concurrency_levels=(1, 4, 16, 64), duration=5.0,
+                  max_windows=config.BATCHER_MAX_WINDOWS, max_wait_ms=config.BATCHER_MAX_WAIT_MS):
+    system = BurnoutSystem(backend=backend)
+    if not system.load_resources(config.MODELS_DIR / "eeg_model.pth", config.PROCESSED_DATA_DIR):
+        raise RuntimeError("Could not load the inference system")
+
+    # Requisições com janelas reais do Feature Store (o pré-processamento fica fora da medida)
+    store = open_feature_store()
+    rng = np.random.default_rng(0)
+    patients = [torch.from_numpy(store.get(np.sort(rng.choice(len(store), windows_per_request, replace=False))))
+                for _ in range(32)]
+
+    print(f"Micro-batching Benchmark: {windows_per_request} windows/request, backend {system.backend.name}, "
+          f"batch up to {max_windows} windows / {max_wait_ms} ms, {torch.get_num_threads()} threads, {duration}s per level")
+    if not system.backend.batch_invariant:
+        # Só a vazão vale aqui: o servidor não usa o micro-batching com esse backend
+        print(f"Note: {system.backend.name} results depend on the batch, so the server keeps micro-batching off for it")
+    asyncio.run(run_modes(system, patients, concurrency_levels, duration, max_windows, max_wait_ms))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and latency of /predict forwards with and without micro-batching")
+    parser.add_argument("--backend", default=None, help="eager, torchscript, onnx or int8 (default: config)")
+    parser.add_argument("--windows", type=int, default=37, help="Windows per request")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per concurrency level")
+    parser.add_argument("--max-windows", type=int, default=config.BATCHER_MAX_WINDOWS)
+    parser.add_argument("--max-wait-ms", type=float, default=config.BATCHER_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    run_benchmark(args.backend, args.windows, args.clients, args.duration, args.max_windows, args.max_wait_ms)
@@ -0,0 +1,76 @@
+import sys
+import os
+import glob
+import time
+import tracemalloc
+
+# Diretório atual do arquivo bench_precision.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import numpy as np
+import config
+from filters import bandpass_filter
+from preprocessing import spectrogram_windows, WINDOW_SAMPLES, HOP_SAMPLES
+from stew_reader import load_stew_array
+
+SFREQ = config.SAMPLE_RATE
+# Tolerância do caminho float32 em relação ao float64, no espectrograma log1p(|STFT|) que vai para a rede.
+# Os valores do espectrograma ficam entre 0 e ~5, então 1e-4 é bem menor que qualquer diferença real entre janelas.
+TOLERANCE = 1e-4
+
+def pipeline(data, dtype):
+    # Filtro -> Janelas -> Espectrograma, tudo na precisão pedida
+    filtered = bandpass_filter(data.astype(dtype, copy=False), SFREQ, config.FILTER_LOW, config.FILTER_HIGH)
+    return spectrogram_windows(filtered, SFREQ, WINDOW_SAMPLES, HOP_SAMPLES)
+
+def measure(data, dtype, repeats):
+    # Pico de memória (alocações do NumPy) e melhor tempo
+    tracemalloc.start()
+    result = pipeline(data, dtype)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        pipeline(data, dtype)
+        best = min(best, time.perf_counter() - start)
+    return result, peak, best
+
+def run_benchmark(name, data, repeats=10):
+    print(f"Precision Benchmark: {name} ({data.shape[0]} channels x {data.shape[1]} samples)")
+    ref, peak64, t64 = measure(data, np.float64, repeats)
+    out, peak32, t32 = measure(data, np.float32, repeats)
+
+    abs_diff = np.abs(ref - out)
+    max_diff = float(abs_diff.max())
+    print(f" -> Max Abs Difference: {max_diff:.3e} | Mean: {float(abs_diff.mean()):.3e} (tolerance {TOLERANCE:.0e})")
+    print(f" -> Peak Memory: float64 {peak64/1e6:.1f} MB | float32 {peak32/1e6:.1f} MB ({peak64/peak32:.2f}x)")
+    print(f" -> Time:        float64 {t64*1000:.2f} ms | float32 {t32*1000:.2f} ms ({t64/t32:.2f}x)")
+    return max_diff <= TOLERANCE
+
+if __name__ == "__main__":
+    ok = True
+
+    # Sinal parecido com o do Emotiv: offset DC (~4000 µV) + ruído, em float32 como sai do stew_reader
+    rng = np.random.default_rng(42)
+    synthetic = (4000 + rng.standard_normal((len(config.CHANNELS), int(config.DURATION * SFREQ))) * 20).astype(np.float32)
+    ok &= run_benchmark("synthetic", synthetic)
+    print("-" * 30)
+
+    # Gravações reais do STEW, se existirem
+    files = sorted(glob.glob(os.path.join(config.RAW_DATA_DIR, "**", "*.txt"), recursive=True))
+    for file in files[:4]:
+        data = load_stew_array(file)
+        if data is None:
+            continue
+        ok &= run_benchmark(os.path.basename(file), data, repeats=3)
+        print("-" * 30)
+
+    if not ok:
+        print("ERROR: float32 path exceeds the tolerance.")
+        sys.exit(1)
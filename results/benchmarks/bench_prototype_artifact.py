@@ -0,0 +1,64 @@
+import sys
+import os
+import time
+import tempfile
+import shutil
+
+# Diretório atual do arquivo bench_prototype_artifact.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import torch
+import config
+import utils
+import prototypes
+from model import EEGEmbedding
+from feature_store import open_feature_store
+from inference import BurnoutSystem
+
+def legacy_prototypes(model, store):
+    # Caminho antigo: embeddings de todas as janelas concatenados e depois a média por classe
+    with torch.no_grad():
+        embeddings = torch.cat([model(torch.from_numpy(X)) for X, _ in store.iter_batches(batch_size=512)])
+    return utils.get_prototypes(embeddings, torch.from_numpy(store.labels).long(), 2)
+
+def run_benchmark():
+    store = open_feature_store()
+    model_path = config.MODELS_DIR / "eeg_model.pth"
+    with tempfile.TemporaryDirectory() as tmp:
+        # Cópia do modelo numa pasta temporária, sem mexer no artefato de verdade
+        tmp_model = os.path.join(tmp, "eeg_model.pth")
+        if model_path.exists():
+            shutil.copy(model_path, tmp_model)
+        else:
+            torch.manual_seed(0)
+            torch.save(EEGEmbedding().state_dict(), tmp_model)
+        print(f"Prototype Artifact Benchmark: {len(store)} windows")
+
+        # 1a partida: sem artefato (recalcula em blocos e grava)
+        system = BurnoutSystem()
+        start = time.perf_counter()
+        system.load_resources(tmp_model, config.PROCESSED_DATA_DIR)
+        t_cold = time.perf_counter() - start
+        cold_prototypes = system.prototypes.clone()
+
+        # 2a partida: lendo o artefato
+        system = BurnoutSystem()
+        start = time.perf_counter()
+        system.load_resources(tmp_model, config.PROCESSED_DATA_DIR)
+        t_warm = time.perf_counter() - start
+
+        reference = legacy_prototypes(system.model, store)
+        diff = max((cold_prototypes - reference).abs().max().item(), (system.prototypes - reference).abs().max().item())
+
+    print(f" -> Start without artifact (chunked recompute): {t_cold*1000:.1f} ms")
+    print(f" -> Start with artifact:                        {t_warm*1000:.1f} ms")
+    print(f" -> Max prototype difference vs full-dataset embedding: {diff:.1e}")
+    return diff < 1e-5
+
+if __name__ == "__main__":
+    ok = run_benchmark()
+    print("Parity OK" if ok else "PARITY FAILED")
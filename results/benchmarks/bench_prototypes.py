@@ -0,0 +1,66 @@
+import sys
+import os
+import time
+
+# Diretório atual do arquivo bench_prototypes.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import torch
+import utils
+
+def loop_step(embeddings, targets, num_class):
+    # Caminho antigo: máscara + média por classe e uma pairwise_distance por protótipo
+    prototypes = []
+    for i in range(num_class):
+        class_embeddings = embeddings[targets == i]
+        if class_embeddings.size(0) == 0:
+            prototypes.append(torch.zeros(embeddings.size(1), device=embeddings.device))
+        else:
+            prototypes.append(class_embeddings.mean(0))
+    prototypes = torch.stack(prototypes)
+    dists = torch.stack([utils.calc_euclidiean_distance(embeddings, p) for p in prototypes], dim=1)
+    return prototypes, dists
+
+def vectorized_step(embeddings, targets, num_class):
+    # Caminho novo: index_add + cdist
+    prototypes = utils.get_prototypes(embeddings, targets, num_class)
+    return prototypes, utils.calc_distance_matrix(embeddings, prototypes)
+
+def time_step(fn, embeddings, targets, num_class, repeats):
+    # Forward + backward, como num passo de treino
+    best = float('inf')
+    for _ in range(repeats):
+        emb = embeddings.detach().requires_grad_(True)
+        start = time.perf_counter()
+        _, dists = fn(emb, targets, num_class)
+        torch.nn.functional.cross_entropy(-dists, targets).backward()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_benchmark(num_class, batch_size=32, dim=64, repeats=200, seed=42):
+    generator = torch.Generator().manual_seed(seed)
+    embeddings = torch.randn(batch_size, dim, generator=generator)
+    targets = torch.randint(0, num_class, (batch_size,), generator=generator)
+
+    # Paridade: protótipos iguais e distâncias iguais a menos do eps da pairwise_distance (1e-6)
+    proto_loop, dist_loop = loop_step(embeddings, targets, num_class)
+    proto_vec, dist_vec = vectorized_step(embeddings, targets, num_class)
+    proto_diff = (proto_loop - proto_vec).abs().max().item()
+    dist_diff = (dist_loop - dist_vec).abs().max().item()
+
+    t_loop = time_step(loop_step, embeddings, targets, num_class, repeats)
+    t_vec = time_step(vectorized_step, embeddings, targets, num_class, repeats)
+    print(f"{num_class:>3} classes | proto diff {proto_diff:.1e} | dist diff {dist_diff:.1e} | "
+          f"loop {t_loop*1e6:8.1f} us | vectorized {t_vec*1e6:8.1f} us | speedup {t_loop / t_vec:.2f}x")
+    return proto_diff < 1e-6 and dist_diff < 1e-4
+
+if __name__ == "__main__":
+    print("Prototype + Distance Step Benchmark (batch 32, forward + backward)")
+    ok = all([run_benchmark(num_class) for num_class in (2, 4, 8, 16, 32)])
+    if not ok:
+        print("ERROR: vectorized prototypes diverge from the per-class loop.")
+        sys.exit(1)
@@ -0,0 +1,157 @@
+import sys
+import os
+import io
+import json
+import time
+import argparse
+
+# Diretório atual do arquivo bench_quantization.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import numpy as np
+import torch
+import config
+import utils
+from model import EEGEmbedding
+from episodes import evaluate_episodes
+from feature_store import open_feature_store
+from quantization import quantize_model
+
+def serialized_mb(module):
+    # Tamanho dos pesos serializados (o mesmo que ocupariam em disco com torch.save)
+    buffer = io.BytesIO()
+    torch.save(module.state_dict(), buffer)
+    return buffer.tell() / 1e6
+
+def embed_indices(model, store, indices, batch_size=256):
+    with torch.no_grad():
+        return torch.cat([model(torch.from_numpy(X_batch).float())
+                          for X_batch, _ in store.iter_batches(indices, batch_size=batch_size)])
+
+def latency_per_window(model, X, repeats):
+    # Mediana e p95 do tempo por janela (ms) de um lote X
+    with torch.no_grad():
+        for _ in range(3):
+            model(X)
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model(X)
+            latencies.append((time.perf_counter() - start) / len(X))
+    p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+    return float(p50), float(p95)
+
+def evaluate(model, store, ref_idx, test_idx, Y_ref, Y_test):
+    # Mesmo protocolo do test_metrics.py: protótipos dos sujeitos de referência, teste nos sujeitos não vistos
+    embeddings_ref = embed_indices(model, store, ref_idx)
+    embeddings_test = embed_indices(model, store, test_idx)
+    prototypes = utils.get_prototypes(embeddings_ref, Y_ref, 2)
+    distances = utils.calc_distance_matrix(embeddings_test, prototypes)
+    episodic = evaluate_episodes(embeddings_ref, Y_ref, embeddings_test, Y_test, n_episodes=config.EVAL_EPISODES)
+    return {
+        "embeddings": embeddings_test,
+        "prototypes": prototypes,
+        "distances": distances,
+        "predictions": distances.argmin(dim=1),
+        "accuracy": (distances.argmin(dim=1) == Y_test).float().mean().item(),
+        "episodic_accuracy": episodic["accuracy"],
+        "episodic_ci95": episodic["ci95"],
+    }
+
+def run_benchmark(calibration_windows=config.QUANT_CALIBRATION_WINDOWS, patient_windows=37, repeats=100, output=None):
+    state_dict = torch.load(config.MODELS_DIR / "eeg_model.pth", map_location="cpu")
+    model = EEGEmbedding(embedding_dim=state_dict["fc1.weight"].shape[0])
+    model.load_state_dict(state_dict)
+    model.eval()
+
+    store = open_feature_store()
+    ref_idx, test_idx = store.subject_split(test_fraction=0.2)
+    Y_ref = torch.from_numpy(store.labels[ref_idx]).long()
+    Y_test = torch.from_numpy(store.labels[test_idx]).long()
+
+    # Calibração só com os sujeitos de referência: os de teste ficam de fora, como no treino
+    start = time.perf_counter()
+    qmodel = quantize_model(model, store, calibration_windows, indices=ref_idx)
+    quantize_seconds = time.perf_counter() - start
+
+    print(f"Quantization Benchmark: {len(ref_idx)} reference / {len(test_idx)} test windows, "
+          f"{min(calibration_windows, len(ref_idx))} calibration windows, engine {config.QUANT_ENGINE}, "
+          f"{torch.get_num_threads()} threads")
+
+    fp32 = evaluate(model, store, ref_idx, test_idx, Y_ref, Y_test)
+    int8 = evaluate(qmodel, store, ref_idx, test_idx, Y_ref, Y_test)
+
+    # Desvio das distâncias ao protótipo: cada modelo com os próprios protótipos (como no backend int8)
+    drift = (int8["distances"] - fp32["distances"]).abs()
+    rel_drift = drift / fp32["distances"].abs().clamp(min=1e-12)
+    margin_fp32 = fp32["distances"][:, 0] - fp32["distances"][:, 1]
+    margin_int8 = int8["distances"][:, 0] - int8["distances"][:, 1]
+    emb_error = ((int8["embeddings"] - fp32["embeddings"]).norm(dim=1) / fp32["embeddings"].norm(dim=1).clamp(min=1e-12))
+
+    rng = np.random.default_rng(0)
+    patient = torch.from_numpy(store.get(np.sort(rng.choice(len(store), min(patient_windows, len(store)), replace=False))))
+    single = patient[:1]
+
+    report = {
+        "windows": {"reference": len(ref_idx), "test": len(test_idx)},
+        "calibration_windows": min(calibration_windows, len(ref_idx)),
+        "engine": config.QUANT_ENGINE,
+        "threads": torch.get_num_threads(),
+        "quantize_seconds": quantize_seconds,
+        "models": {},
+        "drift": {
+            "prototype_shift": (int8["prototypes"] - fp32["prototypes"]).norm(dim=1).tolist(),
+            "distance_abs_mean": drift.mean().item(),
+            "distance_abs_max": drift.max().item(),
+            "distance_rel_mean": rel_drift.mean().item(),
+            "margin_corr": float(np.corrcoef(margin_fp32.numpy(), margin_int8.numpy())[0, 1]),
+            "embedding_rel_error_mean": emb_error.mean().item(),
+            "embedding_rel_error_max": emb_error.max().item(),
+            "prediction_agreement": (int8["predictions"] == fp32["predictions"]).float().mean().item(),
+        },
+    }
+    for name, module, result in (("fp32", model, fp32), ("int8", qmodel, int8)):
+        p50_single, p95_single = latency_per_window(module, single, repeats)
+        p50_patient, p95_patient = latency_per_window(module, patient, repeats)
+        report["models"][name] = {
+            "size_mb": serialized_mb(module),
+            "accuracy": result["accuracy"],
+            "episodic_accuracy": result["episodic_accuracy"],
+            "episodic_ci95": result["episodic_ci95"],
+            "ms_per_window_single": p50_single,
+            "ms_per_window_single_p95": p95_single,
+            "ms_per_window_patient": p50_patient,
+            "ms_per_window_patient_p95": p95_patient,
+        }
+
+    base = report["models"]["fp32"]
+    print(f"{'model':<7}{'size MB':>9}{'x':>7}{'acc':>8}{'episodic acc':>17}{'ms/win (1)':>12}{'ms/win (' + str(len(patient)) + ')':>13}{'x':>7}")
+    for name, r in report["models"].items():
+        print(f"{name:<7}{r['size_mb']:>9.2f}{base['size_mb'] / r['size_mb']:>6.2f}x{r['accuracy']*100:>7.2f}%"
+              f"{r['episodic_accuracy']*100:>9.2f}% ± {r['episodic_ci95']*100:.2f}"
+              f"{r['ms_per_window_single']:>12.3f}{r['ms_per_window_patient']:>13.3f}"
+              f"{base['ms_per_window_patient'] / r['ms_per_window_patient']:>6.2f}x")
+    d = report["drift"]
+    print(f"Distance drift: mean {d['distance_abs_mean']:.2e} (rel {d['distance_rel_mean']*100:.2f}%), "
+          f"max {d['distance_abs_max']:.2e} | margin corr {d['margin_corr']:.4f} | "
+          f"prototype shift {', '.join(f'{s:.2e}' for s in d['prototype_shift'])} | "
+          f"agreement {d['prediction_agreement']*100:.1f}%")
+
+    output = output or os.path.join(curren_dir, 'quantization_report.json')
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved in {output}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Accuracy, distance drift, size and latency of the int8 EEGEmbedding vs fp32")
+    parser.add_argument("--calibration-windows", type=int, default=config.QUANT_CALIBRATION_WINDOWS)
+    parser.add_argument("--windows", type=int, default=37, help="Windows of the simulated patient")
+    parser.add_argument("--repeats", type=int, default=100)
+    args = parser.parse_args()
+
+    run_benchmark(args.calibration_windows, patient_windows=args.windows, repeats=args.repeats)
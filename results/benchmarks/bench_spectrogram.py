@@ -0,0 +1,92 @@
+import sys
+import os
+import time
+
+# Diretório atual do arquivo bench_spectrogram.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+import numpy as np
+import config
+from preprocessing import transform_to_spectrogram, transform_to_spectrogram_batch, make_windows, spectrogram_windows
+
+SFREQ = config.SAMPLE_RATE
+WINDOW_SAMPLES = int(config.EPOCH_LENGTH * SFREQ) # 512 pontos
+
+def per_window_path(epoch_data):
+    # Caminho antigo: uma STFT por janela e empilhamento no final
+    processed_list = []
+    for window in epoch_data:
+        processed_list.append(transform_to_spectrogram(window, SFREQ))
+    return np.array(processed_list, dtype=np.float32)
+
+def batched_path(epoch_data):
+    # Caminho novo: uma única STFT para todas as janelas
+    return transform_to_spectrogram_batch(epoch_data, SFREQ)
+
+def time_it(fn, data, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_benchmark(n_windows=37, repeats=20, seed=42):
+    print(f"Spectrogram Benchmark: {n_windows} windows x {len(config.CHANNELS)} channels x {WINDOW_SAMPLES} samples")
+
+    rng = np.random.default_rng(seed)
+    epoch_data = rng.standard_normal((n_windows, len(config.CHANNELS), WINDOW_SAMPLES)) * 1e-5
+
+    # Paridade numérica
+    reference = per_window_path(epoch_data)
+    batched = batched_path(epoch_data)
+    max_diff = float(np.max(np.abs(reference - batched)))
+    print(f" -> Output Shape: {batched.shape} ({batched.dtype})")
+    print(f" -> Max Abs Difference: {max_diff:.3e}")
+    if reference.shape != batched.shape or not np.array_equal(reference, batched):
+        print("ERROR: batched path diverges from the per-window path.")
+        return None
+
+    # Tempo
+    t_loop = time_it(per_window_path, epoch_data, repeats)
+    t_batch = time_it(batched_path, epoch_data, repeats)
+    print(f" -> Per-window: {t_loop*1000:.2f} ms")
+    print(f" -> Batched:    {t_batch*1000:.2f} ms")
+    print(f" -> Speedup:    {t_loop / t_batch:.2f}x")
+    # Janelas em float32 (PREPROCESS_DTYPE padrão): FFT em complex64
+    t_batch32 = time_it(batched_path, epoch_data.astype(np.float32), repeats)
+    print(f" -> Batched float32: {t_batch32*1000:.2f} ms ({t_loop / t_batch32:.2f}x)")
+    return t_loop, t_batch
+
+def run_hop_benchmark(hop_seconds, duration=config.DURATION, repeats=10, seed=42):
+    # Janelas sobrepostas: STFT janela a janela vs segmentos da STFT compartilhados entre janelas
+    hop = int(hop_seconds * SFREQ)
+    rng = np.random.default_rng(seed)
+    recording = rng.standard_normal((len(config.CHANNELS), int(duration * SFREQ))) * 1e-5
+
+    independent = lambda x: transform_to_spectrogram_batch(make_windows(x, WINDOW_SAMPLES, hop), SFREQ)
+    shared = lambda x: spectrogram_windows(x, SFREQ, WINDOW_SAMPLES, hop)
+
+    reference = independent(recording)
+    result = shared(recording)
+    print(f"Overlapping Windows Benchmark: hop {hop_seconds}s -> {len(result)} windows")
+    print(f" -> Max Abs Difference: {float(np.max(np.abs(reference - result))):.3e}")
+
+    t_indep = time_it(independent, recording, repeats)
+    t_shared = time_it(shared, recording, repeats)
+    print(f" -> Independent STFT: {t_indep*1000:.2f} ms")
+    print(f" -> Shared frames:    {t_shared*1000:.2f} ms")
+    print(f" -> Speedup:          {t_indep / t_shared:.2f}x")
+
+if __name__ == "__main__":
+    # 37 janelas = uma gravação STEW de 2.5 min. 3552 janelas = o dataset inteiro.
+    run_benchmark(n_windows=37)
+    print("-" * 30)
+    run_benchmark(n_windows=3552, repeats=3)
+    print("-" * 30)
+    for hop_seconds in (1.0, 0.5, 0.25):
+        run_hop_benchmark(hop_seconds)
@@ -0,0 +1,90 @@
+import sys
+import os
+import glob
+import time
+import argparse
+
+# Diretório atual do arquivo bench_worker_pool.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe dois níveis para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '../../'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+from concurrent.futures import ThreadPoolExecutor
+import torch
+import config
+from inference import BurnoutSystem
+from worker_pool import InferencePool
+
+def memory_mb(pid):
+    # Rss conta as páginas compartilhadas em todo processo; Pss divide entre quem compartilha; Private é só do processo
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:"):
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return values["Rss"], values["Pss"], values["Private_Clean"] + values["Private_Dirty"]
+
+def run_threads(system, filepaths, threads, plots):
+    # Linha de base: um processo, um BurnoutSystem, várias threads (como o SERVER_MODE = "threads")
+    def predict(filepath):
+        if plots:
+            return system.predict_patient(filepath)
+        input_tensor = system.preprocess(filepath)
+        with torch.no_grad():
+            embeddings, distances = system.backend(input_tensor)
+        return system.build_result(input_tensor, embeddings, distances[0], plots=False)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(predict, filepaths))
+
+def run_benchmark(workers_list=(1, 2, 4), threads_per_worker=1, copies=4, plots=False):
+    recordings = sorted(glob.glob(os.path.join(config.RAW_DATA_DIR, "STEW_Dataset", "*.txt")))
+    if not recordings:
+        raise FileNotFoundError(f"No .txt recordings in {config.RAW_DATA_DIR / 'STEW_Dataset'}")
+    filepaths = recordings * copies
+
+    system = BurnoutSystem(backend="eager")
+    if not system.load_resources(config.MODELS_DIR / "eeg_model.pth", config.PROCESSED_DATA_DIR):
+        raise RuntimeError("Could not load the inference system")
+    model_mb = sum(t.numel() * t.element_size() for t in system.model.state_dict().values()) / 1e6
+    print(f"Worker Pool Benchmark: {len(filepaths)} requests, plots {plots}, model weights {model_mb:.2f} MB, "
+          f"{os.cpu_count()} cores")
+
+    torch.set_num_threads(threads_per_worker)
+    run_threads(system, filepaths[:2], 1, plots) # aquecimento
+    reference = None
+    print(f"{'mode':<24}{'req/s':>8}{'x':>7}{'max diff':>10}{'RSS MB/proc':>13}{'PSS MB/proc':>13}{'private MB/proc':>17}")
+    base = None
+    for workers in workers_list:
+        start = time.perf_counter()
+        results = run_threads(system, filepaths, workers, plots)
+        rate = len(filepaths) / (time.perf_counter() - start)
+        base = base or rate
+        reference = reference or results
+        rss, pss, private = memory_mb(os.getpid())
+        print(f"{f'threads x{workers}':<24}{rate:>8.1f}{rate / base:>6.2f}x{0.0:>10.1e}{rss:>13.0f}{pss:>13.0f}{private:>17.0f}")
+
+    for workers in workers_list:
+        pool = InferencePool(system, workers, threads_per_worker).start()
+        pool.predict_many(filepaths[:workers], plots) # aquecimento
+        start = time.perf_counter()
+        results = pool.predict_many(filepaths, plots)
+        rate = len(filepaths) / (time.perf_counter() - start)
+        diff = max(abs(a["distances"][k] - b["distances"][k]) for a, b in zip(reference, results) for k in a["distances"])
+        usage = [memory_mb(pid) for pid in pool.pids]
+        rss, pss, private = (sum(u[i] for u in usage) / len(usage) for i in range(3))
+        print(f"{f'processes x{workers}':<24}{rate:>8.1f}{rate / base:>6.2f}x{diff:>10.1e}{rss:>13.0f}{pss:>13.0f}{private:>17.0f}")
+        pool.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and memory of the shared-weight inference worker pool")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=1, help="PyTorch threads per worker")
+    parser.add_argument("--copies", type=int, default=4, help="Times each recording is submitted")
+    parser.add_argument("--plots", action="store_true", help="Include the PCA, Grad-CAM and topomap plots")
+    args = parser.parse_args()
+
+    run_benchmark(args.workers, args.threads, args.copies, args.plots)
@@ -0,0 +1,65 @@
+"""
+Controle de carga do servidor (web/backend/app.py).
+O trabalho de CPU de um /predict (leitura, filtro, STFT, Grad-CAM e os gráficos) roda num pool de threads de
+tamanho fixo, e o número de requisições dentro do servidor também é limitado:
+    1- até workers requisições sendo processadas + queue_depth esperando uma thread livre
+    2- acima disso a requisição é recusada na hora (Overloaded -> HTTP 503 com Retry-After),
+       em vez de entrar numa fila sem fim onde todo mundo espera cada vez mais
+    3- o Retry-After é estimado pelo tempo médio das últimas requisições e pelo tamanho da fila
+Tudo é chamado do event loop (uma thread só), então os contadores não precisam de lock.
+"""
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import config
+
+class Overloaded(Exception):
+    # Servidor cheio: retry_after é a sugestão (s) de quando tentar de novo
+    def __init__(self, retry_after):
+        super().__init__(f"Server is busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+class BoundedExecutor:
+    def __init__(self, workers=config.SERVER_WORKERS, queue_depth=config.SERVER_QUEUE_DEPTH):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="predict")
+        self.in_flight = 0
+        # Média móvel do tempo de uma requisição (começa em 1s até a primeira terminar)
+        self.mean_seconds = 1.0
+        self.stats = {"accepted": 0, "rejected": 0, "completed": 0}
+
+    @property
+    def capacity(self):
+        return self.workers + self.queue_depth
+
+    def retry_after(self):
+        # Tempo para a fila atual andar uma vez (arredondado para cima, mínimo 1s)
+        waiting = max(self.in_flight - self.workers + 1, 1)
+        return max(1, math.ceil(self.mean_seconds * waiting / self.workers))
+
+    @contextmanager
+    def admit(self):
+        # Reserva uma vaga para a requisição inteira ou levanta Overloaded
+        if self.in_flight >= self.capacity:
+            self.stats["rejected"] += 1
+            raise Overloaded(self.retry_after())
+        self.in_flight += 1
+        self.stats["accepted"] += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.stats["completed"] += 1
+            self.mean_seconds = 0.8 * self.mean_seconds + 0.2 * (time.perf_counter() - start)
+
+    async def run(self, fn, *args, **kwargs):
+        # fn(*args) numa das threads do pool, sem travar o event loop
+        return await asyncio.get_running_loop().run_in_executor(self.pool, partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
@@ -0,0 +1,151 @@
+"""
+Backends de inferência do BurnoutSystem: o mesmo contrato em quatro motores.
+    backend(x) -> (embeddings (N_janelas, D), distâncias do perfil do paciente até cada protótipo (1, N_classes))
+    1- eager: o EEGEmbedding do PyTorch (com o modo de execução do execution.py)
+    2- torchscript: modelo exportado (export_model.py) com os protótipos embutidos, sem o código Python do modelo
+    3- onnx: o mesmo grafo no ONNX Runtime (CPU). Dependência opcional: pip install onnxruntime
+    4- int8: TorchScript do modelo quantizado (quantization.py), com os protótipos do próprio modelo int8
+backend.prototypes são os protótipos do espaço dos embeddings do backend (o predict_patients do BurnoutSystem
+calcula as distâncias de vários pacientes de um mesmo forward com eles).
+backend.batch_invariant diz se o embedding de uma janela independe das outras janelas do lote. No int8 não: a
+quantização dinâmica da fc1 tira a escala das ativações do lote inteiro, então juntar pacientes em um forward muda
+as distâncias de cada um (o predict_patients e o micro-batcher mandam cada paciente sozinho nesse caso).
+Os arquivos exportados guardam o hash dos pesos e dos dados dos protótipos; se não baterem com o
+eeg_model.pth/eeg_model.prototypes.json atuais, o backend não é carregado (é preciso exportar de novo).
+"""
+import json
+from pathlib import Path
+import numpy as np
+import torch
+import torch.nn as nn
+import config
+import utils
+
+BACKENDS = ("eager", "torchscript", "onnx", "int8")
+
+class PrototypeScorer(nn.Module):
+    """
+    EEGEmbedding + protótipos embutidos (buffer), o grafo que é exportado.
+    A distância é escrita com operações básicas (sem cdist) para exportar igual no TorchScript e no ONNX.
+    """
+    def __init__(self, model, prototypes):
+        super().__init__()
+        self.model = model
+        self.register_buffer("prototypes", prototypes.detach().clone().float())
+
+    def forward(self, x):
+        embeddings = self.model(x)
+        # Perfil do paciente: média das janelas
+        profile = embeddings.mean(dim=0, keepdim=True)
+        distances = (profile.unsqueeze(1) - self.prototypes.unsqueeze(0)).pow(2).sum(dim=-1).sqrt()
+        return embeddings, distances
+
+def export_paths(model_path):
+    # results/saved_models/eeg_model.pth -> eeg_model.torchscript.pt, eeg_model.onnx e eeg_model.int8.pt na mesma pasta
+    model_path = Path(model_path)
+    return {
+        "torchscript": model_path.with_name(f"{model_path.stem}.torchscript.pt"),
+        "onnx": model_path.with_name(f"{model_path.stem}.onnx"),
+        "int8": model_path.with_name(f"{model_path.stem}.int8.pt"),
+    }
+
+def check_metadata(metadata, expected, path):
+    # Levanta ValueError se o arquivo exportado for de outros pesos ou de outros protótipos
+    for key, value in expected.items():
+        if metadata.get(key) != value:
+            raise ValueError(f"{Path(path).name} is stale ({key} mismatch). Run export_model.py again")
+
+class EagerBackend:
+    name = "eager"
+    batch_invariant = True
+
+    def __init__(self, runner, prototypes, execution, device="cpu"):
+        self.runner = runner
+        self.prototypes = prototypes
+        self.execution = execution
+        self.device = device
+
+    def __call__(self, x):
+        with torch.no_grad():
+            embeddings = self.execution.embed(self.runner, x, self.device)
+            profile = embeddings.mean(dim=0, keepdim=True)
+            return embeddings, utils.calc_distance_matrix(profile, self.prototypes)
+
+class TorchScriptBackend:
+    name = "torchscript"
+    batch_invariant = True
+
+    def __init__(self, path, expected=None, prototypes=None):
+        extra_files = {"meta.json": ""}
+        self.module = torch.jit.load(str(path), map_location="cpu", _extra_files=extra_files)
+        self.metadata = json.loads(extra_files["meta.json"] or "{}")
+        if expected:
+            check_metadata(self.metadata, expected, path)
+        self.prototypes = prototypes
+
+    def __call__(self, x):
+        with torch.no_grad():
+            return self.module(x.float())
+
+class Int8Backend(TorchScriptBackend):
+    name = "int8"
+    # Escala das ativações da fc1 calculada por forward (quantização dinâmica): depende do lote
+    batch_invariant = False
+
+    def __init__(self, path, expected=None, prototypes=None):
+        # Os pesos int8 são reempacotados no load para o motor atual, que precisa ser o da quantização
+        engine = config.QUANT_ENGINE
+        if engine not in torch.backends.quantized.supported_engines:
+            raise RuntimeError(f"Quantized engine '{engine}' is not supported on this CPU")
+        torch.backends.quantized.engine = engine
+        super().__init__(path, expected, prototypes)
+        if self.metadata.get("engine", engine) != engine:
+            raise ValueError(f"{Path(path).name} was quantized for '{self.metadata['engine']}', not '{engine}'")
+        # Os protótipos do int8 são os do próprio modelo quantizado, não os do artefato fp32
+        # (comparar embeddings int8 com protótipos fp32 desloca as distâncias)
+        if "prototypes" not in self.metadata:
+            raise ValueError(f"{Path(path).name} has no int8 prototypes in its metadata (older export). "
+                             "Re-run quantization.py")
+        self.prototypes = torch.tensor(self.metadata["prototypes"], dtype=torch.float32)
+
+class OnnxBackend:
+    name = "onnx"
+    batch_invariant = True
+
+    def __init__(self, path, expected=None, threads=None, prototypes=None):
+        try:
+            import onnxruntime as ort # opcional: só quem usa o backend onnx precisa
+        except ImportError as e:
+            raise ImportError("The onnx backend needs onnxruntime (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        if threads is not None:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(path), sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.metadata = dict(self.session.get_modelmeta().custom_metadata_map)
+        if expected:
+            check_metadata(self.metadata, expected, path)
+        self.prototypes = prototypes
+
+    def __call__(self, x):
+        inputs = np.ascontiguousarray(x.detach().cpu().numpy(), dtype=np.float32)
+        embeddings, distances = self.session.run(None, {self.input_name: inputs})
+        return torch.from_numpy(embeddings), torch.from_numpy(distances)
+
+def load_backend(name, model_path, runner=None, prototypes=None, execution=None, expected=None, device="cpu"):
+    """
+    Backend pelo nome. eager usa o runner/protótipos já carregados; torchscript, onnx e int8 leem o arquivo exportado
+    ao lado de model_path e conferem os metadados com expected ({"model_sha256": ..., "data_sha256": ...}).
+    """
+    name = name or config.INFERENCE_BACKEND
+    if name == "eager":
+        return EagerBackend(runner, prototypes, execution, device)
+    if name == "torchscript":
+        return TorchScriptBackend(export_paths(model_path)["torchscript"], expected, prototypes)
+    if name == "onnx":
+        return OnnxBackend(export_paths(model_path)["onnx"], expected, threads=torch.get_num_threads(),
+                           prototypes=prototypes)
+    if name == "int8":
+        return Int8Backend(export_paths(model_path)["int8"], expected, prototypes)
+    raise ValueError(f"Unknown backend '{name}'. Use one of {BACKENDS}")
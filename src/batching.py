@@ -0,0 +1,109 @@
+"""
+Micro-batching das requisições do servidor (web/backend/app.py).
+Cada /predict fazia o próprio forward com as janelas de um paciente; com várias requisições ao mesmo tempo,
+vários forwards pequenos disputavam a CPU. Aqui:
+    1- cada requisição coloca o tensor de janelas já pré-processado numa fila do asyncio e espera o resultado
+    2- um único consumidor junta tudo o que já está na fila e o que chegar em até max_wait_ms (até max_windows janelas)
+    3- um forward com todas as janelas juntas, numa thread (o event loop continua recebendo requisições)
+    4- os embeddings são separados de volta e cada requisição recebe os seus
+Enquanto um forward roda, as próximas requisições se acumulam na fila e formam o próximo lote:
+com pouca carga o lote é de um paciente só (sem espera extra com max_wait_ms=0), com muita carga os lotes crescem.
+Só serve para backends com batch_invariant (backends.py): no int8, a escala da quantização dinâmica é do lote inteiro
+e o resultado de um paciente dependeria de quem chegou junto. O app.py não liga o micro-batching nesse caso.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+import torch
+import config
+
+class MicroBatcher:
+    def __init__(self, forward, max_windows=config.BATCHER_MAX_WINDOWS, max_wait_ms=config.BATCHER_MAX_WAIT_MS):
+        # forward: tensor (N_janelas, 14, 33, 17) -> embeddings (N_janelas, D), ex: BurnoutSystem.embed_windows
+        self.forward = forward
+        self.max_windows = max_windows
+        self.max_wait = max_wait_ms / 1000
+        self.queue = None
+        self.task = None
+        # Uma thread só: os forwards nunca competem entre si pela CPU
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="microbatch")
+        self.stats = {"batches": 0, "requests": 0, "windows": 0, "forward_seconds": 0.0}
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        # Quem ainda estava na fila recebe erro em vez de esperar para sempre
+        while self.queue is not None and not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Micro-batcher stopped"))
+        self.executor.shutdown(wait=False)
+
+    async def submit(self, windows):
+        # Embeddings das janelas de uma requisição, calculados junto com os das outras requisições da fila
+        if self.task is None:
+            raise RuntimeError("Micro-batcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((windows, future))
+        return await future
+
+    async def _collect(self):
+        # Primeiro item (espera o tempo que for) + o que já está na fila + o que chegar até o prazo ou até encher o lote
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        n_windows = len(batch[0][0])
+        # O que se acumulou durante o forward anterior entra sem esperar
+        while n_windows < self.max_windows and not self.queue.empty():
+            item = self.queue.get_nowait()
+            batch.append(item)
+            n_windows += len(item[0])
+        deadline = loop.time() + self.max_wait
+        while n_windows < self.max_windows:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            n_windows += len(item[0])
+        # Requisições canceladas (cliente desconectou) não entram no forward
+        return [(windows, future) for windows, future in batch if not future.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            lengths = [len(windows) for windows, _ in batch]
+            try:
+                start = time.perf_counter()
+                embeddings = await loop.run_in_executor(self.executor, self._forward, [w for w, _ in batch])
+                self.stats["forward_seconds"] += time.perf_counter() - start
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), chunk in zip(batch, torch.split(embeddings, lengths)):
+                if not future.done():
+                    future.set_result(chunk)
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            self.stats["windows"] += sum(lengths)
+
+    def _forward(self, tensors):
+        with torch.no_grad():
+            return self.forward(torch.cat(tensors))
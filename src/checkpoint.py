@@ -0,0 +1,120 @@
+"""
+Checkpoints e Early Stopping do treino few-shot.
+Antes o train_fewshot.py rodava sempre as 50 épocas e só salvava o eeg_model.pth no final:
+uma queda ou um Ctrl+C perdia o treino inteiro.
+Aqui:
+    1- o checkpoint guarda modelo, optimizer, histórico, early stopping e o estado de todos os geradores
+       aleatórios (Python, NumPy, PyTorch e o sorteio dos episódios), então o treino retomado segue igual
+    2- a escrita é atômica (arquivo temporário + rename): uma queda no meio nunca corrompe o último checkpoint
+    3- o EarlyStopping acompanha uma métrica da validação e guarda os pesos da melhor época
+"""
+import os
+import random
+from pathlib import Path
+import numpy as np
+import torch
+import config
+
+CHECKPOINT_VERSION = 1
+LAST_CHECKPOINT = "last.pt"
+BEST_MODEL = "best.pth"
+
+def capture_rng_state():
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+def restore_rng_state(state):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+def save_checkpoint(state, checkpoint_dir=config.CHECKPOINT_DIR):
+    # Sobrescreve o last.pt de forma atômica. Retorna o caminho
+    checkpoint_dir = Path(checkpoint_dir)
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    path = checkpoint_dir / LAST_CHECKPOINT
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    torch.save({"version": CHECKPOINT_VERSION, **state}, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+def save_best_model(state_dict, checkpoint_dir=config.CHECKPOINT_DIR):
+    # Só os pesos, no mesmo formato do eeg_model.pth (o inference.py carrega direto)
+    checkpoint_dir = Path(checkpoint_dir)
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    path = checkpoint_dir / BEST_MODEL
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    torch.save(state_dict, tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+def load_checkpoint(checkpoint_dir=config.CHECKPOINT_DIR, map_location="cpu"):
+    # Último checkpoint da pasta, ou None se não houver
+    path = Path(checkpoint_dir) / LAST_CHECKPOINT
+    if not path.exists():
+        return None
+    # weights_only=False: o checkpoint tem o estado dos geradores (tuplas e arrays do NumPy), não só tensores
+    checkpoint = torch.load(path, map_location=map_location, weights_only=False)
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint version {checkpoint.get('version')} not supported (expected {CHECKPOINT_VERSION})")
+    return checkpoint
+
+class EarlyStopping:
+    """
+    Para o treino quando a métrica da validação não melhora por `patience` validações seguidas.
+    mode="min" para loss, "max" para acurácia. Guarda uma cópia (CPU) dos pesos da melhor validação.
+    """
+    def __init__(self, patience=config.EARLY_STOP_PATIENCE, metric=config.EARLY_STOP_METRIC, min_delta=0.0, mode=None):
+        self.patience = patience
+        self.metric = metric
+        self.min_delta = min_delta
+        self.mode = mode or ("max" if metric.endswith("acc") else "min")
+        self.best = None
+        self.best_epoch = None
+        self.best_state = None
+        self.bad_validations = 0
+
+    def is_improvement(self, value):
+        if self.best is None:
+            return True
+        if self.mode == "min":
+            return value < self.best - self.min_delta
+        return value > self.best + self.min_delta
+
+    def step(self, entry, model):
+        # Recebe a entrada do histórico da validação. Retorna True se foi a melhor até agora
+        value = entry[self.metric]
+        if self.is_improvement(value):
+            self.best = value
+            self.best_epoch = entry["epoch"]
+            self.best_state = {k: v.detach().cpu().clone() for k, v in model.state_dict().items()}
+            self.bad_validations = 0
+            return True
+        self.bad_validations += 1
+        return False
+
+    @property
+    def should_stop(self):
+        return self.patience is not None and self.bad_validations >= self.patience
+
+    def state_dict(self):
+        return {
+            "best": self.best,
+            "best_epoch": self.best_epoch,
+            "best_state": self.best_state,
+            "bad_validations": self.bad_validations,
+        }
+
+    def load_state_dict(self, state):
+        self.best = state["best"]
+        self.best_epoch = state["best_epoch"]
+        self.best_state = state["best_state"]
+        self.bad_validations = state["bad_validations"]
@@ -6,6 +6,7 @@ PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 RAW_DATA_DIR = DATA_DIR / "raw"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
+READ_CACHE_DIR = DATA_DIR / "cache" / "raw" # cache binário (.npy) dos .txt lidos
 MODELS_DIR = PROJECT_ROOT / "results" / "saved_models"
 FIGURES_DIR = PROJECT_ROOT / "results" / "figures"
 
@@ -27,4 +28,67 @@ CHANNELS = [
 # Configurações de Processamento. Filtrar as frequências inúteis
 FILTER_LOW = 1.0 # Remove drift lento
 FILTER_HIGH = 40.0 # Remove ruído de rede elétrica/muscular alta
-EPOCH_LENGTH = 4.0 # tamanho da janela que a IA vai ler 
\ No newline at end of file
+EPOCH_LENGTH = 4.0 # tamanho da janela que a IA vai ler 
+EPOCH_HOP = 4.0 # distância (s) entre o início de duas janelas. Igual ao EPOCH_LENGTH = sem sobreposição
+PREPROCESS_WORKERS = 1 # processos usados no process_dataset (None = todos os núcleos)
+USE_READ_CACHE = True # guarda os .txt lidos pelo process_dataset como .npy em READ_CACHE_DIR
+FEATURE_STORE_DTYPE = "float32" # tipo dos shards do Feature Store ("float16" reduz o disco/memória pela metade)
+WRITE_LEGACY_ARRAYS = True # também salva o X_stew.npy/Y_stew.npy monolíticos
+
+# Configurações da STFT (Espectrograma)
+STFT_NPERSEG = 64 # tamanho de cada segmento da STFT (0.5s)
+STFT_NOVERLAP = 32 # sobreposição entre segmentos (50%)
+PREPROCESS_DTYPE = "float32" # precisão do filtro e da STFT ("float64" = caminho de referência, o dobro da memória)
+
+# Configurações do DataLoader
+LOADER_WORKERS = min(2, os.cpu_count() or 1) # processos que leem os batches do Feature Store em paralelo (0 = no processo principal)
+LOADER_PREFETCH = 4 # batches adiantados por worker
+
+# Configurações do Few-Shot (episódios N-way K-shot)
+EPISODE_N_WAY = 2 # classes por episódio (lo/hi)
+EPISODE_K_SHOT = 5 # janelas de suporte por classe (formam o protótipo)
+EPISODE_N_QUERY = 11 # janelas de query por classe. 2 x (5 + 11) = 32 janelas, o mesmo custo do batch de 32
+EVAL_EPISODES = 2000 # episódios sorteados na avaliação (média + intervalo de confiança)
+EMBEDDING_DIM = 64 # tamanho do embedding do EEGEmbedding
+
+# Instrumentação do treino (profiling.py), desligada por padrão
+PROFILE_TRAINING = False # timers por etapa, amostras/s e pico de memória por época
+PROFILE_DIR = PROJECT_ROOT / "results" / "profiling" # stages.json e traces do torch.profiler
+
+# Checkpoints e Early Stopping (checkpoint.py)
+CHECKPOINT_DIR = MODELS_DIR / "checkpoints" # last.pt (treino completo) e best.pth (pesos da melhor validação)
+CHECKPOINT_EVERY = 1 # épocas entre checkpoints (o modelo é pequeno, salvar toda época custa pouco)
+EARLY_STOP_METRIC = "val_loss" # métrica da validação acompanhada (val_loss: menor é melhor, val_acc: maior é melhor)
+EARLY_STOP_PATIENCE = 4 # validações seguidas sem melhora antes de parar (4 x 5 épocas)
+VAL_FRACTION = 0.2 # fração dos sujeitos do treino separada para a validação (early stopping e melhor época)
+
+# Modo de execução do EEGEmbedding (execution.py): "fp32" ou combinações com "+" de bf16, channels_last e compile
+EXECUTION_MODE = "fp32"
+
+# Busca de hiperparâmetros (sweep.py)
+SWEEP_DIR = PROJECT_ROOT / "results" / "sweeps" # <nome>.json com os trials + checkpoints de cada trial
+
+# Backend de inferência do BurnoutSystem (backends.py): "eager", "torchscript", "onnx" (export_model.py) ou "int8" (quantization.py)
+INFERENCE_BACKEND = "eager"
+INFERENCE_MAX_BATCH = 256 # janelas por forward no predict_patients (vários pacientes no mesmo lote; lotes maiores estouram o cache da conv1)
+INFERENCE_PACK_WINDOWS = 32 # no predict_patients, só pacientes com menos janelas que isso dividem um forward (acima disso o lote não rende)
+INFERENCE_PREPROCESS_WORKERS = min(4, os.cpu_count() or 1) # threads que pré-processam os arquivos no predict_patients
+
+# Micro-batching do servidor (batching.py): requisições que chegam juntas dividem o mesmo forward
+BATCHER_ENABLED = True
+BATCHER_MAX_WINDOWS = 256 # fecha o lote quando juntar essa quantidade de janelas
+BATCHER_MAX_WAIT_MS = 0.0 # espera extra por mais pacientes. 0 = só o que chegou durante o forward anterior (menor p99 nos testes)
+
+# Controle de carga do servidor (admission.py)
+SERVER_WORKERS = min(4, os.cpu_count() or 1) # threads do trabalho de CPU do /predict (pré-processamento, Grad-CAM, gráficos)
+SERVER_QUEUE_DEPTH = 8 # requisições esperando uma thread livre; acima disso o /predict responde na hora
+SERVER_OVERLOAD_STATUS = 503 # 503 (Service Unavailable) ou 429 (Too Many Requests), sempre com Retry-After
+
+# Modo do servidor: "threads" (um BurnoutSystem, micro-batching) ou "processes" (worker_pool.py, pesos compartilhados)
+SERVER_MODE = "threads"
+POOL_WORKERS = os.cpu_count() or 1 # processos de inferência no modo "processes"
+POOL_THREADS = 1 # threads do PyTorch em cada processo (POOL_WORKERS x POOL_THREADS <= núcleos)
+
+# Quantização int8 (quantization.py): motor dos kernels int8 e janelas do X_stew usadas para calibrar a conv1
+QUANT_ENGINE = "x86" # "x86"/"fbgemm" em Intel/AMD, "qnnpack" em ARM
+QUANT_CALIBRATION_WINDOWS = 1024
@@ -0,0 +1,180 @@
+"""
+Validação cruzada do treino few-shot (Ablation Study), dentro do próprio Python.
+Antes o run_batch.py rodava o train_fewshot.py 5 vezes em sequência (subprocess) e lia o Loss do print,
+e o plot_ablation.py tinha as médias escritas à mão.
+Aqui:
+    1- os folds são montados com Isolamento de Sujeito (sujeitos inteiros no teste) ou Random Split (janelas misturadas)
+    2- cada fold treina em um processo do pool, com um número fixo de threads do PyTorch por processo
+    3- o resultado de cada fold (histórico completo) e o resumo (média e desvio) vão para um JSON,
+       que o results/ablation_study/plot_ablation.py lê direto
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+import torch
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import config
+from feature_store import open_feature_store
+
+SPLITS = ("subject", "random")
+DEFAULT_OUTPUT = config.PROJECT_ROOT / "results" / "ablation_study" / "cv_results.json"
+
+def make_folds(labels, subjects, split="subject", n_folds=5, seed=0):
+    """
+    Índices (treino, teste) de cada fold.
+    subject: os sujeitos são embaralhados e divididos em n_folds grupos; cada grupo é o teste de um fold.
+    random: as janelas são embaralhadas e divididas em n_folds partes (o mesmo sujeito cai no treino e no teste).
+    """
+    rng = np.random.default_rng(seed)
+    all_indices = np.arange(len(labels))
+
+    if split == "subject":
+        unique_subjects = np.unique(subjects)
+        if len(unique_subjects) < n_folds:
+            raise ValueError(f"Subject split needs at least {n_folds} subjects, found {len(unique_subjects)}")
+        groups = np.array_split(rng.permutation(unique_subjects), n_folds)
+        test_sets = [all_indices[np.isin(subjects, group)] for group in groups]
+    elif split == "random":
+        test_sets = [np.sort(part) for part in np.array_split(rng.permutation(all_indices), n_folds)]
+    else:
+        raise ValueError(f"Unknown split '{split}'. Use one of {SPLITS}")
+
+    return [(np.setdiff1d(all_indices, test_idx), test_idx) for test_idx in test_sets]
+
+def init_worker(threads):
+    # Cada processo usa poucas threads: vários folds em paralelo rendem mais que um fold com todas as threads
+    torch.set_num_threads(threads)
+
+def run_fold(split, fold, train_indices, test_indices, num_epochs, seed, device="cpu"):
+    """
+    Treina um fold e devolve o resultado como dicionário (serializável em JSON).
+    Fica no nível do módulo para poder ser enviado aos processos do pool.
+    """
+    # Import aqui: o train_fewshot importa o model/data_loader, que só são necessários dentro do worker
+    from data_loader import EEGDataset
+    from train_fewshot import train_model
+
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+
+    start = time.perf_counter()
+    train_dataset = EEGDataset(indices=train_indices)
+    test_dataset = EEGDataset(indices=test_indices)
+    # Sem workers do DataLoader: o paralelismo já está nos folds
+    _, history = train_model(train_dataset, test_dataset, num_epochs=num_epochs, device=torch.device(device),
+                             num_workers=0, verbose=False)
+    final = history[-1]
+
+    return {
+        "split": split,
+        "fold": fold,
+        "seed": seed,
+        "train_samples": len(train_indices),
+        "test_samples": len(test_indices),
+        "test_subjects": sorted(int(s) for s in np.unique(test_dataset.subjects)),
+        "val_loss": final["val_loss"],
+        "val_acc": final["val_acc"],
+        "val_ci95": final["val_ci95"],
+        "history": history,
+        "seconds": time.perf_counter() - start,
+    }
+
+def summarize(fold_results):
+    # Média e desvio padrão entre os folds de cada split
+    summary = {}
+    for split in sorted({r["split"] for r in fold_results}):
+        accs = np.array([r["val_acc"] for r in fold_results if r["split"] == split])
+        losses = np.array([r["val_loss"] for r in fold_results if r["split"] == split])
+        summary[split] = {
+            "folds": len(accs),
+            "acc_mean": float(accs.mean()),
+            "acc_std": float(accs.std()),
+            "loss_mean": float(losses.mean()),
+            "loss_std": float(losses.std()),
+        }
+    return summary
+
+def save_results(results, output_path):
+    # Escreve em um arquivo temporário e renomeia, para nunca deixar um JSON pela metade
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp_path, output_path)
+
+def load_results(output_path=DEFAULT_OUTPUT):
+    with open(output_path, 'r') as f:
+        return json.load(f)
+
+def run_cross_validation(splits=SPLITS, n_folds=5, num_epochs=50, n_workers=None, threads_per_worker=1,
+                         seed=0, output_path=DEFAULT_OUTPUT):
+    """
+    Roda todos os folds de todos os splits em um pool de processos e salva o JSON em output_path.
+    n_workers=None usa um processo por núcleo dividido por threads_per_worker.
+    """
+    store = open_feature_store() # levanta FileNotFoundError se o preprocessing.py não foi rodado
+    labels, subjects = store.labels, store.subjects
+
+    jobs = []
+    for split in splits:
+        for fold, (train_idx, test_idx) in enumerate(make_folds(labels, subjects, split, n_folds, seed)):
+            jobs.append((split, fold, train_idx, test_idx, num_epochs, seed + fold))
+
+    if n_workers is None:
+        n_workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+    n_workers = min(n_workers, len(jobs))
+    print(f"Cross-validation: {len(jobs)} folds ({', '.join(splits)}) on {n_workers} processes x {threads_per_worker} threads")
+
+    start = time.perf_counter()
+    fold_results = []
+    # spawn: processos novos, sem herdar o estado de threads do PyTorch do processo principal
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                             initializer=init_worker, initargs=(threads_per_worker,)) as executor:
+        futures = [executor.submit(run_fold, *job) for job in jobs]
+        for future in futures:
+            result = future.result()
+            fold_results.append(result)
+            print(f" -> {result['split']:<7} fold {result['fold']}: Acc {result['val_acc']*100:.2f}% | "
+                  f"Loss {result['val_loss']:.4f} ({result['seconds']:.1f}s)")
+
+    results = {
+        "config": {
+            "n_folds": n_folds,
+            "num_epochs": num_epochs,
+            "seed": seed,
+            "n_way": config.EPISODE_N_WAY,
+            "k_shot": config.EPISODE_K_SHOT,
+            "n_query": config.EPISODE_N_QUERY,
+            "eval_episodes": config.EVAL_EPISODES,
+        },
+        "summary": summarize(fold_results),
+        "folds": fold_results,
+        "wall_seconds": time.perf_counter() - start,
+    }
+    save_results(results, output_path)
+
+    for split, stats in results["summary"].items():
+        print(f"{split:<7} -> Acc: {stats['acc_mean']*100:.2f}% ± {stats['acc_std']*100:.2f} | "
+              f"Loss: {stats['loss_mean']:.4f} ± {stats['loss_std']:.4f}")
+    print(f"Total time: {results['wall_seconds']:.1f}s. Saved in {output_path}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run subject-isolated and random-split cross-validation")
+    parser.add_argument("--splits", nargs="+", choices=SPLITS, default=list(SPLITS))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=None, help="Parallel folds (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="PyTorch threads per process")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT))
+    args = parser.parse_args()
+
+    run_cross_validation(args.splits, args.folds, args.epochs, args.workers, args.threads, args.seed, args.output)
@@ -1,28 +1,94 @@
+"""
+Dataset e DataLoader do PyTorch em cima do Feature Store.
+Antes o dataset inteiro virava um tensor na GPU (TensorDataset), limitado pela memória do device.
+Agora:
+    1- as janelas ficam no disco (shards com mmap) e só o batch pedido é lido
+    2- cada batch é lido de uma vez (store.get), não janela por janela
+    3- workers leem os próximos batches em paralelo (prefetch) enquanto a rede treina
+    4- com GPU, os batches saem em memória fixada (pin_memory) para a cópia assíncrona (non_blocking)
+    5- opcionalmente, um sampler balanceado sorteia as classes com a mesma probabilidade
+"""
 import numpy as np
 import torch
-from torch.utils.data import TensorDataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, BatchSampler, RandomSampler, SequentialSampler, WeightedRandomSampler
+import config
+from feature_store import open_feature_store
 
-def get_data_loaders(batch_size=5):
-    # Função que lê os arquivos .npy e devolve o DataLoader pronto
+class EEGDataset(Dataset):
+    """
+    Janelas do Feature Store (ou só as de indices) como Dataset do PyTorch.
+    dataset[i] devolve (X (14, 33, 17), Y) e dataset[[i, j, ...]] devolve o batch (X (B, 14, 33, 17), Y (B,)).
+    O store é aberto de forma preguiçosa em cada processo: os workers não recebem uma cópia dos dados, só o caminho.
+    """
+    def __init__(self, data_dir=config.PROCESSED_DATA_DIR, indices=None):
+        self.data_dir = data_dir
+        self.store = open_feature_store(data_dir) # levanta FileNotFoundError se não houver dados
+        self.indices = np.arange(len(self.store)) if indices is None else np.asarray(indices, dtype=np.int64)
+        self.labels = self.store.labels[self.indices]
+        self.subjects = self.store.subjects[self.indices]
 
-    # Escolhe se usa Placa de Video (GPU) ou o Processador (CPU)
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    def __getstate__(self):
+        # Ao enviar o dataset para um worker, o store (arrays em mmap) não vai junto; o worker reabre o seu
+        state = self.__dict__.copy()
+        state["store"] = None
+        return state
 
-    # Carregar os arquivos .npy salvos pelo preprocessing.py
-    try:
-        X_numpy = np.load('data/processed/X_stew.npy')
-        Y_numpy = np.load('data/processed/Y_stew.npy')
+    def __len__(self):
+        return len(self.indices)
 
-        # Converter numpy para tensor
-        X_tensor = torch.from_numpy(X_numpy).float().to(device)
-        Y_tensor = torch.from_numpy(Y_numpy).long().to(device)
+    def __getitem__(self, idx):
+        if self.store is None:
+            self.store = open_feature_store(self.data_dir)
 
-        # Criar o dataset e o loader. Ele pega o dataset inteiro e serve batches de 5 amostras por vez
-        dataset = TensorDataset(X_tensor, Y_tensor)
-        data_loader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+        if np.ndim(idx) == 0:
+            X = self.store[self.indices[idx]]
+            return torch.from_numpy(X), torch.tensor(self.labels[idx], dtype=torch.long)
 
-        return data_loader
+        # Batch inteiro em uma leitura (linhas ordenadas por shard)
+        idx = np.asarray(idx, dtype=np.int64)
+        X = self.store.get(self.indices[idx])
+        return torch.from_numpy(X), torch.from_numpy(self.labels[idx]).long()
 
-    except FileNotFoundError:
-        print("ERROR: .NPY FILE NOT FOUND")
-        exit()
\ No newline at end of file
+def make_balanced_sampler(labels, num_samples=None, generator=None):
+    # Peso de cada janela = 1 / frequência da sua classe. Cada época sorteia (com reposição) as classes por igual
+    labels = np.asarray(labels)
+    classes, counts = np.unique(labels, return_counts=True)
+    class_weight = dict(zip(classes, 1.0 / counts))
+    weights = torch.as_tensor([class_weight[label] for label in labels], dtype=torch.double)
+    return WeightedRandomSampler(weights, num_samples=num_samples or len(labels), replacement=True, generator=generator)
+
+def make_loader(dataset, batch_size=32, shuffle=True, balanced=False, drop_last=False,
+                num_workers=config.LOADER_WORKERS, prefetch_factor=config.LOADER_PREFETCH, generator=None,
+                batch_sampler=None):
+    """
+    DataLoader que busca um batch inteiro por chamada do dataset.
+    A ordem vem de um sampler (aleatório, sequencial ou balanceado) agrupado pelo BatchSampler,
+    ou de um batch_sampler pronto (ex: episodes.EpisodeSampler, um episódio por batch).
+    """
+    if batch_sampler is None:
+        if balanced:
+            sampler = make_balanced_sampler(dataset.labels, generator=generator)
+        elif shuffle:
+            sampler = RandomSampler(dataset, generator=generator)
+        else:
+            sampler = SequentialSampler(dataset)
+        batch_sampler = BatchSampler(sampler, batch_size=batch_size, drop_last=drop_last)
+
+    extra = {}
+    if num_workers > 0:
+        extra = dict(prefetch_factor=prefetch_factor, persistent_workers=True)
+
+    # batch_size=None: o batch_sampler entrega a lista de índices e o dataset devolve o batch pronto
+    return DataLoader(dataset,
+                      sampler=batch_sampler,
+                      batch_size=None,
+                      num_workers=num_workers,
+                      pin_memory=torch.cuda.is_available(),
+                      **extra)
+
+def get_data_loaders(batch_size=5, indices=None, shuffle=True, balanced=False, num_workers=config.LOADER_WORKERS):
+    # Função que abre o Feature Store e devolve o DataLoader pronto
+    # Os batches ficam na CPU; quem treina move cada um para o device (to(device, non_blocking=True))
+    # Levanta FileNotFoundError se o preprocessing.py ainda não foi rodado
+    dataset = EEGDataset(indices=indices)
+    return make_loader(dataset, batch_size=batch_size, shuffle=shuffle, balanced=balanced, num_workers=num_workers)
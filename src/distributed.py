@@ -0,0 +1,231 @@
+"""
+Treino few-shot em paralelo de dados (vários processos na CPU) com torch.distributed (backend gloo).
+Cada processo treina em episódios inteiros:
+    1- cada processo sorteia os próprios episódios (EpisodeSampler com a semente + rank), todos com o mesmo formato
+    2- protótipos, distâncias e perda de cada episódio são locais (o mesmo passo do train_fewshot.train_one_epoch)
+    3- no backward, o DDP tira a média dos gradientes entre os processos (um all-reduce por passo) e todos dão o mesmo passo
+    4- na validação, cada processo calcula os embeddings de uma fatia da validação e todos recebem o conjunto (all-gather)
+A validação (early stopping e melhor época) usa sujeitos tirados do treino, como no train_fewshot.py; o teste é
+avaliado uma vez no fim, no modelo devolvido, do mesmo jeito (fatias + all-gather).
+Um passo com N processos vale N episódios; a época tem os mesmos episódios do train_model (divididos entre os
+processos), então cada processo faz ~1/N dos passos. Com 1 processo é exatamente o train_model (mesma semente).
+O número de processos não depende do tamanho do episódio (só precisa de uma janela de validação e uma de teste por processo).
+
+Uso local (N processos na mesma máquina):
+    python3 src/distributed.py --nproc 4 --threads 2
+Várias máquinas (rodar em cada uma, mudando o --node-rank):
+    python3 src/distributed.py --nproc 8 --nnodes 2 --node-rank 0 --master-addr 10.0.0.1
+Também funciona com o torchrun (RANK, WORLD_SIZE e MASTER_ADDR vêm das variáveis de ambiente):
+    torchrun --nnodes 2 --nproc-per-node 8 --rdzv-endpoint 10.0.0.1:29500 src/distributed.py
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+
+import config
+from checkpoint import EarlyStopping
+from data_loader import EEGDataset, make_loader
+from episodes import EpisodeSampler, evaluate_episodes
+from execution import ExecutionMode
+from model import EEGEmbedding
+from prototypes import save_prototypes_for_model
+from train_fewshot import train_one_epoch
+
+def gather_embeddings(local_embeddings, total, group=None):
+    # Junta as fatias intercaladas (rank, rank + world_size, ...) de todos os processos na ordem original
+    world_size = dist.get_world_size(group)
+    per_rank = -(-total // world_size)
+    padded = local_embeddings.new_zeros(per_rank, local_embeddings.size(1))
+    padded[:len(local_embeddings)] = local_embeddings
+    gathered = [torch.empty_like(padded) for _ in range(world_size)]
+    dist.all_gather(gathered, padded, group=group)
+    return torch.stack(gathered, dim=1).reshape(-1, local_embeddings.size(1))[:total]
+
+def train_one_epoch_distributed(model, train_loader, optimizer, device, execution, group=None):
+    """
+    Uma época nos episódios deste processo, com o mesmo passo do train_fewshot.train_one_epoch.
+    No backward, o DDP tira a média dos gradientes dos N episódios (um por processo): um all-reduce por passo.
+    Retorna (loss médio, acurácia média) de todos os processos.
+    """
+    loss, accuracy = train_one_epoch(model, train_loader, optimizer, torch.nn.CrossEntropyLoss(), device=device,
+                                     execution=execution)
+    # Todos os processos fazem o mesmo número de episódios: a média das médias é a média da época
+    stats = torch.tensor([loss, accuracy], dtype=torch.float64)
+    dist.all_reduce(stats, group=group)
+    stats /= dist.get_world_size(group)
+    return stats[0].item(), stats[1].item()
+
+def validate_distributed(model, loader, labels, device, execution, group=None):
+    # Embeddings da fatia local (validação ou teste), juntados em todos os processos; a avaliação em episódios é igual em todos
+    model.eval()
+    with torch.no_grad():
+        local = torch.cat([execution.embed(model, inputs.to(device, non_blocking=True), device) for inputs, _ in loader])
+        embeddings = gather_embeddings(local, len(labels), group)
+        return evaluate_episodes(embeddings, labels)
+
+def split_indices(total_size, seed):
+    # Divisão 80/20 igual em todos os processos (mesma semente)
+    permutation = np.random.default_rng(seed).permutation(total_size)
+    train_size = int(0.8 * total_size)
+    return permutation[:train_size], permutation[train_size:]
+
+def run_worker(rank, world_size, num_epochs=50, lr=0.0001, eval_every=5, seed=0, threads=1, patience=None,
+               execution=None, train_indices=None, test_indices=None, val_indices=None, model_path=None,
+               embedding_dim=config.EMBEDDING_DIM, k_shot=config.EPISODE_K_SHOT, n_query=config.EPISODE_N_QUERY):
+    """
+    Corpo de cada processo (o processo group já deve estar iniciado).
+    O rank 0 salva os pesos em model_path e o histórico em model_path com extensão .json.
+    val_indices=None separa a validação dos sujeitos do treino (FeatureStore.subject_split com config.VAL_FRACTION,
+    igual em todos os processos). patience acompanha só a validação; o teste entra uma vez no fim, na última
+    entrada do histórico (test_loss, test_acc, test_ci95), como no train_model com val_dataset.
+    embedding_dim, k_shot e n_query têm o mesmo papel do train_model.
+    """
+    torch.set_num_threads(threads)
+    device = torch.device("cpu")
+    execution = ExecutionMode.parse(execution)
+    # Grupo separado para a validação e as estatísticas: as coletivas do DDP nunca disputam o mesmo canal
+    group = dist.new_group(backend="gloo")
+
+    if train_indices is None:
+        train_indices, test_indices = split_indices(len(EEGDataset()), seed)
+    if val_indices is None:
+        # Determinística (ordem dos sujeitos no store): todos os processos separam a mesma validação
+        train_indices, val_indices = EEGDataset().store.subject_split(config.VAL_FRACTION, indices=train_indices)
+    for split_name, indices in (("validation", val_indices), ("test", test_indices)):
+        if len(indices) < world_size:
+            raise ValueError(f"{len(indices)} {split_name} windows for {world_size} processes")
+    train_dataset = EEGDataset(indices=train_indices)
+    val_dataset = EEGDataset(indices=val_indices)
+    test_dataset = EEGDataset(indices=test_indices)
+    local_val = EEGDataset(indices=np.asarray(val_indices)[rank::world_size])
+    local_test = EEGDataset(indices=np.asarray(test_indices)[rank::world_size])
+
+    # Mesma ordem de sorteios do train_model: semente dos episódios e depois os pesos iniciais
+    torch.manual_seed(seed)
+    episode_size = config.EPISODE_N_WAY * (k_shot + n_query)
+    # Os episódios de uma época do train_model divididos entre os processos (todos fazem o mesmo número de passos)
+    n_episodes = max(1, len(train_dataset) // episode_size)
+    episodes = EpisodeSampler(train_dataset.labels, k_shot=k_shot, n_query=n_query,
+                              n_episodes=-(-n_episodes // world_size), seed=int(torch.randint(2**31, (1,))) + rank)
+    # Sem workers do DataLoader: o paralelismo já está nos processos
+    train_loader = make_loader(train_dataset, batch_sampler=episodes, num_workers=0)
+    val_loader = make_loader(local_val, batch_size=256, shuffle=False, num_workers=0)
+
+    model = EEGEmbedding(embedding_dim=embedding_dim).to(device)
+    ddp_model = DistributedDataParallel(execution.prepare(model))
+    optimizer = torch.optim.Adam(params=ddp_model.parameters(), lr=lr)
+    stopper = EarlyStopping(patience=patience)
+
+    history = []
+    for epoch in range(num_epochs):
+        train_loss, train_acc = train_one_epoch_distributed(ddp_model, train_loader, optimizer, device, execution, group)
+
+        if (epoch + 1) % eval_every == 0 or epoch + 1 == num_epochs:
+            val_result = validate_distributed(ddp_model, val_loader, val_dataset.labels, device, execution, group)
+            entry = {
+                "epoch": epoch + 1,
+                "train_loss": train_loss,
+                "train_acc": train_acc,
+                "val_loss": val_result["loss"],
+                "val_acc": val_result["accuracy"],
+                "val_ci95": val_result["ci95"],
+            }
+            history.append(entry)
+            stopper.step(entry, model)
+
+            if rank == 0:
+                print(f"Epoch: {epoch+1}/{num_epochs} ({world_size} processes)")
+                print(f"   Train -> Loss: {train_loss:.4f} | Acc: {train_acc*100:.2f}%")
+                print(f"   Val   -> Error (Loss): {val_result['loss']:.4f} | Acc: {val_result['accuracy']*100:.2f}% ± {val_result['ci95']*100:.2f}")
+                print("-" * 60)
+
+            # A validação é igual em todos os processos, então todos param juntos
+            if stopper.should_stop:
+                if rank == 0:
+                    print(f"Early stopping (best: epoch {stopper.best_epoch})")
+                break
+
+    if patience is not None and stopper.best_state is not None:
+        model.load_state_dict(stopper.best_state)
+
+    # Teste uma vez só, no modelo escolhido pela validação
+    if history:
+        test_loader = make_loader(local_test, batch_size=256, shuffle=False, num_workers=0)
+        test_result = validate_distributed(ddp_model, test_loader, test_dataset.labels, device, execution, group)
+        history[-1].update({"test_loss": test_result["loss"], "test_acc": test_result["accuracy"],
+                            "test_ci95": test_result["ci95"]})
+        if rank == 0:
+            print(f"Test -> Error (Loss): {test_result['loss']:.4f} | Acc: {test_result['accuracy']*100:.2f}% ± {test_result['ci95']*100:.2f}")
+
+    if rank == 0 and model_path is not None:
+        model_path = Path(model_path)
+        model_path.parent.mkdir(parents=True, exist_ok=True)
+        torch.save(model.state_dict(), model_path)
+        save_prototypes_for_model(model, model_path, device=device)
+        with open(model_path.with_suffix(".json"), 'w') as f:
+            json.dump(history, f, indent=2)
+        print(f"Model saved in {model_path}")
+    return history
+
+def _spawned_worker(local_rank, node_rank, nproc, world_size, master_addr, master_port, kwargs):
+    rank = node_rank * nproc + local_rank
+    dist.init_process_group("gloo", init_method=f"tcp://{master_addr}:{master_port}", rank=rank, world_size=world_size)
+    try:
+        run_worker(rank, world_size, **kwargs)
+    finally:
+        dist.destroy_process_group()
+
+def launch(nproc, nnodes=1, node_rank=0, master_addr="127.0.0.1", master_port=29500, **kwargs):
+    """
+    Sobe nproc processos nesta máquina (ranks node_rank * nproc ... + nproc - 1 de nnodes * nproc).
+    kwargs vão para o run_worker. Retorna o histórico salvo pelo rank 0 (se model_path for dado e este for o nó 0).
+    """
+    world_size = nnodes * nproc
+    mp.spawn(_spawned_worker, args=(node_rank, nproc, world_size, master_addr, master_port, kwargs),
+             nprocs=nproc, join=True)
+    model_path = kwargs.get("model_path")
+    if node_rank == 0 and model_path is not None:
+        with open(Path(model_path).with_suffix(".json"), 'r') as f:
+            return json.load(f)
+    return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data-parallel few-shot training on CPU (gloo)")
+    parser.add_argument("--nproc", type=int, default=2, help="Processes on this machine")
+    parser.add_argument("--nnodes", type=int, default=1)
+    parser.add_argument("--node-rank", type=int, default=0)
+    parser.add_argument("--master-addr", default="127.0.0.1")
+    parser.add_argument("--master-port", type=int, default=29500)
+    parser.add_argument("--threads", type=int, default=1, help="PyTorch threads per process")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--lr", type=float, default=0.0001)
+    parser.add_argument("--embedding-dim", type=int, default=config.EMBEDDING_DIM)
+    parser.add_argument("--k-shot", type=int, default=config.EPISODE_K_SHOT, help="Support windows per class in an episode")
+    parser.add_argument("--n-query", type=int, default=config.EPISODE_N_QUERY, help="Query windows per class in an episode")
+    parser.add_argument("--patience", type=int, default=config.EARLY_STOP_PATIENCE,
+                        help="Validations without improvement on the validation subjects before stopping "
+                             "(0 disables early stopping)")
+    parser.add_argument("--execution", default=config.EXECUTION_MODE)
+    parser.add_argument("--output", default=str(config.MODELS_DIR / "eeg_model.pth"))
+    args = parser.parse_args()
+
+    kwargs = dict(num_epochs=args.epochs, lr=args.lr, seed=args.seed, threads=args.threads,
+                  patience=args.patience or None, execution=args.execution, model_path=args.output,
+                  embedding_dim=args.embedding_dim, k_shot=args.k_shot, n_query=args.n_query)
+
+    if "RANK" in os.environ and "WORLD_SIZE" in os.environ:
+        # Iniciado pelo torchrun: um processo por chamada, endereço do mestre nas variáveis de ambiente
+        dist.init_process_group("gloo")
+        try:
+            run_worker(dist.get_rank(), dist.get_world_size(), **kwargs)
+        finally:
+            dist.destroy_process_group()
+    else:
+        launch(args.nproc, args.nnodes, args.node_rank, args.master_addr, args.master_port, **kwargs)
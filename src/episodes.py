@@ -0,0 +1,204 @@
+"""
+Episódios N-way K-shot (Prototypical Networks de verdade).
+Cada episódio sorteia N classes, K janelas de suporte por classe (que formam os protótipos)
+e Q janelas de consulta (query) por classe, que são classificadas pela distância até os protótipos.
+
+    1- EpisodeSampler: sampler do PyTorch para o treino. As tabelas de índices por classe
+       (e por sujeito + classe) são montadas uma vez só, então sortear um episódio é só indexar.
+    2- evaluate_episodes: avalia milhares de episódios de uma vez sobre embeddings já calculados,
+       como uma única conta de tensores (sem passar pela rede de novo), com média e intervalo de confiança.
+
+Ordem das janelas de um episódio (a mesma no sampler e no split_episode):
+    [suporte classe 0 (K), suporte classe 1 (K), ..., query classe 0 (Q), query classe 1 (Q), ...]
+"""
+import numpy as np
+import torch
+from torch.utils.data import Sampler
+import config
+import utils
+
+def build_class_tables(labels):
+    # Classe -> índices das janelas daquela classe
+    labels = np.asarray(labels)
+    return {int(c): np.nonzero(labels == c)[0] for c in np.unique(labels)}
+
+def build_class_tables_masked(labels, mask):
+    # Igual ao build_class_tables, mas só com as janelas em que mask é True (índices continuam globais)
+    positions = np.nonzero(mask)[0]
+    return {int(c): positions[labels[positions] == c] for c in np.unique(labels[positions])}
+
+def build_subject_tables(labels, subjects):
+    # Sujeito -> (classe -> índices): usado para tirar o suporte e a query de sujeitos diferentes
+    labels, subjects = np.asarray(labels), np.asarray(subjects)
+    return {int(s): build_class_tables_masked(labels, subjects == s) for s in np.unique(subjects)}
+
+def episode_targets(n_way, n_per_class, device=None):
+    # Labels relativos ao episódio: [0]*n, [1]*n, ... (a classe real não importa, só o protótipo)
+    return torch.arange(n_way, device=device).repeat_interleave(n_per_class)
+
+def split_episode(embeddings, n_way, k_shot):
+    """
+    Separa os embeddings de um episódio do EpisodeSampler em protótipos (N, 64),
+    embeddings de query (N*Q, 64) e os labels das queries (N*Q,).
+    """
+    n_support = n_way * k_shot
+    prototypes = embeddings[:n_support].reshape(n_way, k_shot, -1).mean(dim=1)
+    query = embeddings[n_support:]
+    targets = episode_targets(n_way, len(query) // n_way, device=embeddings.device)
+    return prototypes, query, targets
+
+class EpisodeSampler(Sampler):
+    """
+    Cada item é a lista de índices de um episódio (suporte + query), para usar como batch_sampler.
+    Com subjects, a query de cada episódio vem de um único sujeito e o suporte dos outros sujeitos
+    (o episódio imita um paciente novo comparado com os perfis de referência).
+    """
+    def __init__(self, labels, n_way=config.EPISODE_N_WAY, k_shot=config.EPISODE_K_SHOT,
+                 n_query=config.EPISODE_N_QUERY, n_episodes=100, subjects=None, seed=None):
+        self.n_way = n_way
+        self.k_shot = k_shot
+        self.n_query = n_query
+        self.n_episodes = n_episodes
+        self.rng = np.random.default_rng(seed)
+
+        labels = np.asarray(labels)
+        self.class_tables = build_class_tables(labels)
+        if len(self.class_tables) < n_way:
+            raise ValueError(f"{n_way}-way episodes need {n_way} classes, found {len(self.class_tables)}")
+
+        self.subject_tables = None
+        if subjects is not None:
+            subjects = np.asarray(subjects)
+            self.subject_tables = build_subject_tables(labels, subjects)
+            # Suporte de um sujeito = todas as janelas da classe, menos as dele
+            self.support_tables = {s: build_class_tables_masked(labels, subjects != s) for s in self.subject_tables}
+            # Só sujeitos com Q janelas em pelo menos N classes podem ser a query
+            self.query_subjects = [s for s, tables in self.subject_tables.items()
+                                   if sum(len(idx) >= n_query for idx in tables.values()) >= n_way]
+            if not self.query_subjects:
+                raise ValueError(f"No subject has {n_query} query windows in {n_way} classes")
+        else:
+            for c, idx in self.class_tables.items():
+                if len(idx) < k_shot + n_query:
+                    raise ValueError(f"Class {c} has {len(idx)} windows, episodes need {k_shot + n_query}")
+
+    def __len__(self):
+        return self.n_episodes
+
+    def state_dict(self):
+        # Estado do sorteio, para retomar o treino de um checkpoint com os mesmos episódios
+        return {"rng": self.rng.bit_generator.state}
+
+    def load_state_dict(self, state):
+        self.rng.bit_generator.state = state["rng"]
+
+    def sample_episode(self):
+        if self.subject_tables is None:
+            classes = self.rng.choice(list(self.class_tables), size=self.n_way, replace=False)
+            draws = [self.rng.choice(self.class_tables[c], size=self.k_shot + self.n_query, replace=False) for c in classes]
+            support = [d[:self.k_shot] for d in draws]
+            query = [d[self.k_shot:] for d in draws]
+        else:
+            subject = self.query_subjects[self.rng.integers(len(self.query_subjects))]
+            query_tables = self.subject_tables[subject]
+            candidates = [c for c, idx in query_tables.items()
+                          if len(idx) >= self.n_query and len(self.support_tables[subject].get(c, ())) >= self.k_shot]
+            classes = self.rng.choice(candidates, size=self.n_way, replace=False)
+            support = [self.rng.choice(self.support_tables[subject][c], size=self.k_shot, replace=False) for c in classes]
+            query = [self.rng.choice(query_tables[c], size=self.n_query, replace=False) for c in classes]
+        return np.concatenate(support + query).tolist()
+
+    def __iter__(self):
+        for _ in range(self.n_episodes):
+            yield self.sample_episode()
+
+def _sample_without_replacement(n, n_draw, n_episodes, generator):
+    # n_draw posições distintas entre 0 e n-1, para cada episódio: (E, n_draw)
+    if n_draw * 4 > n:
+        # Tabela pequena: as n_draw maiores chaves aleatórias de cada linha
+        return torch.rand((n_episodes, n), generator=generator).topk(n_draw, dim=1, sorted=False).indices
+    # Tabela grande: sorteio com reposição e novo sorteio só das linhas que repetiram alguma posição
+    # (rejeitar a linha inteira mantém o sorteio uniforme, e custa O(n_draw) por episódio em vez de O(n))
+    draws = torch.randint(n, (n_episodes, n_draw), generator=generator)
+    while True:
+        ordered = draws.sort(dim=1).values
+        repeated = (ordered[:, 1:] == ordered[:, :-1]).any(dim=1)
+        if not repeated.any():
+            return draws
+        draws[repeated] = torch.randint(n, (int(repeated.sum()), n_draw), generator=generator)
+
+def _draw(tables, classes, chosen, n_draw, n_episodes, generator):
+    """
+    Sorteia n_draw índices sem reposição de cada classe escolhida, para todos os episódios de uma vez.
+    chosen: (E, N) posição da classe em classes -> devolve (E, N, n_draw)
+    """
+    draws = torch.empty((n_episodes, len(classes), n_draw), dtype=torch.long)
+    for i, c in enumerate(classes):
+        table = torch.as_tensor(tables[c], dtype=torch.long)
+        if len(table) < n_draw:
+            raise ValueError(f"Class {c} has {len(table)} windows, episodes need {n_draw}")
+        draws[:, i] = table[_sample_without_replacement(len(table), n_draw, n_episodes, generator)]
+    return draws.gather(1, chosen.unsqueeze(-1).expand(-1, -1, n_draw))
+
+def evaluate_episodes(embeddings, labels, query_embeddings=None, query_labels=None,
+                      n_way=config.EPISODE_N_WAY, k_shot=config.EPISODE_K_SHOT, n_query=config.EPISODE_N_QUERY,
+                      n_episodes=config.EVAL_EPISODES, chunk_size=1000, seed=0):
+    """
+    Avalia n_episodes episódios N-way K-shot sobre embeddings já calculados (N_janelas, 64).
+    Sem query_embeddings, suporte e query saem do mesmo conjunto (sem repetir janela no episódio).
+    Com query_embeddings/query_labels, o suporte vem de embeddings e a query do outro conjunto
+    (ex: suporte dos sujeitos de referência, query dos sujeitos de teste).
+    Retorna {"accuracy", "ci95", "loss", "episodes"}: média das acurácias por episódio e o intervalo de 95%.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    device = embeddings.device
+    labels = np.asarray(labels.cpu() if torch.is_tensor(labels) else labels)
+    support_tables = build_class_tables(labels)
+
+    same_pool = query_embeddings is None
+    if same_pool:
+        query_embeddings, query_tables = embeddings, support_tables
+    else:
+        query_labels = np.asarray(query_labels.cpu() if torch.is_tensor(query_labels) else query_labels)
+        query_tables = build_class_tables(query_labels)
+
+    classes = sorted(set(support_tables) & set(query_tables))
+    if len(classes) < n_way:
+        raise ValueError(f"{n_way}-way episodes need {n_way} classes, found {len(classes)}")
+
+    targets = episode_targets(n_way, n_query, device=device)
+    accuracies, losses = [], []
+
+    for start in range(0, n_episodes, chunk_size):
+        n_chunk = min(chunk_size, n_episodes - start)
+
+        # Classes de cada episódio (todas, em ordem aleatória, quando n_way == número de classes)
+        chosen = torch.rand((n_chunk, len(classes)), generator=generator).argsort(dim=1)[:, :n_way]
+
+        if same_pool:
+            draws = _draw(support_tables, classes, chosen, k_shot + n_query, n_chunk, generator)
+            support_idx, query_idx = draws[..., :k_shot], draws[..., k_shot:]
+        else:
+            support_idx = _draw(support_tables, classes, chosen, k_shot, n_chunk, generator)
+            query_idx = _draw(query_tables, classes, chosen, n_query, n_chunk, generator)
+
+        # (E, N, K, 64) -> protótipos (E, N, 64); queries (E, N*Q, 64)
+        prototypes = embeddings[support_idx.to(device)].mean(dim=2)
+        query = query_embeddings[query_idx.to(device)].flatten(1, 2)
+
+        # Distâncias de todas as queries de todos os episódios: (E, N*Q, N)
+        dists = utils.calc_distance_matrix(query, prototypes)
+        predictions = torch.argmin(dists, dim=2)
+
+        accuracies.append((predictions == targets).float().mean(dim=1))
+        losses.append(torch.nn.functional.cross_entropy(
+            -dists.flatten(0, 1), targets.repeat(n_chunk), reduction='none').view(n_chunk, -1).mean(dim=1))
+
+    accuracies = torch.cat(accuracies)
+    losses = torch.cat(losses)
+    return {
+        "accuracy": accuracies.mean().item(),
+        "ci95": (1.96 * accuracies.std() / np.sqrt(len(accuracies))).item() if len(accuracies) > 1 else 0.0,
+        "loss": losses.mean().item(),
+        "episodes": len(accuracies),
+    }
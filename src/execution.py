@@ -0,0 +1,79 @@
+"""
+Modos de execução do EEGEmbedding (treino e inferência), sem mexer na definição do modelo.
+    1- bf16: autocast em bfloat16 (conv1 e fc1 em bf16; em CPUs com AVX512-BF16/AMX isso usa as instruções novas)
+    2- channels_last: conv1 (e o ReLU/MaxPool) em memória NHWC, o formato preferido do oneDNN na CPU
+    3- compile: torch.compile (Inductor gera kernels fundidos para o forward e o backward)
+Os modos se combinam com "+", ex: "bf16+channels_last+compile". "fp32" é o modo de sempre (eager, float32).
+O relatório de acurácia x vazão de cada modo é gerado pelo results/benchmarks/bench_execution.py.
+"""
+from contextlib import nullcontext
+import torch
+import config
+
+OPTIONS = ("fp32", "bf16", "channels_last", "compile")
+
+def _contiguous_output(module, inputs, output):
+    # Hook do pool: volta para NCHW antes do x.view(...) do forward (view não aceita NHWC)
+    return output.contiguous()
+
+class ExecutionMode:
+    """
+    Configuração de execução. prepare(model) devolve o módulo que deve ser chamado
+    (o próprio model, ou a versão compilada, que divide os mesmos pesos);
+    inputs(x) ajusta o formato da entrada e autocast() abre o contexto de precisão.
+    Os pesos salvos (state_dict) continuam sendo os do model original, em float32.
+    """
+    def __init__(self, bf16=False, channels_last=False, compile=False, compile_mode=None):
+        self.bf16 = bf16
+        self.channels_last = channels_last
+        self.compile = compile
+        self.compile_mode = compile_mode
+
+    @classmethod
+    def parse(cls, spec=None):
+        # "fp32", "bf16", "bf16+channels_last+compile", ... (None usa o config.EXECUTION_MODE)
+        spec = config.EXECUTION_MODE if spec is None else spec
+        if isinstance(spec, cls):
+            return spec
+        parts = {p.strip() for p in spec.split("+") if p.strip()}
+        unknown = parts - set(OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown execution option(s) {sorted(unknown)}. Use a '+' combination of {OPTIONS}")
+        return cls(bf16="bf16" in parts, channels_last="channels_last" in parts, compile="compile" in parts)
+
+    @property
+    def name(self):
+        parts = ["bf16" if self.bf16 else "fp32"]
+        if self.channels_last:
+            parts.append("channels_last")
+        if self.compile:
+            parts.append("compile")
+        return "+".join(parts)
+
+    def __repr__(self):
+        return f"ExecutionMode({self.name})"
+
+    def prepare(self, model):
+        if self.channels_last:
+            model.to(memory_format=torch.channels_last)
+            # Evita registrar o hook duas vezes se o mesmo modelo for preparado de novo
+            if not getattr(model, "_channels_last_hook", None):
+                model._channels_last_hook = model.pool.register_forward_hook(_contiguous_output)
+        if self.compile:
+            return torch.compile(model, mode=self.compile_mode)
+        return model
+
+    def inputs(self, x):
+        if self.channels_last and x.dim() == 4:
+            return x.contiguous(memory_format=torch.channels_last)
+        return x
+
+    def autocast(self, device):
+        if not self.bf16:
+            return nullcontext()
+        return torch.autocast(device_type=torch.device(device).type, dtype=torch.bfloat16)
+
+    def embed(self, runner, x, device):
+        # Forward completo no modo escolhido. Os embeddings saem sempre em float32 (distâncias e protótipos em fp32)
+        with self.autocast(device):
+            return runner(self.inputs(x)).float()
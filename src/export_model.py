@@ -0,0 +1,111 @@
+"""
+Exporta o EEGEmbedding treinado + protótipos para TorchScript e ONNX (backends.py).
+    python3 src/export_model.py                       -> eeg_model.torchscript.pt e eeg_model.onnx
+    python3 src/export_model.py --formats torchscript -> só o TorchScript
+Os protótipos vêm do eeg_model.prototypes.json (calculado e salvo se ainda não existir).
+Cada arquivo leva o hash dos pesos e dos dados e é conferido contra o modelo eager antes de terminar.
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+import numpy as np
+import torch
+
+import config
+import prototypes
+from backends import PrototypeScorer, TorchScriptBackend, OnnxBackend, EagerBackend, export_paths
+from execution import ExecutionMode
+from feature_store import open_feature_store
+from model import EEGEmbedding
+
+FORMATS = ("torchscript", "onnx")
+PARITY_TOLERANCE = 1e-4
+
+def load_scorer(model_path, data_dir=config.PROCESSED_DATA_DIR):
+    # Modelo eager + protótipos do artefato (com os hashes que vão nos metadados dos arquivos exportados)
+    state_dict = torch.load(model_path, map_location="cpu")
+    model = EEGEmbedding(embedding_dim=state_dict["fc1.weight"].shape[0])
+    model.load_state_dict(state_dict)
+    model.eval()
+
+    store = open_feature_store(data_dir)
+    model_sha256 = prototypes.model_hash(state_dict)
+    path = prototypes.artifact_path(model_path)
+    artifact = prototypes.load_artifact(path, model_sha256, prototypes.data_fingerprint(store, data_dir))
+    if artifact is None:
+        print(f"Building {path.name}")
+        artifact = prototypes.build_artifact(model, state_dict, data_dir)
+        prototypes.save_artifact(artifact, path)
+
+    metadata = {
+        "model_sha256": artifact["model_sha256"],
+        "data_sha256": artifact["data_sha256"],
+        "artifact_version": str(artifact["version"]),
+        "embedding_dim": str(artifact["embedding_dim"]),
+    }
+    scorer = PrototypeScorer(model, torch.tensor(artifact["prototypes"])).eval()
+    return scorer, metadata, store
+
+def export_torchscript(scorer, path, metadata):
+    # script + freeze: pesos e protótipos viram constantes do grafo
+    module = torch.jit.freeze(torch.jit.script(scorer))
+    torch.jit.save(module, str(path), _extra_files={"meta.json": json.dumps(metadata)})
+    return path
+
+def export_onnx(scorer, path, metadata, example):
+    import onnx # opcional: só para exportar (pip install onnx onnxscript)
+
+    # Eixo 0 (número de janelas do paciente) dinâmico
+    batch = torch.export.Dim("windows", min=1)
+    program = torch.onnx.export(scorer, (example,), dynamo=True, input_names=["spectrograms"],
+                                output_names=["embeddings", "distances"], dynamic_shapes={"x": {0: batch}})
+    program.optimize()
+    proto = program.model_proto
+    for key, value in metadata.items():
+        proto.metadata_props.add(key=key, value=value)
+    tmp_path = Path(path).with_suffix(f".{os.getpid()}.tmp")
+    onnx.save(proto, str(tmp_path))
+    os.replace(tmp_path, path)
+    return path
+
+def verify(backend, reference, x):
+    # Maior diferença absoluta (embeddings e distâncias) contra o modelo eager em fp32
+    embeddings, distances = backend(x)
+    ref_embeddings, ref_distances = reference(x)
+    return max((embeddings - ref_embeddings).abs().max().item(), (distances - ref_distances).abs().max().item())
+
+def export_model(model_path=config.MODELS_DIR / "eeg_model.pth", formats=FORMATS, data_dir=config.PROCESSED_DATA_DIR):
+    scorer, metadata, store = load_scorer(model_path, data_dir)
+    paths = export_paths(model_path)
+
+    # Janelas reais do Feature Store para o exemplo da exportação e para a paridade (tamanhos diferentes: eixo dinâmico)
+    example = torch.from_numpy(store.get(np.arange(min(8, len(store)))))
+    checks = [torch.from_numpy(store.get(np.arange(n))) for n in (1, min(37, len(store)))]
+    reference = EagerBackend(scorer.model, scorer.prototypes, ExecutionMode.parse("fp32"))
+
+    for fmt in formats:
+        if fmt == "torchscript":
+            export_torchscript(scorer, paths[fmt], metadata)
+            backend = TorchScriptBackend(paths[fmt], metadata)
+        elif fmt == "onnx":
+            export_onnx(scorer, paths[fmt], metadata, example)
+            backend = OnnxBackend(paths[fmt], metadata)
+        else:
+            raise ValueError(f"Unknown format '{fmt}'. Use one of {FORMATS}")
+
+        diff = max(verify(backend, reference, x) for x in checks)
+        status = "OK" if diff < PARITY_TOLERANCE else "FAILED"
+        print(f"{fmt:<12} -> {paths[fmt]} | max diff vs eager {diff:.1e} [{status}]")
+        if diff >= PARITY_TOLERANCE:
+            raise RuntimeError(f"{fmt} export differs from the eager model by {diff:.1e}")
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export EEGEmbedding + prototypes to TorchScript / ONNX")
+    parser.add_argument("--model", default=str(config.MODELS_DIR / "eeg_model.pth"))
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--data-dir", default=str(config.PROCESSED_DATA_DIR))
+    args = parser.parse_args()
+
+    export_model(Path(args.model), args.formats, Path(args.data_dir))
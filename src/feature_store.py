@@ -0,0 +1,212 @@
+"""
+Feature Store: guarda os espectrogramas separados por sujeito (shards) em vez de um único X_stew.npy.
+Todos os consumidores (treino, métricas, inferência, XAI, SVM) abrem os shards com mmap_mode,
+então só as janelas pedidas são lidas do disco e a memória não cresce com o tamanho do dataset.
+
+Estrutura em disco (data/processed/store):
+    sub01.npy, sub02.npy, ...   -> (N_janelas_do_sujeito, 14, 33, 17) em float32 ou float16
+    index.npz                   -> uma linha por janela: sujeito, condição (label), janela dentro da gravação, shard e linha no shard
+    meta.json                   -> dtype, shape de uma amostra e nomes dos shards
+
+A ordem do índice é a mesma ordem do X_stew.npy (arquivos ordenados), então a janela i do
+store é a linha i do X_stew.npy.
+"""
+import json
+import os
+import re
+import numpy as np
+from pathlib import Path
+import config
+
+def subject_from_filename(filename):
+    # sub01_lo.txt -> 1. Retorna -1 se o nome não tiver número.
+    match = re.search(r"(\d+)", Path(filename).stem)
+    return int(match.group(1)) if match else -1
+
+def shard_name(subject):
+    return f"sub{subject:02d}.npy" if subject >= 0 else "unknown.npy"
+
+def write_feature_store(store_path, recordings, dtype=config.FEATURE_STORE_DTYPE):
+    """
+    Escreve o store a partir das saídas de cada gravação.
+    recordings: lista de (sujeito, label, caminho do .npy da gravação), na ordem final desejada.
+    Cada shard é montado direto no disco (open_memmap), uma gravação por vez.
+    """
+    store_path = Path(store_path)
+    store_path.mkdir(parents=True, exist_ok=True)
+    dtype = np.dtype(dtype)
+
+    # Agrupa as gravações por sujeito, mantendo a ordem de chegada
+    shards = {}
+    for subject, label, specs_path in recordings:
+        shards.setdefault(subject, []).append((label, specs_path))
+
+    subjects_order = list(shards.keys())
+    shard_ids = {subject: i for i, subject in enumerate(subjects_order)}
+    sample_shape = None
+
+    # Linha onde cada gravação começa dentro do seu shard
+    start_rows = {}
+    for subject in subjects_order:
+        sources = [np.load(specs_path, mmap_mode='r') for _, specs_path in shards[subject]]
+        if sample_shape is None:
+            sample_shape = sources[0].shape[1:]
+        n_rows = sum(len(src) for src in sources)
+
+        final_path = store_path / shard_name(subject)
+        tmp_path = store_path / f"{final_path.stem}.{os.getpid()}.tmp"
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(n_rows,) + sample_shape)
+        row = 0
+        for (_, specs_path), src in zip(shards[subject], sources):
+            out[row:row + len(src)] = src
+            start_rows[str(specs_path)] = row
+            row += len(src)
+        out.flush()
+        del out
+        os.replace(tmp_path, final_path)
+
+    # Índice: uma linha por janela, na ordem de recordings
+    idx_subject, idx_label, idx_window, idx_shard, idx_row = [], [], [], [], []
+    for subject, label, specs_path in recordings:
+        n_windows = np.load(specs_path, mmap_mode='r').shape[0]
+        start = start_rows[str(specs_path)]
+        idx_subject.append(np.full(n_windows, subject, dtype=np.int32))
+        idx_label.append(np.full(n_windows, label, dtype=np.int64))
+        idx_window.append(np.arange(n_windows, dtype=np.int32))
+        idx_shard.append(np.full(n_windows, shard_ids[subject], dtype=np.int32))
+        idx_row.append(np.arange(start, start + n_windows, dtype=np.int32))
+
+    np.savez(store_path / "index.npz",
+             subject=np.concatenate(idx_subject),
+             label=np.concatenate(idx_label),
+             window=np.concatenate(idx_window),
+             shard=np.concatenate(idx_shard),
+             row=np.concatenate(idx_row))
+
+    meta = {
+        "dtype": dtype.name,
+        "sample_shape": list(sample_shape),
+        "shards": [shard_name(subject) for subject in subjects_order],
+    }
+    with open(store_path / "meta.json", 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    # Remove shards de sujeitos que saíram do dataset
+    valid = set(meta["shards"])
+    for old in store_path.glob("*.npy"):
+        if old.name not in valid:
+            old.unlink()
+
+class FeatureStore:
+    """
+    Acesso às janelas do dataset sem carregar tudo na memória.
+    Os shards ficam abertos com mmap_mode e as janelas são copiadas só quando pedidas (get).
+    """
+    def __init__(self, shards, subjects, labels, windows, shard_ids, rows):
+        self.shards = shards
+        self.subjects = subjects
+        self.labels = labels
+        self.windows = windows
+        self.shard_ids = shard_ids
+        self.rows = rows
+
+    @classmethod
+    def open(cls, store_path, mmap_mode='r'):
+        store_path = Path(store_path)
+        with open(store_path / "meta.json", 'r') as f:
+            meta = json.load(f)
+        shards = [np.load(store_path / name, mmap_mode=mmap_mode) for name in meta["shards"]]
+        with np.load(store_path / "index.npz") as index:
+            return cls(shards, index["subject"], index["label"], index["window"], index["shard"], index["row"])
+
+    @classmethod
+    def from_arrays(cls, X, Y):
+        # Compatibilidade: X_stew.npy/Y_stew.npy antigos viram um store de um shard só, sem sujeito (-1)
+        n = len(Y)
+        return cls([X], np.full(n, -1, dtype=np.int32), np.asarray(Y, dtype=np.int64),
+                   np.arange(n, dtype=np.int32), np.zeros(n, dtype=np.int32), np.arange(n, dtype=np.int32))
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def sample_shape(self):
+        return self.shards[0].shape[1:]
+
+    def __getitem__(self, idx):
+        # Uma janela (14, 33, 17) em float32
+        # Cópia (np.array): o shard em mmap é somente leitura
+        return np.array(self.shards[self.shard_ids[idx]][self.rows[idx]], dtype=np.float32)
+
+    def get(self, indices):
+        """
+        Junta as janelas pedidas em um array float32 (len(indices), 14, 33, 17).
+        A leitura é feita shard por shard, com as linhas ordenadas para ler o disco em sequência.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        out = np.empty((len(indices),) + self.sample_shape, dtype=np.float32)
+        shard_ids = self.shard_ids[indices]
+        rows = self.rows[indices]
+        for shard in np.unique(shard_ids):
+            positions = np.nonzero(shard_ids == shard)[0]
+            order = np.argsort(rows[positions], kind='stable')
+            positions = positions[order]
+            out[positions] = self.shards[shard][rows[positions]]
+        return out
+
+    def iter_batches(self, indices=None, batch_size=256):
+        # Percorre as janelas em blocos (X float32, Y int64), sem nunca ter o dataset inteiro na memória
+        if indices is None:
+            indices = np.arange(len(self))
+        indices = np.asarray(indices, dtype=np.int64)
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start:start + batch_size]
+            yield self.get(batch), self.labels[batch]
+
+    def subject_list(self):
+        # Sujeitos na ordem em que aparecem no índice
+        _, first = np.unique(self.subjects, return_index=True)
+        return self.subjects[np.sort(first)]
+
+    def subject_indices(self, subjects):
+        # Índices de todas as janelas dos sujeitos pedidos
+        return np.nonzero(np.isin(self.subjects, subjects))[0]
+
+    def subject_split(self, test_fraction=0.2, indices=None):
+        """
+        Divisão com Isolamento de Sujeito: os últimos sujeitos (test_fraction) vão para o teste.
+        Sem informação de sujeito (store legado), cai no corte sequencial 80/20 do X_stew.npy.
+        indices divide só essas janelas (ex: a validação tirada dos sujeitos do treino).
+        """
+        indices = np.arange(len(self)) if indices is None else np.sort(np.asarray(indices, dtype=np.int64))
+        subjects = self.subjects[indices]
+        # Sujeitos na ordem em que aparecem no índice
+        _, first = np.unique(subjects, return_index=True)
+        subject_order = subjects[np.sort(first)]
+        if len(subject_order) <= 1:
+            split_idx = int(len(indices) * (1 - test_fraction))
+            return indices[:split_idx], indices[split_idx:]
+
+        n_test = max(1, int(round(len(subject_order) * test_fraction)))
+        test_mask = np.isin(subjects, subject_order[-n_test:])
+        return indices[~test_mask], indices[test_mask]
+
+    def load_all(self):
+        # Carrega tudo na memória (X float32, Y int64). Só para quem realmente precisa da matriz inteira (ex: SVM).
+        return self.get(np.arange(len(self))), self.labels.copy()
+
+def open_feature_store(data_dir=config.PROCESSED_DATA_DIR, mmap_mode='r'):
+    """
+    Abre o store de data_dir/store. Se ele não existir, usa o X_stew.npy/Y_stew.npy antigos (também com mmap).
+    Levanta FileNotFoundError se nenhum dos dois existir.
+    """
+    data_dir = Path(data_dir)
+    store_path = data_dir / "store"
+    if (store_path / "index.npz").exists():
+        return FeatureStore.open(store_path, mmap_mode=mmap_mode)
+
+    X_path, Y_path = data_dir / "X_stew.npy", data_dir / "Y_stew.npy"
+    if X_path.exists() and Y_path.exists():
+        return FeatureStore.from_arrays(np.load(X_path, mmap_mode=mmap_mode), np.load(Y_path))
+
+    raise FileNotFoundError(f"No feature store or X_stew.npy found in {data_dir}. Run preprocessing.py first.")
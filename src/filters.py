@@ -0,0 +1,128 @@
+"""
+Filtros passa-banda sem MNE.
+O raw.filter do MNE monta um mne.Info + RawArray e projeta o mesmo filtro FIR (1-40Hz) do zero a cada upload.
+Aqui os filtros são projetados uma única vez por (sfreq, low, high), ficam em cache (lru_cache)
+e são aplicados direto no array NumPy (Canais x Tempo).
+
+O FIR reproduz o padrão do raw.filter(l_freq, h_freq):
+    - fir_design='firwin', janela de Hamming, phase='zero'
+    - larguras de transição e tamanho do filtro 'auto'
+    - padding 'reflect_limited' nas bordas
+Em float64 a diferença para o MNE fica na ordem do erro de arredondamento da FFT (ver results/benchmarks/bench_filters.py).
+"""
+from functools import lru_cache
+import numpy as np
+from scipy import signal
+import config
+
+SFREQ = config.SAMPLE_RATE
+
+# Mesmos fatores do MNE: tamanho do filtro (em s) = fator / menor largura de transição (Hz)
+LENGTH_FACTORS = dict(hann=3.1, hamming=3.3, blackman=5.0)
+
+def auto_transition_bandwidths(sfreq, l_freq, h_freq):
+    # Regra 'auto' do MNE para as larguras de transição
+    l_trans = min(max(0.25 * l_freq, 2.0), l_freq)
+    h_trans = min(max(0.25 * h_freq, 2.0), sfreq / 2.0 - h_freq)
+    return l_trans, h_trans
+
+def _firwin_design(N, freq, gain, window):
+    # Soma/subtrai passa-baixas (firwin) em cada mudança de ganho, como no MNE.
+    # freq vai de 0 a 1 (Nyquist) e gain só tem 0 ou 1.
+    h = np.zeros(N)
+    prev_freq = freq[-1]
+    prev_gain = gain[-1]
+    if gain[-1] == 1:
+        h[N // 2] = 1
+    for this_freq, this_gain in zip(freq[::-1][1:], gain[::-1][1:]):
+        if this_gain != prev_gain:
+            # Tamanho necessário para esta transição
+            transition = (prev_freq - this_freq) / 2.0
+            this_N = int(round(LENGTH_FACTORS[window] / transition))
+            this_N += 1 - this_N % 2 # precisa ser ímpar
+            if this_N > N:
+                raise ValueError(f"Filter length {N} is too short for the transition band (requires {this_N} samples)")
+            this_h = signal.firwin(this_N, (prev_freq + this_freq) / 2.0, window=window, pass_zero=True, fs=freq[-1] * 2)
+            offset = (N - this_N) // 2
+            if this_gain == 0:
+                h[offset:N - offset] -= this_h
+            else:
+                h[offset:N - offset] += this_h
+        prev_gain = this_gain
+        prev_freq = this_freq
+    return h
+
+@lru_cache(maxsize=None)
+def design_bandpass_fir(sfreq, l_freq, h_freq, fir_window='hamming'):
+    """
+    Projeta (uma vez) o FIR passa-banda de fase zero equivalente ao raw.filter(l_freq, h_freq) do MNE.
+    Retorna os coeficientes (somente leitura, pois o array é compartilhado pelo cache).
+    """
+    sfreq = float(sfreq)
+    nyquist = sfreq / 2.0
+    if not 0 < l_freq < h_freq < nyquist:
+        raise ValueError(f"Invalid band {l_freq}-{h_freq} Hz for sfreq {sfreq} Hz")
+
+    l_trans, h_trans = auto_transition_bandwidths(sfreq, l_freq, h_freq)
+    l_stop, h_stop = l_freq - l_trans, h_freq + h_trans
+
+    # Pontos de controle (Hz) e ganhos da resposta em frequência
+    freq = [l_stop, l_freq, h_freq, h_stop]
+    gain = [0, 1, 1, 0]
+    if h_stop != nyquist:
+        freq += [nyquist]
+        gain += [0]
+    if l_stop != 0:
+        freq = [0] + freq
+        gain = [0] + gain
+
+    # Tamanho 'auto': fator da janela / menor transição, em amostras, sempre ímpar
+    filter_length = int(np.ceil(LENGTH_FACTORS[fir_window] / min(l_trans, h_trans) * sfreq))
+    filter_length += (filter_length - 1) % 2
+
+    h = _firwin_design(filter_length, np.array(freq) / nyquist, np.array(gain), fir_window)
+    h.flags.writeable = False
+    return h
+
+@lru_cache(maxsize=None)
+def design_causal_bandpass(sfreq, l_freq, h_freq, order=4):
+    # Butterworth causal em seções de segunda ordem (sos), usado no streaming. Projetado uma vez por combinação.
+    return signal.butter(order, [l_freq, h_freq], btype='bandpass', fs=sfreq, output='sos')
+
+def _smart_pad(data, n_pad):
+    # Padding 'reflect_limited' do MNE: reflexão ímpar nas bordas (n_pad < n_times, então nunca completa com zeros)
+    return np.concatenate([
+        2 * data[..., :1] - data[..., n_pad:0:-1],
+        data,
+        2 * data[..., -1:] - data[..., -2:-n_pad - 2:-1],
+    ], axis=-1)
+
+def apply_fir_zero_phase(data, h):
+    """
+    Aplica um FIR simétrico com fase zero em todos os canais de uma vez (último eixo = tempo).
+    A saída tem o mesmo tipo da entrada (float32 ou float64).
+    Equivale ao overlap-add do MNE: pad nas bordas -> convolução (uma FFT por canal) -> compensa o atraso do filtro.
+    """
+    # Mantém float32 (metade da memória) ou float64; qualquer outro tipo vira float64 como no MNE
+    data = np.asarray(data)
+    if data.dtype not in (np.float32, np.float64):
+        data = data.astype(np.float64)
+    if data.dtype == np.float32:
+        # O offset DC do Emotiv (~4000 µV) consome a precisão do float32 na convolução.
+        # O passa-banda tem ganho zero em DC, então tirar a média de cada canal antes não muda o resultado
+        data = data - data.mean(axis=-1, keepdims=True, dtype=np.float64).astype(np.float32)
+    n_times = data.shape[-1]
+    n_edge = max(min(len(h), n_times) - 1, 0)
+    padded = _smart_pad(data, n_edge) if n_edge > 0 else data
+
+    kernel = np.reshape(h, (1,) * (data.ndim - 1) + (-1,)).astype(data.dtype, copy=False)
+    filtered = signal.fftconvolve(padded, kernel, mode='full', axes=-1)
+
+    # Desloca metade do filtro (fase zero) + o padding da esquerda
+    shift = (len(h) - 1) // 2 + n_edge
+    return filtered[..., shift:shift + n_times]
+
+def bandpass_filter(data, sfreq=SFREQ, l_freq=config.FILTER_LOW, h_freq=config.FILTER_HIGH):
+    # Filtro passa-banda (padrão 1-40Hz) de um sinal (Canais x Tempo), sem criar nenhum objeto do MNE
+    h = design_bandpass_fir(float(sfreq), float(l_freq), float(h_freq))
+    return apply_fir_zero_phase(data, h)
@@ -1,13 +1,19 @@
+import copy
 import torch
 import numpy as np
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 curren_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(curren_dir)
 
 from model import EEGEmbedding
-import utils
+from execution import ExecutionMode
+from backends import load_backend
+from feature_store import open_feature_store
+import prototypes
 from preprocessing import preprocess_file
 import matplotlib
 matplotlib.use('Agg')
@@ -16,55 +22,116 @@ import io
 import base64
 from sklearn.decomposition import PCA
 from xai_utils import GradCAM
-import mne
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from visualize_spatial import generate_topomap_base64
 
 import config
+import utils
 SFREQ = config.SAMPLE_RATE
 CHANNELS = config.CHANNELS
 
 class BurnoutSystem:
-    def __init__(self):
+    def __init__(self, execution=None, backend=None):
         self.device = torch.device("cpu")
+        # Modo de execução do embedding (fp32, bf16, channels_last, compile). None usa o config.EXECUTION_MODE
+        self.execution = ExecutionMode.parse(execution)
+        # Motor das previsões: eager, torchscript ou onnx (backends.py). None usa o config.INFERENCE_BACKEND
+        self.backend_name = backend or config.INFERENCE_BACKEND
+        self.backend = None
         self.model = None
+        self.runner = None
         self.prototypes = None
+        self.prototype_info = None
         self.is_ready = False
+        # O pyplot não é thread-safe: no servidor, os gráficos de requisições simultâneas são feitos um por vez
+        self.plot_lock = threading.Lock()
     
     def load_resources(self, model_path, data_path):
         # 1. carrega o modelo .pth
-        # 2. carrega o dataset de treino .npy
-        # 3. calcula os protótipos para comparação
+        # 2. carrega os protótipos do artefato salvo pelo treino (eeg_model.prototypes.json)
+        # 3. se o artefato não existir ou for de outros pesos/dados, calcula os protótipos em blocos e regrava o artefato
+        # Os dados (data_path) só são necessários para conferir o artefato ou recalcular: sem eles, basta o artefato
 
         print("Starting Inferecence System")
         # Carregar o modelo
         try:
-            self.model = EEGEmbedding().to(self.device)
             state_dict = torch.load(model_path, map_location=self.device)
-            self.model.load_state_dict(state_dict)
-            self.model.eval()
-            print("Model Loaded")
+            self.setup_model(state_dict)
+            print(f"Model Loaded ({self.execution.name})")
         except Exception as e:
             print(f"Error to load model: {e}")
             return False
         # Carregar dados para calibragem
         try:
-            X_numpy = np.load(os.path.join(data_path, 'X_stew.npy'))
-            Y_numpy = np.load(os.path.join(data_path, 'Y_stew.npy'))
-
-            X_tensor = torch.from_numpy(X_numpy).float().to(self.device)
-            Y_tensor = torch.from_numpy(Y_numpy).long().to(self.device)
-
-            with torch.no_grad():
-                all_embeddings = self.model(X_tensor)
-                self.prototypes = utils.get_prototypes(all_embeddings, Y_tensor, 2)
-            
-            print(f"Prototypes Calculated: {len(self.prototypes)} references profiles")
-            self.is_ready = True
-            return True
+            path = prototypes.artifact_path(model_path)
+            artifact = prototypes.load_artifact(path, prototypes.model_hash(state_dict))
+            # Só o índice do Feature Store (mmap) para conferir a impressão digital dos dados, se eles estiverem aqui
+            try:
+                store = open_feature_store(data_path)
+            except FileNotFoundError:
+                store = None
+            if (artifact is not None and store is not None
+                    and artifact.get("data_sha256") != prototypes.data_fingerprint(store, data_path)):
+                artifact = None
+
+            if artifact is not None:
+                checked = "" if store is not None else " (no dataset here, data hash not checked)"
+                print(f"Prototypes Loaded from {path.name}{checked}")
+            elif store is None:
+                raise FileNotFoundError(f"{path.name} is missing or was built for other weights, "
+                                        f"and there is no dataset in {data_path} to recompute it")
+            else:
+                # Recalcula em blocos: somas e contagens por classe, sem juntar os embeddings de todas as janelas
+                print("Prototype artifact missing or stale. Recomputing from the Feature Store")
+                artifact = prototypes.build_artifact(self.model, state_dict, data_path, device=self.device,
+                                                     execution=self.execution, runner=self.runner)
+                try:
+                    prototypes.save_artifact(artifact, path)
+                except OSError as e:
+                    print(f"Could not save prototype artifact: {e}")
+
+            self.prototypes = torch.tensor(artifact["prototypes"], dtype=torch.float32, device=self.device)
+            self.prototype_info = {k: artifact[k] for k in ("class_counts", "class_std", "windows")}
+            print(f"Prototypes Ready: {len(self.prototypes)} references profiles")
         except Exception as e:
             print(f"Error to calculate prototypes: {e}")
             return False
+        # Backend das previsões (o Grad-CAM continua no modelo eager)
+        try:
+            expected = {k: artifact[k] for k in ("model_sha256", "data_sha256")}
+            self.backend = load_backend(self.backend_name, model_path, self.runner, self.prototypes, self.execution,
+                                        expected, self.device)
+            print(f"Inference Backend: {self.backend.name}")
+        except Exception as e:
+            print(f"Error to load {self.backend_name} backend: {e}")
+            return False
+        self.is_ready = True
+        return True
+
+    def setup_model(self, state_dict, assign=False):
+        # O tamanho do embedding vem dos próprios pesos (o sweep.py pode treinar com outro tamanho)
+        self.model = EEGEmbedding(embedding_dim=state_dict["fc1.weight"].shape[0]).to(self.device)
+        # assign=True: os parâmetros passam a ser os próprios tensores do state_dict, sem cópia (memória compartilhada)
+        self.model.load_state_dict(state_dict, assign=assign)
+        self.model.eval()
+        # O Grad-CAM usa uma cópia do self.model (eager, fp32, ver xai_heatmap); as previsões usam o runner
+        self.runner = self.execution.prepare(self.model)
+
+    def load_shared(self, state_dict, prototypes, prototype_info):
+        """
+        Inicializa a partir de pesos e protótipos já carregados por outro processo (worker_pool.py).
+        Os tensores ficam na memória compartilhada: todos os workers leem a mesma cópia do modelo.
+        Só o backend eager (os outros leem os próprios arquivos exportados).
+        """
+        self.setup_model(state_dict, assign=True)
+        # Pesos só para leitura: o Grad-CAM precisa do gradiente da ativação, não do gradiente dos pesos
+        self.model.requires_grad_(False)
+        self.prototypes = prototypes
+        self.prototype_info = prototype_info
+        self.backend = load_backend("eager", None, self.runner, self.prototypes, self.execution, device=self.device)
+        self.backend_name = self.backend.name
+        self.is_ready = True
+        return True
 
     def predict_patient(self, filepath):
         """
@@ -74,34 +141,69 @@ class BurnoutSystem:
             raise Exception("Sistema não inicializado.")
 
         # 1. Processa o arquivo do paciente
-        input_tensor = preprocess_file(filepath, device=self.device)
-        num_windows = input_tensor.shape[0]
+        input_tensor = self.preprocess(filepath)
 
         with torch.no_grad():
             # 2. Gera Embedding do Paciente
-            # O paciente gera várias janelas. Vamos tirar a média delas para ter UM vetor do paciente.
-            embeddings = self.model(input_tensor) # (N_janelas, 64)
-            patient_profile = torch.mean(embeddings, dim=0).unsqueeze(0) # (1, 64)
+            # O backend devolve os embeddings (N_janelas, 64) e as distâncias do perfil médio até cada protótipo
+            embeddings, distances = self.backend(input_tensor)
 
-            # 3. Calcula Distâncias (A Lógica do seu TCC)
-            # Protótipo 0 = Relaxado, Protótipo 1 = Burnout
-            dist_relax = utils.calc_euclidiean_distance(patient_profile, self.prototypes[0].unsqueeze(0)).item()
-            dist_burnout = utils.calc_euclidiean_distance(patient_profile, self.prototypes[1].unsqueeze(0)).item()
+        return self.build_result(input_tensor, embeddings, distances[0])
 
-            # Coloca as distâncias em um tensor
-            dist_tensor = torch.tensor([dist_relax, dist_burnout])
+    def preprocess(self, filepath):
+        # Arquivo .txt do paciente -> tensor (N_janelas, 14, 33, 17) no device do sistema
+        return preprocess_file(filepath, device=self.device)
 
-            # Confianaça da IA
-            # 3.0 ~ 5.0 confiança moderada
-            # Quanto maior o número, menos confiante
-            temperature = 3.0
+    def embed_windows(self, windows, max_batch_size=None):
+        # Embeddings de um tensor de janelas (de um ou vários pacientes), em lotes de até max_batch_size janelas
+        max_batch_size = max_batch_size or config.INFERENCE_MAX_BATCH
+        with torch.no_grad():
+            return torch.cat([self.backend(windows[i:i + max_batch_size])[0]
+                              for i in range(0, len(windows), max_batch_size)])
 
-            # Softmax negativa porque menor distância é melhor
-            probs = torch.nn.functional.softmax(-dist_tensor / temperature, dim=0)
+    def patient_distances(self, profiles):
+        # Distâncias (N_pacientes, N_classes) dos perfis até os protótipos do backend (no int8, os do modelo quantizado)
+        prototypes = self.backend.prototypes if self.backend.prototypes is not None else self.prototypes
+        return utils.calc_distance_matrix(profiles, prototypes)
 
-            # Pega a probabilidade mais alta
-            confidence_score = probs.max().item()
-            confidence_pct = confidence_score * 100
+    def build_result(self, input_tensor, embeddings, distances=None, plots=True):
+        """
+        Decisão + gráficos de um paciente a partir dos embeddings das suas janelas
+        (vindos do backend direto, do predict_patients ou do micro-batcher do servidor).
+        """
+        # O paciente gera várias janelas. Vamos tirar a média delas para ter UM vetor do paciente.
+        patient_profile = torch.mean(embeddings, dim=0).unsqueeze(0) # (1, 64)
+        # 3. Calcula Distâncias (A Lógica do seu TCC)
+        if distances is None:
+            distances = self.patient_distances(patient_profile)[0]
+
+        result = self.decide(distances, len(input_tensor))
+        if plots:
+            with self.plot_lock:
+                result["image_base64"] = self.generate_spatial_plot(patient_profile)
+                result["xai_base64"] = self.generate_xai_plot(input_tensor)
+                result["topomap_base64"] = generate_topomap_base64(input_tensor)
+        return result
+
+    def decide(self, distances, num_windows):
+        # Distâncias do perfil do paciente até cada protótipo -> previsão, confiança e cor do status
+        # Protótipo 0 = Relaxado, Protótipo 1 = Burnout
+        dist_relax, dist_burnout = distances.tolist()
+
+        # Coloca as distâncias em um tensor
+        dist_tensor = torch.tensor([dist_relax, dist_burnout])
+
+        # Confianaça da IA
+        # 3.0 ~ 5.0 confiança moderada
+        # Quanto maior o número, menos confiante
+        temperature = 3.0
+
+        # Softmax negativa porque menor distância é melhor
+        probs = torch.nn.functional.softmax(-dist_tensor / temperature, dim=0)
+
+        # Pega a probabilidade mais alta
+        confidence_score = probs.max().item()
+        confidence_pct = confidence_score * 100
 
         # 4. Decisão
         # Quanto MENOR a distância, mais parecido é.
@@ -111,12 +213,6 @@ class BurnoutSystem:
         else:
             prediction = "Relaxed"
             status_color = "green"
-        
-        plot_base64 = self.generate_spatial_plot(patient_profile)
-
-        xai_base64 = self.generate_xai_plot(input_tensor)
-
-        topo_base64 = generate_topomap_base64(input_tensor)
 
         return {
             "prediction": prediction,
@@ -127,10 +223,81 @@ class BurnoutSystem:
             },
             "windows_analyzed": num_windows,
             "status_color": status_color,
-            "image_base64": plot_base64,
-            "xai_base64": xai_base64,
-            "topomap_base64": topo_base64
         }
+
+    def predict_patients(self, filepaths, max_batch_size=None, workers=None, plots=False, pack_windows=None):
+        """
+        Inferência em lote de vários pacientes (ex: re-analisar um arquivo de gravações).
+            1- pré-processa os arquivos em paralelo (threads: leitura, filtro e FFT soltam o GIL); o forward de um
+               paciente roda enquanto os próximos arquivos ainda estão sendo lidos
+            2- paciente com pack_windows janelas ou mais: forward sozinho, direto no tensor dele (acima de ~32 janelas
+               o custo por janela da conv1 não cai mais, e juntar pacientes grandes só custaria a cópia)
+            3- pacientes menores são copiados, na ordem, para um único tensor pré-alocado de pack_windows janelas,
+               que vira um forward só quando enche (o forward de poucas janelas é o mais caro por janela)
+        No backend int8 (batch_invariant False) nada é juntado nem dividido: cada paciente tem o próprio forward,
+        com o mesmo resultado do predict_patient (a escala da quantização dinâmica depende do lote).
+        Retorna uma lista na ordem de filepaths. Arquivos inválidos viram {"filepath": ..., "error": ...}.
+        plots=True também gera os gráficos de cada paciente (bem mais lento, como no predict_patient).
+        """
+        if not self.is_ready:
+            raise Exception("Sistema não inicializado.")
+        workers = workers or config.INFERENCE_PREPROCESS_WORKERS
+        max_batch_size = max_batch_size or config.INFERENCE_MAX_BATCH
+        pack_windows = min(pack_windows or config.INFERENCE_PACK_WINDOWS, max_batch_size)
+        # Sem invariância ao lote (int8), todo paciente passa pelo caminho "sozinho" e inteiro
+        alone = not self.backend.batch_invariant
+        if alone:
+            pack_windows = 1
+
+        results = [None] * len(filepaths)
+        # Pacientes pequenos esperando o forward conjunto: (posição, tensor) e as janelas já copiadas no buffer
+        pending = []
+        buffer = None
+        filled = 0
+
+        def finish(position, tensor, embeddings, distances=None):
+            result = self.build_result(tensor, embeddings, distances, plots=plots)
+            results[position] = {"filepath": str(filepaths[position]), **result}
+
+        def flush():
+            nonlocal filled
+            embeddings = self.embed_windows(buffer[:filled], max_batch_size)
+            for (position, tensor), chunk in zip(pending, torch.split(embeddings, [len(t) for _, t in pending])):
+                finish(position, tensor, chunk)
+            pending.clear()
+            filled = 0
+
+        def load(filepath):
+            try:
+                return self.preprocess(filepath), None
+            except Exception as e:
+                return None, str(e)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Com uma thread só, o pool não tem o que paralelizar: os arquivos são lidos aqui mesmo
+            loaded = executor.map(load, filepaths) if workers > 1 else map(load, filepaths)
+            for position, (tensor, error) in enumerate(loaded):
+                if tensor is None:
+                    results[position] = {"filepath": str(filepaths[position]), "error": error}
+                elif len(tensor) >= pack_windows:
+                    if len(tensor) <= max_batch_size or alone:
+                        with torch.no_grad():
+                            embeddings, distances = self.backend(tensor)
+                        finish(position, tensor, embeddings, distances[0])
+                    else:
+                        finish(position, tensor, self.embed_windows(tensor, max_batch_size))
+                else:
+                    if filled + len(tensor) > pack_windows:
+                        flush()
+                    if buffer is None:
+                        buffer = torch.empty((pack_windows,) + tuple(tensor.shape[1:]), dtype=tensor.dtype,
+                                             device=self.device)
+                    buffer[filled:filled + len(tensor)] = tensor
+                    pending.append((position, tensor))
+                    filled += len(tensor)
+            if pending:
+                flush()
+        return results
     
     def generate_spatial_plot(self, patient_tensor):
         # Gera um gráfico 2D comparando o paciente com os protótipos
@@ -208,6 +375,20 @@ class BurnoutSystem:
             print(f"Plot Error: {e}")
             return None
     
+    def xai_heatmap(self, target_input):
+        """
+        Mapa de calor Grad-CAM da conv1 para uma entrada (1, 14, 33, 17).
+        Roda numa cópia privada do modelo: os ganchos do GradCAM guardam a última ativação que passou pela conv1,
+        e no servidor o self.model faz forwards em outras threads ao mesmo tempo (micro-batcher, predict_patient).
+        Na cópia, só o forward do próprio Grad-CAM passa pelos ganchos.
+        """
+        model = copy.deepcopy(self.model)
+        cam = GradCAM(model=model, target_layer=model.conv1)
+        try:
+            return cam(target_input)
+        finally:
+            cam.remove()
+
     def generate_xai_plot(self, patient_tensor):
         # Gerar o Mapa de calor (Grad-CAM) mostrand onde a IA focou.
         # Retorna um String Base64 da imagem.
@@ -220,15 +401,13 @@ class BurnoutSystem:
                 print("Error: Grad-CAM requires the original image tensor, not embedding.")
                 return None
             
-            cam = GradCAM(model=self.model, target_layer=self.model.conv1)
-
             # Gerar o HeatMap
             # Precisa garantir que o tensor tenha a dimendsão batch (1, C, H, W).
             # Como o process_file retorna (N_janelas, 14, 33, 17), vamos pegar a média ou a primeira janela representativa.
             # Para XAI ficar bonito, vai ser pego a janela que teve a maior ativção (pior caso) ou a média.
             # Vamos simplificar pegando a média das janelas para representar o paciente como um todo.
             target_input = torch.mean(patient_tensor, dim=0).unsqueeze(0) # (1, 14, 33, 17)
-            heatmap = cam(target_input)
+            heatmap = self.xai_heatmap(target_input)
 
             # Preparar a plotagem
             original_img = target_input[0].detach().cpu().numpy()
@@ -135,9 +135,11 @@ import torch.nn.functional as F
 # print(net)
 
 # Recebe um sinal EEG complexo e ruidoso e retorna um vetor de 64 números (serão cérebros relaxados e sobrecarregados)
+# embedding_dim: tamanho do vetor de saída (64 por padrão, pode ser mudado na busca de hiperparâmetros do sweep.py)
 class EEGEmbedding(nn.Module):
-    def __init__(self):
+    def __init__(self, embedding_dim=64):
         super(EEGEmbedding, self).__init__()
+        self.embedding_dim = embedding_dim
         # Convolução
         # Altura x Largura = 33 x 17 para 14 canais EEG (14, 33, 17)
         # O preprocessing.py transformou o EEG bruto em espectograma para ver as frequências cerebrais
@@ -166,7 +168,7 @@ class EEGEmbedding(nn.Module):
         4. O cálculo do Flatten: tendo 64 filtros e cada um gerou uma imagem de 15x7. Para entrar na camada linear, é preciso fazer a conta:
             4.1: 64 * 15 * 7 = 6720
         """
-        self.fc1 = nn.Linear(64 * 15 * 7, 64)
+        self.fc1 = nn.Linear(64 * 15 * 7, embedding_dim)
 
     def forward(self, x):
         # Passa pela convolução
@@ -6,43 +6,41 @@ O .txt é ruim para processar rápido e para a rede neural. Portanto irá ser cr
     4- gerar o espectograma (STFT) para cada janela
     5- salvar tudo pronto para o treinamento
 """
+import os
+import argparse
+import hashlib
+import json
 import shutil
 import numpy as np
-import pandas as pd
-import mne
 from scipy import signal
+from scipy import fft as sp_fft
+from numpy.lib.stride_tricks import sliding_window_view
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 import config
 import torch
+from stew_reader import load_stew_array
+from filters import bandpass_filter
+from feature_store import subject_from_filename, write_feature_store
 
 SFREQ = config.SAMPLE_RATE # frequência do dataset
+MANIFEST_VERSION = 2 # incrementar quando o pipeline mudar o conteúdo das saídas
+WINDOW_SAMPLES = int(round(config.EPOCH_LENGTH * SFREQ)) # 512 pontos por janela
+HOP_SAMPLES = int(round(config.EPOCH_HOP * SFREQ)) # distância entre o início de janelas consecutivas
 
-def read_stew_text_file(filepath):
+def read_stew_text_file(filepath, cache_dir=None):
     """
     Lê o arquivo .txt do dataset e converte para MNE RAW. 
     O STEW tem 14 colunas de dados (canais) separados por espaço.
+    A leitura é feita pelo stew_reader (parser em C + cache .npy opcional em cache_dir).
+    O pipeline (preprocess_file/process_file) não usa mais o MNE; esta função fica para análises que precisam do Raw.
     """
+    import mne # importado só aqui, o caminho de inferência não carrega o MNE
 
-    # Lê o arquivo de texto, ignorando cabeçalhos se houver
-    try:
-        # Tenta ler separado por espaço
-        data = pd.read_csv(filepath, sep=r"\s+", header=None, engine='python')
-    except:
-        # Fallback se for separado por vírgula
-        data = pd.read_csv(filepath, sep=',', header=None)
-
-    # Garante que pegue apenas os números do dataset
-    data = data.apply(pd.to_numeric, errors='coerce',).dropna()
-
-    # Transforma em Matriz (Canais x Tempo)
-    # O arquivo vem (Tempo x Canais), então fazemos a transposta
-    data_np = data.values.T
-
-    # Garante que temos 14 canais. Se tiver mais, corta. Se tiver menos, erro.
-    if data_np.shape[0] > 14:
-        data_np = data_np[:14, :]
-    if data_np.shape[0] < 14:
+    # Matriz (Canais x Tempo) em float32, ou None se tiver menos de 14 canais
+    data_np = load_stew_array(filepath, cache_dir=cache_dir)
+    if data_np is None:
         return None
     
     # Cria a estrutura MNE
@@ -58,7 +56,7 @@ def transform_to_spectrogram(epoch_data, sfreq):
     """
 
     # f = frequência, t = tempo, Zxx = complexo da STFT
-    f, t, Zxx = signal.stft(epoch_data, fs=sfreq, nperseg=64, noverlap=32)
+    f, t, Zxx = signal.stft(epoch_data, fs=sfreq, nperseg=config.STFT_NPERSEG, noverlap=config.STFT_NOVERLAP)
 
     # Pegamos apenas a magnitude (abs)
     spectogram = np.abs(Zxx)
@@ -68,46 +66,275 @@ def transform_to_spectrogram(epoch_data, sfreq):
 
     return spectogram
 
-def preprocess_file(filepath, device='cpu'):
+def stft_window(dtype=np.float64):
+    # Janela de Hann e escala do scipy.signal.stft (scaling='spectrum'), no tipo do sinal
+    win = signal.get_window('hann', config.STFT_NPERSEG).astype(dtype)
+    scale = win.dtype.type(np.sqrt(1.0 / win.sum()**2))
+    return win, scale
+
+def stft_frames(frames, win, scale):
+    # frames: (..., nperseg) -> (..., Frequência). float32 -> complex64, float64 -> complex128
+    result = sp_fft.rfft(win * frames, axis=-1)
+    result *= scale
+    return result
+
+def _stft(epochs_data):
+    """
+    STFT equivalente ao signal.stft (boundary='zeros', padded=True), direto sobre os segmentos (stride) do sinal.
+    Roda na precisão das janelas: float32 -> complex64, qualquer outro tipo -> float64/complex128.
+    (O scipy concatena zeros em float64 no padding, calcula tudo em complex128 e ainda copia o resultado
+    para mover o eixo do tempo.)
+    Devolve (..., Tempo, Frequência).
+    """
+    dtype = np.float32 if epochs_data.dtype == np.float32 else np.float64
+    nperseg = config.STFT_NPERSEG
+    step = nperseg - config.STFT_NOVERLAP
+    half = nperseg // 2
+
+    # Meia janela de zeros em cada borda + o que faltar para fechar o último segmento
+    n_times = epochs_data.shape[-1] + 2 * half
+    n_times += (-(n_times - nperseg) % step) % nperseg
+    padded = np.zeros(epochs_data.shape[:-1] + (n_times,), dtype=dtype)
+    padded[..., half:half + epochs_data.shape[-1]] = epochs_data
+
+    frames = sliding_window_view(padded, nperseg, axis=-1)[..., ::step, :]
+    win, scale = stft_window(dtype)
+    return stft_frames(frames, win, scale)
+
+def transform_to_spectrogram_batch(epochs_data, sfreq, out=None):
+    """
+    Versão vetorizada do transform_to_spectrogram.
+    Recebe todas as janelas de uma vez (N_janelas x Canais x Tempo) e devolve
+    (N_janelas x Canais x Frequência x Tempo) com uma única FFT sobre os segmentos de todas as janelas.
+    O resultado é escrito direto em um array float32 pré-alocado (out).
+    Janelas em float32 usam a STFT em complex64; em float64, complex128.
+    """
+
+    # A STFT opera no último eixo (tempo), então todas as janelas e canais vão juntos
+    Zxx = _stft(epochs_data) # (N_janelas, Canais, Tempo, Frequência)
+
+    if out is None:
+        out = np.empty(Zxx.shape[:-2] + (Zxx.shape[-1], Zxx.shape[-2]), dtype=np.float32)
+    out_view = np.swapaxes(out, -1, -2) # (N_janelas, Canais, Tempo, Frequência), sem cópia
+
+    # Magnitude + log1p gravados direto no float32
+    if Zxx.dtype == np.complex64:
+        np.abs(Zxx, out=out_view)
+        np.log1p(out_view, out=out_view)
+    else:
+        # log1p em float64 antes de arredondar: o mesmo resultado do caminho janela por janela
+        # seguido do np.array(..., dtype=np.float32)
+        np.log1p(np.abs(Zxx), out=out_view, casting='same_kind')
+
+    return out
+
+def make_windows(data, window_samples, hop_samples):
+    """
+    Corta o sinal (Canais x Tempo) em janelas (N_janelas x Canais x window_samples) sem copiar nada.
+    Usa stride tricks: o resultado é uma view somente leitura do próprio sinal,
+    então janelas sobrepostas (hop menor que a janela) não custam memória extra.
+    Levanta ValueError se o sinal for mais curto que uma janela.
+    """
+    if data.shape[-1] < window_samples:
+        raise ValueError(f"Signal has {data.shape[-1]} samples, shorter than one window ({window_samples} samples)")
+    view = sliding_window_view(data, window_samples, axis=-1)[:, ::hop_samples, :] # (Canais, N_janelas, Tempo)
+    return view.transpose(1, 0, 2)
+
+def spectrogram_windows(data, sfreq, window_samples, hop_samples, out=None):
+    """
+    Espectrograma de todas as janelas de um sinal contínuo (Canais x Tempo).
+    Devolve (N_janelas, Canais, Frequência, Tempo) em float32, igual ao make_windows + transform_to_spectrogram_batch.
+
+    Quando o hop e a janela são múltiplos do passo da STFT (nperseg - noverlap = 32 amostras),
+    janelas vizinhas compartilham os mesmos segmentos da STFT. Nesse caso cada segmento do sinal
+    passa pela FFT uma única vez e é reaproveitado por todas as janelas que o contêm.
+    Só o primeiro e o último segmento de cada janela (que usam o zero-padding da borda) são calculados à parte.
+    A FFT roda na precisão do sinal (float32 -> complex64, float64 -> complex128).
+    """
+    nperseg = config.STFT_NPERSEG
+    step = nperseg - config.STFT_NOVERLAP
+    half = nperseg // 2
+
+    n_windows = max(0, (data.shape[-1] - window_samples) // hop_samples + 1)
+    # Sem sobreposição não há o que compartilhar, e a STFT em lote direta é mais rápida
+    shareable = (hop_samples < window_samples and hop_samples % step == 0 and window_samples % step == 0
+                 and half == step and window_samples >= nperseg)
+
+    if not shareable or n_windows == 0:
+        return transform_to_spectrogram_batch(make_windows(data, window_samples, hop_samples), sfreq, out=out)
+
+    dtype = data.dtype if data.dtype in (np.float32, np.float64) else np.dtype(np.float64)
+    win, scale = stft_window(dtype)
+
+    n_channels = data.shape[0]
+    starts = np.arange(n_windows) * hop_samples
+    n_inner = window_samples // step - 1 # segmentos internos (sem padding) de cada janela
+    n_frames = n_inner + 2
+
+    # 1. Segmentos internos: a FFT é feita uma vez por segmento do sinal inteiro
+    last = starts[-1] + window_samples
+    signal_frames = sliding_window_view(data[:, :last], nperseg, axis=-1)[:, ::step, :] # (Canais, N_segmentos, nperseg)
+    signal_spec = stft_frames(signal_frames, win, scale) # (Canais, N_segmentos, Frequência)
+
+    # 2. Segmentos das bordas de cada janela (meia janela de zeros + meia janela de sinal)
+    offsets = np.arange(half)
+    left = np.zeros((n_channels, n_windows, nperseg), dtype=dtype)
+    left[..., half:] = data[:, starts[:, None] + offsets]
+    right = np.zeros((n_channels, n_windows, nperseg), dtype=dtype)
+    right[..., :half] = data[:, (starts + window_samples - half)[:, None] + offsets]
+    left_spec = stft_frames(left, win, scale)
+    right_spec = stft_frames(right, win, scale)
+
+    if out is None:
+        out = np.empty((n_windows, n_channels, nperseg // 2 + 1, n_frames), dtype=np.float32)
+
+    # 3. Monta cada janela: borda esquerda + segmentos compartilhados + borda direita
+    first_frame = starts // step
+    frame_idx = first_frame[:, None] + np.arange(n_inner) # (N_janelas, n_inner)
+    inner = signal_spec[:, frame_idx, :] # (Canais, N_janelas, n_inner, Frequência)
+
+    out_view = out.transpose(1, 0, 3, 2) # (Canais, N_janelas, Tempo, Frequência)
+    np.log1p(np.abs(left_spec), out=out_view[:, :, 0, :], casting='same_kind')
+    np.log1p(np.abs(inner), out=out_view[:, :, 1:-1, :], casting='same_kind')
+    np.log1p(np.abs(right_spec), out=out_view[:, :, -1, :], casting='same_kind')
+
+    return out
+
+def preprocess_file(filepath, device='cpu', cache_dir=None):
     # Função que processa um arquivo
     # Lê -> Filtra -> Janela -> Espectograma -> Tensor Pytorch
+    # cache_dir é opcional: útil para re-analisar uploads arquivados
 
-    # Leitura
-    raw = read_stew_text_file(filepath)
+    # Leitura (Canais x Tempo), direto para NumPy sem montar um Raw do MNE
+    data_np = load_stew_array(filepath, cache_dir=cache_dir)
 
-    if raw is None:
+    if data_np is None:
         raise ValueError("Error to read file or insufficient (minimun 14 channels).")
-    
-    # Filtro (1~40Hz)
-    raw.filter(config.FILTER_LOW, config.FILTER_HIGH, verbose=False)
 
-    # Janelamento
-    if raw.times[-1] < config.EPOCH_LENGTH:
+    # Janelamento (duração = instante da última amostra, como o raw.times[-1] do MNE)
+    if (data_np.shape[1] - 1) / SFREQ < config.EPOCH_LENGTH:
         raise ValueError(f"Audio too short. Minimum {config.EPOCH_LENGTH}")
-    
-    epochs = mne.make_fixed_length_epochs(raw, duration=config.EPOCH_LENGTH, verbose=False)
-    epoch_data = epochs.get_data(copy=True, verbose=False)
-
-    # Espectograma
-    processed_list = []
-    for window in epoch_data:
-        spec = transform_to_spectrogram(window, config.SAMPLE_RATE)
-        processed_list.append(spec)
+
+    # Filtro (1~40Hz) com o FIR projetado uma única vez e guardado em cache (filters.py)
+    # Filtro e STFT rodam em config.PREPROCESS_DTYPE (float32 por padrão, sem promover para float64)
+    data_np = data_np.astype(config.PREPROCESS_DTYPE, copy=False)
+    filtered = bandpass_filter(data_np, SFREQ, config.FILTER_LOW, config.FILTER_HIGH)
+
+    # Janelas de 4s com hop configurável, cortadas sem cópia e com a STFT compartilhada entre janelas sobrepostas
+    specs = spectrogram_windows(filtered, config.SAMPLE_RATE, WINDOW_SAMPLES, HOP_SAMPLES)
     
     # Converte para Tensor e pronto para a IA
-    batch_tensor = torch.tensor(np.array(processed_list), dtype=torch.float32).to(device)
+    batch_tensor = torch.from_numpy(specs).to(device)
 
     return batch_tensor
 
-def process_dataset():
+def get_label(filename):
+    # Define o Label baseado no nome do arquivo
+    # 01_lo.txt -> label 0 (relaxado)
+    # 01_hi.txt -> label 1 (Burnout/Carga Alta)
+    # -1 para arquivos que não são lo ou hi
+    if "lo" in filename.lower():
+        return 0
+    elif "hi" in filename.lower():
+        return 1
+    return -1
+
+def process_file(file):
+    """
+    Processa um arquivo do STEW: Lê -> Filtra -> Janela -> Espectograma.
+    Retorna um array float32 (N_janelas, 14, 33, 17) ou None se o arquivo for inválido
+    (menos de 14 canais ou mais curto que uma janela); o motivo é impresso e o process_dataset segue com os outros.
+    Fica no nível do módulo para poder ser enviado aos processos do pool.
+    """
+
+    # 1. Carregar (com cache binário, reprocessar o dataset não precisa ler o texto de novo)
+    cache_dir = config.READ_CACHE_DIR if config.USE_READ_CACHE else None
+    data_np = load_stew_array(file, cache_dir=cache_dir)
+    if data_np is None:
+        print(f"Skipping {Path(file).name}: fewer than 14 channels")
+        return None
+    if data_np.shape[1] < WINDOW_SAMPLES:
+        # Sem uma janela inteira não há espectrograma (o sliding_window_view falharia no meio do pool)
+        print(f"Skipping {Path(file).name}: {data_np.shape[1]} samples, shorter than one "
+              f"{config.EPOCH_LENGTH}s window ({WINDOW_SAMPLES} samples)")
+        return None
+
+    # 2. Filtrar (1-40Hz), mesmo FIR do raw.filter do MNE, na precisão de config.PREPROCESS_DTYPE
+    data_np = data_np.astype(config.PREPROCESS_DTYPE, copy=False)
+    filtered = bandpass_filter(data_np, SFREQ, config.FILTER_LOW, config.FILTER_HIGH)
+
+    # 3. Cortar em Janelas de 4 segundos (hop de config.EPOCH_HOP) sem copiar o sinal e
+    # 4. Converter todas as janelas para Espectograma de uma vez
+    # (N_janelas, 14 canais, 512 pontos de tempo) -> (N_janelas, 14, 33, 17) -> (Janelas, Canais, Freqs, Tempo)
+    return spectrogram_windows(filtered, SFREQ, WINDOW_SAMPLES, HOP_SAMPLES)
+
+def get_preprocessing_params():
+    # Tudo que muda o conteúdo do espectrograma. Se algum valor mudar, o manifesto invalida todos os arquivos.
+    return {
+        "manifest_version": MANIFEST_VERSION,
+        "sample_rate": config.SAMPLE_RATE,
+        "filter_low": config.FILTER_LOW,
+        "filter_high": config.FILTER_HIGH,
+        "epoch_length": config.EPOCH_LENGTH,
+        "epoch_hop": config.EPOCH_HOP,
+        "stft_nperseg": config.STFT_NPERSEG,
+        "stft_noverlap": config.STFT_NOVERLAP,
+        "preprocess_dtype": config.PREPROCESS_DTYPE,
+    }
+
+def file_sha256(filepath, chunk_size=1 << 20):
+    # Hash do conteúdo do arquivo (lido em blocos de 1MB)
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(manifest_path):
+    # Retorna o manifesto salvo ou None se não existir/estiver corrompido
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def save_manifest(manifest, manifest_path):
+    # Escrita atômica: se o processo morrer no meio, o manifesto antigo continua válido
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def build_file(file, output_path):
+    """
+    Processa um arquivo e salva o espectrograma em output_path (.npy).
+    Retorna o número de janelas (0 se o arquivo for inválido).
+    Cada processo do pool grava a própria saída, então só um inteiro volta para o processo principal.
+    """
+    specs = process_file(file)
+    if specs is None:
+        return 0
+
+    tmp_path = output_path.with_name(f"{output_path.stem}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        np.save(f, specs)
+    os.replace(tmp_path, output_path)
+    return len(specs)
+
+def process_dataset(n_workers=config.PREPROCESS_WORKERS, rebuild=False):
     print("Starting the STEW Dataset Processing")
 
-    # Limpeza: Remove a pasta processed antiga para não ter conflito
+    # Build incremental: cada arquivo tem a sua saída em data/processed/files
+    # e o manifesto guarda o hash do .txt e os parâmetros usados para gerá-la
     processed_path = Path("data/processed")
-    if processed_path.exists():
+    files_path = processed_path / "files"
+    manifest_path = processed_path / "manifest.json"
+
+    # Limpeza completa só quando pedida (--rebuild)
+    if rebuild and processed_path.exists():
         print("Cleaning the old folder: data/processed")
         shutil.rmtree(processed_path)
-    processed_path.mkdir(parents=True, exist_ok=True)
+    files_path.mkdir(parents=True, exist_ok=True)
 
     data_path = Path("data/raw/STEW_Dataset")
     files = sorted(list(data_path.glob("*.txt")))
@@ -116,66 +343,96 @@ def process_dataset():
         print("No file was found in data/raw/STEW.")
         return
 
-    processed_list = []
-    labels_list = []
+    # Pula arquivos que não são lo ou hi
+    labels = [get_label(file.name) for file in files]
+    files = [file for file, label in zip(files, labels) if label != -1]
+    labels = [label for label in labels if label != -1]
+
+    count_relax = labels.count(0)
+    count_burnout = labels.count(1)
+
+    # Compara o estado atual com o manifesto
+    params = get_preprocessing_params()
+    manifest = load_manifest(manifest_path)
+    if manifest is None or manifest.get("params") != params:
+        if manifest is not None:
+            print("Preprocessing parameters changed. Every file will be processed again.")
+        manifest = {"params": params, "files": {}}
+
+    old_entries = manifest["files"]
+    entries = {}
+    to_build = []
+
+    for file, label in zip(files, labels):
+        digest = file_sha256(file)
+        entry = old_entries.get(file.name)
+        output_path = files_path / f"{file.stem}.npy"
+
+        # Reaproveita se o conteúdo não mudou e a saída ainda existe
+        if entry is not None and entry["sha256"] == digest and entry["label"] == label and (entry["n_windows"] == 0 or output_path.exists()):
+            entries[file.name] = entry
+        else:
+            to_build.append((file, label, digest, output_path))
+
+    print(f"Up-to-date Files: {len(files) - len(to_build)} | Files to Process: {len(to_build)}")
+
+    build_files = [item[0] for item in to_build]
+    build_outputs = [item[3] for item in to_build]
 
-    count_relax = 0
-    count_burnout = 0
+    # Número de processos: None usa todos os núcleos da máquina
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
 
-    for file in tqdm(files, desc="Processing Files"):
+    if n_workers > 1 and len(to_build) > 1:
+        # Cada arquivo vai para um processo do pool. O map devolve os resultados
+        # na mesma ordem (ordenada) dos arquivos, então o X/Y final é idêntico ao da versão serial.
+        print(f"Using {n_workers} worker processes")
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(tqdm(executor.map(build_file, build_files, build_outputs, chunksize=1), total=len(to_build), desc="Processing Files"))
+    else:
         # Loop por cada arquivo com barra de progresso
-        filename = file.name
-        
-        # Define o Label baseado no nome do arquivo
-        # 01_lo.txt -> label 0 (relaxado)
-        # 01_hi.txt -> label 1 (Burnout/Carga Alta)
-        label = -1
-        if "lo" in filename.lower():
-            label = 0
-            count_relax += 1
-        elif "hi" in filename.lower():
-            label = 1
-            count_burnout += 1
-        else:
-            continue # Pula arquivos que não são lo ou hi
-        
-        # 1. Carregar
-        raw = read_stew_text_file(file)
-        if raw is None: continue
-
-        # 2. Filtrar (1-40Hz)
-        raw.filter(config.FILTER_LOW, config.FILTER_HIGH, verbose=False)
-        
-        # 3. Cortar em Janelas (Epochs) e em Janelas de 4 segundos, sem sobreposição
-        epochs = mne.make_fixed_length_epochs(raw, duration=config.EPOCH_LENGTH, verbose=False)
-        epoch_data = epochs.get_data(copy=True,verbose=False)
-
-        # 4. Converter para Espectograma e Iterara sobre cada janela
-        for i in range(len(epoch_data)):
-            window = epoch_data[i] # (14 canais, 512 pontos de tempo)
-
-            # Gerar imagem
-            spec = transform_to_spectrogram(window, SFREQ) # O shape do spec será algo como (14, 33, 17) -> (Canais, Freqs, Tempo)
-            
-            processed_list.append(spec)
-            labels_list.append(label)
-
-    if len(processed_list) == 0:
+        results = [build_file(file, output) for file, output in tqdm(zip(build_files, build_outputs), total=len(to_build), desc="Processing Files")]
+
+    for (file, label, digest, output_path), n_windows in zip(to_build, results):
+        entries[file.name] = {"sha256": digest, "label": label, "n_windows": n_windows}
+        if n_windows == 0 and output_path.exists():
+            output_path.unlink()
+
+    # Arquivos sem nenhuma janela (inválidos ou curtos demais) ficam no manifesto com n_windows 0 e fora do store
+    skipped = [file.name for file in files if entries[file.name]["n_windows"] == 0]
+    if skipped:
+        print(f"Skipped Files (invalid or shorter than one window): {len(skipped)} -> {', '.join(skipped)}")
+
+    # Remove saídas de arquivos que não existem mais no dataset
+    for name in set(old_entries) - set(entries):
+        stale_output = files_path / f"{Path(name).stem}.npy"
+        if stale_output.exists():
+            stale_output.unlink()
+
+    manifest["files"] = entries
+    save_manifest(manifest, manifest_path)
+
+    # Gravações válidas na ordem ordenada dos arquivos: (sujeito, label, saída .npy)
+    valid = [(file, label) for file, label in zip(files, labels) if entries[file.name]["n_windows"] > 0]
+    if not valid:
         print("No data found")
         return
+    recordings = [(subject_from_filename(file.name), label, files_path / f"{file.stem}.npy") for file, label in valid]
 
-    # Converter para Tensores Pytorch ou NumPy
-    X = np.array(processed_list, dtype=np.float32)
-    Y = np.array(labels_list, dtype=np.int64)
+    # Só os labels ficam na memória. As janelas continuam nos arquivos de cada gravação.
+    Y = np.concatenate([np.full(entries[file.name]["n_windows"], label, dtype=np.int64) for file, label in valid])
+    sample_shape = np.load(recordings[0][2], mmap_mode='r').shape[1:]
+    n_subjects = len(set(subject for subject, _, _ in recordings))
 
     print(f"\nProcessing Completed")
-    print(f"Total Samples: (Image):  {X.shape[0]}")
-    print(f"Image Shape: {X.shape[1:]} (Channels x Freq x Time)")
+    print(f"Total Samples: (Image):  {len(Y)}")
+    print(f"Image Shape: {sample_shape} (Channels x Freq x Time)")
     print(f"Relaxing Files founded: {count_relax}")
     print(f"Burnout Files founded:   {count_burnout}")
+    print(f"Subjects founded:        {n_subjects}")
     print("-" * 30)
-    print(f"Total of Windows (Samples): {X.shape[0]}")
-    print(f"Image Shape: {X.shape[1:]}")
+    print(f"Total of Windows (Samples): {len(Y)}")
+    print(f"Image Shape: {sample_shape}")
 
     unique, counts = np.unique(Y, return_counts=True)
     distribuicao = dict(zip(unique, counts))
@@ -185,9 +442,26 @@ def process_dataset():
         print("\nERROR: Still no have Class Number 1 (Burnout).")
     else:
         print("\nSuccess! Data is ready to save.")
-        np.save(processed_path / "X_stew.npy", X)
-        np.save(processed_path / "Y_stew.npy", Y)
+
+        # Feature Store: um shard por sujeito + índice (sujeito, condição, janela)
+        write_feature_store(processed_path / "store", recordings, dtype=config.FEATURE_STORE_DTYPE)
+
+        # Arquivos monolíticos antigos, escritos direto no disco (memória constante)
+        if config.WRITE_LEGACY_ARRAYS:
+            X = np.lib.format.open_memmap(processed_path / "X_stew.npy", mode='w+', dtype=np.float32, shape=(len(Y),) + sample_shape)
+            offset = 0
+            for _, _, path in recordings:
+                specs = np.load(path, mmap_mode='r')
+                X[offset:offset + len(specs)] = specs
+                offset += len(specs)
+            X.flush()
+            del X
+            np.save(processed_path / "Y_stew.npy", Y)
         print(f"Saved in {processed_path}")
 
 if __name__ == "__main__":
-    process_dataset()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="STEW Dataset Preprocessing")
+    parser.add_argument("--workers", type=int, default=config.PREPROCESS_WORKERS, help="Number of worker processes (0 = all cores)")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the manifest and process every file again")
+    args = parser.parse_args()
+    process_dataset(n_workers=args.workers or None, rebuild=args.rebuild)
\ No newline at end of file
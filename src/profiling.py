@@ -0,0 +1,154 @@
+"""
+Instrumentação do treino (opcional).
+    1- StageTimer: tempo de parede de cada etapa do passo de treino (dados, forward, protótipos, backward,
+       clip, optimizer), amostras/s e pico de memória por época
+    2- make_profiler: torch.profiler com agenda (wait/warmup/active) que exporta traces do Chrome (.json)
+Tudo fica em results/profiling/<execução>/ para comparar os gargalos entre versões do treino.
+Com o timer desligado (NULL_TIMER), cada etapa é um nullcontext e o treino não paga nada.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+import torch
+import config
+
+try:
+    import resource # só existe em Unix
+except ImportError:
+    resource = None
+
+def reset_peak_rss():
+    # Linux: zera o pico de memória residente (VmHWM) do processo escrevendo 5 em /proc/self/clear_refs.
+    # Retorna False onde não dá (macOS, Windows, /proc só de leitura): aí o pico é o do processo inteiro
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    # Pico de memória residente: VmHWM (Linux, desde o último reset_peak_rss) ou ru_maxrss (desde o início do processo)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss: Linux em KB, macOS em bytes
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if os.uname().sysname == "Darwin" else peak / 1024
+
+def make_run_dir(name=None):
+    # results/profiling/<data-hora> (ou o nome pedido)
+    run_dir = config.PROFILE_DIR / (name or datetime.now().strftime("%Y%m%d-%H%M%S"))
+    run_dir.mkdir(parents=True, exist_ok=True)
+    return run_dir
+
+class StageTimer:
+    """
+    Acumula o tempo de cada etapa dentro de uma época.
+    Em GPU, sincroniza o device no fim de cada etapa para o tempo ser da etapa (e não só do lançamento do kernel).
+    Cada etapa também aparece com o mesmo nome no trace do torch.profiler (record_function).
+    """
+    def __init__(self, device=None, enabled=True):
+        self.enabled = enabled
+        self.sync = device is not None and torch.device(device).type == "cuda"
+        self.history = []
+        self.totals = {}
+        self.epoch_start = None
+        # "epoch" se o pico de RSS foi zerado no start_epoch, "process" se é o pico desde o início do processo
+        self.rss_scope = None
+
+    @contextmanager
+    def _timed(self, name):
+        with torch.profiler.record_function(name):
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                if self.sync:
+                    torch.cuda.synchronize()
+                self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+
+    def stage(self, name):
+        return self._timed(name) if self.enabled else nullcontext()
+
+    def start_epoch(self):
+        if not self.enabled:
+            return
+        self.totals = {}
+        # Pico de RSS só do processo principal (os workers do DataLoader são outros processos)
+        self.rss_scope = "epoch" if reset_peak_rss() else "process"
+        self.epoch_start = time.perf_counter()
+        if self.sync:
+            torch.cuda.reset_peak_memory_stats()
+
+    def end_epoch(self, epoch, n_samples):
+        # Fecha a época: tempo por etapa, amostras/s e pico de memória. Retorna o registro (ou None se desligado)
+        if not self.enabled:
+            return None
+        if self.sync:
+            torch.cuda.synchronize()
+        total = time.perf_counter() - self.epoch_start
+        record = {
+            "epoch": epoch,
+            "seconds": total,
+            "samples": n_samples,
+            "samples_per_sec": n_samples / total if total > 0 else 0.0,
+            "stages": dict(self.totals),
+            # Tempo fora das etapas medidas (laço Python, métricas, .item())
+            "other": max(0.0, total - sum(self.totals.values())),
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_scope": self.rss_scope,
+            "peak_cuda_mb": torch.cuda.max_memory_allocated() / 1024**2 if self.sync else None,
+        }
+        self.history.append(record)
+        return record
+
+    def summary_line(self, record):
+        stages = " | ".join(f"{name} {seconds / record['seconds'] * 100:.0f}%" for name, seconds in record["stages"].items())
+        if record["peak_cuda_mb"] is not None:
+            memory = f"{record['peak_cuda_mb']:.0f} MB CUDA"
+        else:
+            scope = "" if record["peak_rss_scope"] == "epoch" else " (process lifetime)"
+            memory = f"{record['peak_rss_mb'] or 0:.0f} MB RSS{scope}"
+        return f"   Profile -> {record['samples_per_sec']:.0f} samples/s | {stages} | peak {memory}"
+
+    def save(self, path):
+        # Histórico de todas as épocas em JSON
+        with open(path, 'w') as f:
+            json.dump(self.history, f, indent=2)
+
+# Timer desligado, usado quando o treino roda sem instrumentação
+NULL_TIMER = StageTimer(enabled=False)
+
+def make_profiler(trace_dir, wait=1, warmup=1, active=5, device=None):
+    """
+    torch.profiler que ignora `wait` passos, aquece por `warmup` e grava `active` passos.
+    Cada ciclo gravado vira um trace do Chrome em trace_dir (abrir em chrome://tracing ou ui.perfetto.dev).
+    O laço de treino precisa chamar profiler.step() a cada passo.
+    """
+    trace_dir = Path(trace_dir)
+    trace_dir.mkdir(parents=True, exist_ok=True)
+
+    activities = [torch.profiler.ProfilerActivity.CPU]
+    if device is not None and torch.device(device).type == "cuda":
+        activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+    def export_trace(prof):
+        prof.export_chrome_trace(str(trace_dir / f"trace_step{prof.step_num}.json"))
+
+    return torch.profiler.profile(
+        activities=activities,
+        schedule=torch.profiler.schedule(wait=wait, warmup=warmup, active=active, repeat=1),
+        on_trace_ready=export_trace,
+        record_shapes=True,
+        profile_memory=True,
+    )
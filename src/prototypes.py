@@ -0,0 +1,125 @@
+"""
+Artefato de protótipos: os vetores de referência (Relaxado/Burnout) salvos ao lado do modelo.
+Antes, a cada início do servidor, o BurnoutSystem passava todas as janelas do dataset pela rede
+só para tirar duas médias de 64 números. Agora:
+    1- o treino salva eeg_model.prototypes.json junto do eeg_model.pth, com a versão do formato,
+       o hash dos pesos, a impressão digital dos dados, a contagem de cada classe e a média/desvio por classe
+    2- o servidor só lê o JSON (milissegundos) se o hash dos pesos e dos dados baterem
+    3- se o artefato não existir ou estiver desatualizado, os protótipos são recalculados em blocos
+       (somas e contagens acumuladas, o dataset nunca fica inteiro na memória) e o artefato é regravado
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+import numpy as np
+import torch
+import config
+import utils
+from execution import ExecutionMode
+from feature_store import open_feature_store
+
+ARTIFACT_VERSION = 1
+
+def artifact_path(model_path):
+    # results/saved_models/eeg_model.pth -> results/saved_models/eeg_model.prototypes.json
+    model_path = Path(model_path)
+    return model_path.with_name(f"{model_path.stem}.prototypes.json")
+
+def model_hash(state_dict):
+    # SHA-256 dos pesos (nomes, shapes e bytes, em ordem), independente de como o .pth foi serializado
+    digest = hashlib.sha256()
+    for name in sorted(state_dict):
+        tensor = state_dict[name].detach().cpu().contiguous()
+        digest.update(name.encode())
+        digest.update(str(tuple(tensor.shape)).encode())
+        digest.update(tensor.numpy().tobytes())
+    return digest.hexdigest()
+
+def data_fingerprint(store, data_dir=config.PROCESSED_DATA_DIR):
+    # Labels e sujeitos de cada janela + o manifesto do preprocessing (hash de cada .txt e parâmetros da STFT)
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(store.labels).tobytes())
+    digest.update(np.ascontiguousarray(store.subjects).tobytes())
+    manifest_path = Path(data_dir) / "manifest.json"
+    if manifest_path.exists():
+        digest.update(manifest_path.read_bytes())
+    return digest.hexdigest()
+
+def compute_class_statistics(model, store, num_class=2, batch_size=512, device="cpu", execution=None, runner=None):
+    """
+    Média (protótipo) e desvio padrão dos embeddings de cada classe, em blocos de batch_size janelas.
+    Somas em float64 para a média não perder precisão com dezenas de milhares de janelas.
+    runner: módulo já preparado pelo execution.prepare(model) (None prepara aqui).
+    """
+    execution = ExecutionMode.parse(execution)
+    runner = execution.prepare(model) if runner is None else runner
+    sums = sq_sums = counts = None
+    model.eval()
+    with torch.no_grad():
+        for X_batch, Y_batch in store.iter_batches(batch_size=batch_size):
+            embeddings = execution.embed(runner, torch.from_numpy(X_batch).to(device), device).double()
+            targets = torch.from_numpy(Y_batch).long().to(device)
+            batch_sums, batch_counts = utils.get_prototype_sums(embeddings, targets, num_class)
+            batch_sq, _ = utils.get_prototype_sums(embeddings ** 2, targets, num_class)
+            if sums is None:
+                sums, sq_sums, counts = batch_sums, batch_sq, batch_counts
+            else:
+                sums += batch_sums
+                sq_sums += batch_sq
+                counts += batch_counts
+
+    means = utils.prototypes_from_sums(sums, counts)
+    variances = (utils.prototypes_from_sums(sq_sums, counts) - means ** 2).clamp(min=0)
+    return means.float(), variances.sqrt().float(), counts.long()
+
+def build_artifact(model, state_dict, data_dir=config.PROCESSED_DATA_DIR, num_class=2, device="cpu", execution=None,
+                   runner=None):
+    # Calcula os protótipos do dataset de data_dir e monta o dicionário do artefato
+    store = open_feature_store(data_dir)
+    start = time.perf_counter()
+    means, stds, counts = compute_class_statistics(model, store, num_class, device=device, execution=execution,
+                                                   runner=runner)
+    return {
+        "version": ARTIFACT_VERSION,
+        "model_sha256": model_hash(state_dict),
+        "data_sha256": data_fingerprint(store, data_dir),
+        "embedding_dim": int(means.shape[1]),
+        "num_class": num_class,
+        "windows": len(store),
+        "class_counts": counts.tolist(),
+        "prototypes": means.tolist(),
+        "class_std": stds.tolist(),
+        "execution": ExecutionMode.parse(execution).name,
+        "seconds": time.perf_counter() - start,
+    }
+
+def save_artifact(artifact, path):
+    # Escrita atômica, como o manifesto do preprocessing
+    path = Path(path)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(artifact, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+def load_artifact(path, expected_model_sha256=None, expected_data_sha256=None):
+    # Artefato válido ou None (inexistente, corrompido, de outra versão ou de outros pesos/dados)
+    try:
+        with open(path, 'r') as f:
+            artifact = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if artifact.get("version") != ARTIFACT_VERSION:
+        return None
+    if expected_model_sha256 is not None and artifact.get("model_sha256") != expected_model_sha256:
+        return None
+    if expected_data_sha256 is not None and artifact.get("data_sha256") != expected_data_sha256:
+        return None
+    return artifact
+
+def save_prototypes_for_model(model, model_path, data_dir=config.PROCESSED_DATA_DIR, device="cpu"):
+    # Chamado pelo treino logo depois de salvar o .pth
+    artifact = build_artifact(model, model.state_dict(), data_dir, device=device)
+    return save_artifact(artifact, artifact_path(model_path))
@@ -0,0 +1,115 @@
+"""
+Quantização int8 pós-treino do EEGEmbedding (sem re-treinar).
+    1- conv1 + ReLU + MaxPool: int8 estático. As escalas das ativações são medidas antes, na calibração
+       com janelas do X_stew (Feature Store), e ficam fixas no modelo
+    2- fc1 (6720 x 64, quase todos os parâmetros): int8 dinâmico. Pesos em int8 e a escala da entrada
+       é medida a cada chamada (a saída do pooling varia muito de paciente para paciente)
+    python3 src/quantization.py -> results/saved_models/eeg_model.int8.pt
+O arquivo é um TorchScript com os protótipos recalculados pelo próprio modelo int8 (o mesmo contrato do
+backends.py) e é carregado pelo BurnoutSystem(backend="int8"). O relatório de acurácia, desvio das distâncias,
+tamanho e latência contra o fp32 é gerado por results/benchmarks/bench_quantization.py.
+"""
+import argparse
+import copy
+import time
+from pathlib import Path
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.ao.quantization import (QuantStub, DeQuantStub, convert, fuse_modules, get_default_qconfig, prepare,
+                                   quantize_dynamic)
+
+import config
+import prototypes
+from backends import PrototypeScorer, Int8Backend, EagerBackend, export_paths
+from execution import ExecutionMode
+from export_model import load_scorer, export_torchscript, verify
+
+class QuantizableEmbedding(nn.Module):
+    """
+    As camadas do EEGEmbedding com as fronteiras do int8 estático marcadas:
+    quant -> conv1 + relu + pool (int8) -> dequant -> flatten -> fc1 (int8 dinâmico).
+    """
+    def __init__(self, model):
+        super().__init__()
+        self.embedding_dim = model.embedding_dim
+        self.quant = QuantStub()
+        self.conv1 = copy.deepcopy(model.conv1)
+        self.relu = nn.ReLU()
+        self.pool = nn.MaxPool2d(2)
+        self.dequant = DeQuantStub()
+        self.fc1 = copy.deepcopy(model.fc1)
+
+    def forward(self, x):
+        x = self.quant(x)
+        x = self.pool(self.relu(self.conv1(x)))
+        x = self.dequant(x)
+        x = x.reshape(x.size(0), -1)
+        return self.fc1(x)
+
+def set_engine(engine=config.QUANT_ENGINE):
+    # Os kernels int8 dependem da CPU; o motor precisa ser o mesmo na quantização e na inferência
+    if engine not in torch.backends.quantized.supported_engines:
+        raise RuntimeError(f"Quantized engine '{engine}' is not supported here "
+                           f"(available: {torch.backends.quantized.supported_engines})")
+    torch.backends.quantized.engine = engine
+
+def calibration_indices(store, n_windows=config.QUANT_CALIBRATION_WINDOWS, indices=None, seed=0):
+    # Sorteio fixo de janelas (ordenadas, para ler os shards do mmap em sequência)
+    indices = np.arange(len(store)) if indices is None else np.asarray(indices)
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(indices, size=min(n_windows, len(indices)), replace=False))
+
+def quantize_model(model, store, n_windows=config.QUANT_CALIBRATION_WINDOWS, indices=None, batch_size=256,
+                   engine=config.QUANT_ENGINE, seed=0):
+    """
+    Cópia int8 do model (o original não é alterado).
+    indices: janelas de onde sai a calibração (None = todo o Feature Store).
+    """
+    set_engine(engine)
+    qmodel = QuantizableEmbedding(model).eval()
+    # conv1 + relu viram um único kernel int8
+    fuse_modules(qmodel, [["conv1", "relu"]], inplace=True)
+    qmodel.qconfig = get_default_qconfig(engine)
+    qmodel.fc1.qconfig = None # fc1 fica para o int8 dinâmico
+    prepare(qmodel, inplace=True)
+
+    # Calibração: os observers registram a faixa das ativações em janelas reais
+    with torch.no_grad():
+        for X_batch, _ in store.iter_batches(calibration_indices(store, n_windows, indices, seed), batch_size=batch_size):
+            qmodel(torch.from_numpy(X_batch).float())
+    convert(qmodel, inplace=True)
+    quantize_dynamic(qmodel, {nn.Linear}, dtype=torch.qint8, inplace=True)
+    return qmodel.eval()
+
+def export_int8(model_path=config.MODELS_DIR / "eeg_model.pth", data_dir=config.PROCESSED_DATA_DIR,
+                n_windows=config.QUANT_CALIBRATION_WINDOWS, engine=config.QUANT_ENGINE):
+    scorer, metadata, store = load_scorer(model_path, data_dir)
+    path = export_paths(model_path)["int8"]
+
+    start = time.perf_counter()
+    qmodel = quantize_model(scorer.model, store, n_windows, engine=engine)
+    # Protótipos do próprio modelo int8: o paciente é comparado com médias calculadas no mesmo espaço
+    means, _, _ = prototypes.compute_class_statistics(qmodel, store, runner=qmodel)
+    metadata = {**metadata, "quantization": "conv1=static-int8,fc1=dynamic-int8", "engine": engine,
+                "calibration_windows": str(min(n_windows, len(store))), "prototypes": means.tolist()}
+    export_torchscript(PrototypeScorer(qmodel, means).eval(), path, metadata)
+    seconds = time.perf_counter() - start
+
+    # Sem paridade exata com o fp32: só o maior desvio, para conferência (o relatório completo é o bench_quantization.py)
+    backend = Int8Backend(path, metadata)
+    reference = EagerBackend(scorer.model, scorer.prototypes, ExecutionMode.parse("fp32"))
+    x = torch.from_numpy(store.get(np.arange(min(37, len(store)))))
+    size_mb = Path(path).stat().st_size / 1e6
+    print(f"int8 -> {path} ({size_mb:.2f} MB, {seconds:.1f}s) | max diff vs fp32 {verify(backend, reference, x):.1e}")
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Post-training int8 quantization of EEGEmbedding")
+    parser.add_argument("--model", default=str(config.MODELS_DIR / "eeg_model.pth"))
+    parser.add_argument("--data-dir", default=str(config.PROCESSED_DATA_DIR))
+    parser.add_argument("--calibration-windows", type=int, default=config.QUANT_CALIBRATION_WINDOWS)
+    parser.add_argument("--engine", default=config.QUANT_ENGINE)
+    args = parser.parse_args()
+
+    export_int8(Path(args.model), Path(args.data_dir), args.calibration_windows, args.engine)
@@ -0,0 +1,111 @@
+"""
+Leitor rápido dos arquivos .txt do STEW.
+O pd.read_csv com engine='python' é lento, e o texto é a parte mais cara do pipeline.
+Aqui o arquivo é lido direto para um array float32 contíguo (14 canais x Tempo), com:
+    1- detecção do separador (espaço ou vírgula) uma única vez, olhando a primeira linha
+    2- parser em C do NumPy (np.loadtxt)
+    3- cache binário (.npy) opcional, chaveado pelo caminho e por tamanho e data de modificação
+"""
+import hashlib
+import os
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+N_CHANNELS = 14 # O Emotiv EPOC tem 14 canais
+
+def _first_data_line(filepath):
+    # Primeira linha não vazia do arquivo (usada para detectar separador e cabeçalho)
+    with open(filepath, 'r') as f:
+        for line in f:
+            if line.strip():
+                return line
+    return ""
+
+def _is_numeric_line(tokens):
+    try:
+        [float(t) for t in tokens]
+        return len(tokens) > 0
+    except ValueError:
+        return False
+
+def _parse_stew_text(filepath):
+    # Lê o texto e devolve (Tempo x Colunas) em float32
+    first_line = _first_data_line(filepath)
+
+    # Detecta o separador uma vez: vírgula ou espaços (None = qualquer espaço em branco)
+    delimiter = ',' if ',' in first_line else None
+    tokens = first_line.split(delimiter)
+    # Se a primeira linha não for numérica, é cabeçalho
+    skiprows = 0 if _is_numeric_line(tokens) else 1
+
+    try:
+        return np.loadtxt(filepath, dtype=np.float32, delimiter=delimiter, skiprows=skiprows, ndmin=2)
+    except ValueError:
+        # Linhas quebradas ou com texto no meio: mantém só as linhas numéricas
+        sep = ',' if delimiter == ',' else r"\s+"
+        data = pd.read_csv(filepath, sep=sep, header=None, skiprows=skiprows)
+        data = data.apply(pd.to_numeric, errors='coerce').dropna()
+        return data.to_numpy(dtype=np.float32)
+
+def _digest(key):
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+def cache_path(filepath, cache_dir):
+    """
+    Caminho do arquivo de cache de um .txt: <nome>-<digest do caminho>-<digest de tamanho e mtime>.npy.
+    O primeiro digest identifica o .txt (caminho absoluto); o segundo muda a cada alteração dele.
+    """
+    filepath = Path(filepath).resolve()
+    stat = filepath.stat()
+    version = _digest(f"{stat.st_size}|{stat.st_mtime_ns}")
+    return Path(cache_dir) / f"{filepath.stem}-{_digest(str(filepath))}-{version}.npy"
+
+def _save_cache(data, cache_file):
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+
+    # Remove versões antigas do mesmo .txt (mesmo digest de caminho, outro tamanho/mtime).
+    # Nome e digest do caminho têm que bater exatamente: s01.txt não apaga o cache de s01_hi.txt nem o de
+    # outro s01.txt em outra pasta
+    stem, path_digest, _ = cache_file.stem.rsplit('-', 2)
+    for old in cache_file.parent.glob(f"*-{path_digest}-*.npy"):
+        if old != cache_file and old.stem.rsplit('-', 2)[:2] == [stem, path_digest]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    # Escreve em um arquivo temporário e renomeia, para que processos paralelos nunca leiam um .npy pela metade
+    tmp_file = cache_file.with_name(f"{cache_file.stem}.{os.getpid()}.tmp")
+    with open(tmp_file, 'wb') as f:
+        np.save(f, data)
+    os.replace(tmp_file, cache_file)
+
+def load_stew_array(filepath, cache_dir=None):
+    """
+    Lê o arquivo .txt do STEW e retorna um array float32 contíguo (14, T).
+    Retorna None se o arquivo tiver menos de 14 canais.
+    Se cache_dir for informado, guarda/recupera o array de um .npy nessa pasta.
+    """
+    cache_file = None
+    if cache_dir is not None:
+        cache_file = cache_path(filepath, cache_dir)
+        if cache_file.exists():
+            try:
+                return np.load(cache_file)
+            except (OSError, ValueError):
+                pass # cache corrompido, lê o .txt de novo
+
+    data = _parse_stew_text(filepath)
+
+    # Garante que temos 14 canais. Se tiver mais, corta. Se tiver menos, erro.
+    if data.shape[1] < N_CHANNELS:
+        return None
+
+    # O arquivo vem (Tempo x Canais), então fazemos a transposta
+    data_np = np.ascontiguousarray(data[:, :N_CHANNELS].T)
+
+    if cache_file is not None:
+        _save_cache(data_np, cache_file)
+
+    return data_np
@@ -0,0 +1,117 @@
+"""
+Pré-processamento em tempo real (streaming).
+O preprocess_file precisa do arquivo inteiro (filtro FIR de fase zero no sinal todo + janelamento da gravação completa).
+Aqui o sinal chega em pedaços (chunks) de qualquer tamanho, vindos direto do headset, e:
+    1- o filtro passa-banda é causal (IIR Butterworth) e guarda o estado entre os chunks
+    2- as amostras filtradas ficam num buffer limitado a pouco mais de uma janela
+    3- assim que uma janela de 4s (ou um hop) fica completa, o espectrograma dela é devolvido
+Como o filtro é causal, o resultado não é idêntico ao do preprocess_file (que usa filtro de fase zero),
+mas a memória é constante e cada janela sai com a latência de um único chunk.
+"""
+import argparse
+import time
+import numpy as np
+from scipy import signal
+import config
+from filters import design_causal_bandpass
+from preprocessing import make_windows, transform_to_spectrogram_batch
+
+SFREQ = config.SAMPLE_RATE
+
+class StreamingPreprocessor:
+    """
+    Recebe chunks (N_amostras, 14 canais) e devolve os espectrogramas (N_janelas, 14, 33, 17)
+    das janelas que ficaram completas com aquele chunk (pode ser zero janelas).
+    """
+    def __init__(self, sfreq=SFREQ, n_channels=len(config.CHANNELS), window_length=config.EPOCH_LENGTH,
+                 hop_length=config.EPOCH_HOP, l_freq=config.FILTER_LOW, h_freq=config.FILTER_HIGH, filter_order=4):
+        self.sfreq = sfreq
+        self.n_channels = n_channels
+        self.window_samples = int(round(window_length * sfreq))
+        # Sem hop, as janelas não se sobrepõem
+        self.hop_samples = int(round((hop_length or window_length) * sfreq))
+        self.sos = design_causal_bandpass(sfreq, l_freq, h_freq, filter_order)
+
+        # Shape de um espectrograma, usado para devolver um array vazio quando não há janela pronta
+        dummy = np.zeros((1, n_channels, self.window_samples))
+        self.spec_shape = transform_to_spectrogram_batch(dummy, sfreq).shape[1:]
+
+        self.reset()
+
+    def reset(self):
+        # Começa um novo stream (novo paciente/sessão)
+        self.zi = None
+        self.buffer = np.empty((self.n_channels, 0), dtype=np.float64)
+        self.pending_skip = 0 # amostras a descartar quando o hop é maior que a janela
+        self.samples_seen = 0
+        self.windows_emitted = 0
+
+    def push(self, chunk):
+        # chunk: (N_amostras, 14) como vem do arquivo/headset, ou uma única amostra (14,)
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if chunk.ndim == 1:
+            chunk = chunk[np.newaxis, :]
+        if chunk.ndim != 2 or chunk.shape[1] != self.n_channels:
+            raise ValueError(f"Expected chunk with shape (n_samples, {self.n_channels}), got {chunk.shape}")
+        if chunk.shape[0] == 0:
+            return np.empty((0,) + self.spec_shape, dtype=np.float32)
+
+        data = chunk.T # (Canais x Tempo)
+
+        # Estado inicial do filtro em regime permanente com a primeira amostra de cada canal,
+        # para o offset DC do Emotiv (~4000 µV) não gerar um transitório enorme no começo
+        if self.zi is None:
+            self.zi = signal.sosfilt_zi(self.sos)[:, np.newaxis, :] * data[np.newaxis, :, :1]
+
+        filtered, self.zi = signal.sosfilt(self.sos, data, axis=-1, zi=self.zi)
+        self.samples_seen += data.shape[1]
+
+        if self.pending_skip:
+            skip = min(self.pending_skip, filtered.shape[1])
+            filtered = filtered[:, skip:]
+            self.pending_skip -= skip
+
+        self.buffer = np.concatenate([self.buffer, filtered], axis=1)
+
+        # Quantas janelas completas cabem no buffer
+        available = self.buffer.shape[1]
+        if available < self.window_samples:
+            return np.empty((0,) + self.spec_shape, dtype=np.float32)
+        n_ready = (available - self.window_samples) // self.hop_samples + 1
+
+        # Janelas como views do buffer (sem cópia)
+        windows = make_windows(self.buffer, self.window_samples, self.hop_samples)
+        specs = transform_to_spectrogram_batch(windows, self.sfreq)
+
+        # Descarta o que já foi usado: o buffer nunca passa de uma janela + um chunk
+        consumed = n_ready * self.hop_samples
+        self.pending_skip = max(0, consumed - available)
+        self.buffer = self.buffer[:, min(consumed, available):]
+        self.windows_emitted += n_ready
+
+        return specs
+
+if __name__ == "__main__":
+    # Simula um headset: lê um .txt e envia em chunks, medindo a latência de cada janela
+    from stew_reader import load_stew_array
+
+    parser = argparse.ArgumentParser(description="Simulate a real-time EEG stream from a STEW file")
+    parser.add_argument("file", help="STEW .txt file")
+    parser.add_argument("--chunk", type=int, default=32, help="Samples per chunk (32 = 0.25s)")
+    args = parser.parse_args()
+
+    data = load_stew_array(args.file) # (14, T)
+    stream = StreamingPreprocessor()
+    latencies = []
+
+    for start in range(0, data.shape[1], args.chunk):
+        chunk = data[:, start:start + args.chunk].T
+        t0 = time.perf_counter()
+        specs = stream.push(chunk)
+        if len(specs):
+            latencies.append(time.perf_counter() - t0)
+
+    print(f"Samples streamed: {stream.samples_seen}")
+    print(f"Windows emitted:  {stream.windows_emitted}")
+    if latencies:
+        print(f"Latency per window push -> Mean: {np.mean(latencies)*1000:.2f} ms | Max: {np.max(latencies)*1000:.2f} ms")
@@ -0,0 +1,199 @@
+"""
+Busca de hiperparâmetros com Successive Halving.
+Antes lr, tamanho do batch (episódio), épocas e tamanho do embedding eram fixos no train_fewshot.py e no model.py.
+Aqui:
+    1- o espaço de busca é um dicionário nome -> distribuição (log_uniform, uniform, int ou choice)
+    2- n_trials configurações são sorteadas e todas treinam min_epochs em um pool de processos
+    3- só a melhor fração 1/eta passa para o próximo degrau (eta vezes mais épocas), até max_epochs.
+       Cada trial continua do próprio checkpoint (checkpoint.py), então nenhuma época é treinada duas vezes
+    4- os trials, os resultados de cada degrau e a melhor configuração vão para results/sweeps/<nome>.json
+A poda e a escolha usam só a validação (sujeitos tirados do treino do primeiro fold); o grupo de teste do fold
+só é avaliado no fim, para o vencedor.
+Rodar de novo com o mesmo nome e semente sorteia as mesmas configurações e retoma os checkpoints já salvos.
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import shutil
+import time
+import numpy as np
+import torch
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+from cross_validation import init_worker, make_folds, save_results
+from feature_store import open_feature_store
+
+# lr e tamanho do embedding; k_shot e n_query definem o tamanho do episódio (2 x (K + Q) janelas por passo)
+DEFAULT_SPACE = {
+    "lr": ("log_uniform", 1e-5, 1e-2),
+    "embedding_dim": ("choice", [32, 64, 128]),
+    "k_shot": ("choice", [3, 5, 8]),
+    "n_query": ("choice", [5, 11, 15]),
+}
+
+def sample_config(space, rng):
+    # Uma configuração sorteada do espaço de busca (tipos do Python, para ir direto para o JSON)
+    params = {}
+    for name, (kind, *args) in space.items():
+        if kind == "log_uniform":
+            params[name] = float(math.exp(rng.uniform(math.log(args[0]), math.log(args[1]))))
+        elif kind == "uniform":
+            params[name] = float(rng.uniform(args[0], args[1]))
+        elif kind == "int":
+            params[name] = int(rng.integers(args[0], args[1] + 1))
+        elif kind == "choice":
+            params[name] = args[0][rng.integers(len(args[0]))]
+        else:
+            raise ValueError(f"Unknown distribution '{kind}' for {name}")
+    return params
+
+def rung_schedule(min_epochs, max_epochs, eta):
+    # Épocas de cada degrau: min, min*eta, min*eta², ... (o último é sempre max_epochs)
+    rungs = [min_epochs]
+    while rungs[-1] * eta < max_epochs:
+        rungs.append(rungs[-1] * eta)
+    if rungs[-1] != max_epochs:
+        rungs.append(max_epochs)
+    return rungs
+
+def run_trial(trial, params, num_epochs, trial_dir, train_indices, val_indices, test_indices, seed):
+    """
+    Treina (ou continua treinando) um trial até num_epochs e valida no fim (em val_indices).
+    O teste também é avaliado no fim (test_*), mas o sweep só olha para ele no vencedor.
+    Fica no nível do módulo para poder ser enviado aos processos do pool.
+    """
+    from data_loader import EEGDataset
+    from train_fewshot import train_model
+
+    # Só vale no primeiro degrau: nos seguintes, o estado aleatório vem do checkpoint
+    torch.manual_seed(seed)
+    start = time.perf_counter()
+    # Valida e salva o checkpoint só no fim do degrau; sem workers do DataLoader (o paralelismo está nos trials)
+    _, history = train_model(EEGDataset(indices=train_indices), EEGDataset(indices=test_indices),
+                             num_epochs=num_epochs, eval_every=num_epochs, device=torch.device("cpu"), num_workers=0,
+                             verbose=False, checkpoint_dir=trial_dir, checkpoint_every=num_epochs, resume=True,
+                             val_dataset=EEGDataset(indices=val_indices), **params)
+    final = history[-1]
+    return {
+        "trial": trial,
+        "epochs": num_epochs,
+        "val_loss": final["val_loss"],
+        "val_acc": final["val_acc"],
+        "val_ci95": final["val_ci95"],
+        "test_loss": final["test_loss"],
+        "test_acc": final["test_acc"],
+        "test_ci95": final["test_ci95"],
+        "seconds": time.perf_counter() - start,
+    }
+
+def run_sweep(name="sweep", space=DEFAULT_SPACE, n_trials=27, min_epochs=5, max_epochs=45, eta=3,
+              metric=config.EARLY_STOP_METRIC, split="subject", n_workers=None, threads_per_worker=1, seed=0,
+              keep_pruned=False):
+    """
+    Successive Halving síncrono: cada degrau espera todos os trials vivos antes de cortar.
+    metric: "val_loss" (menor é melhor) ou "val_acc" (maior é melhor), medida na validação: sujeitos
+    (config.VAL_FRACTION) tirados do treino do primeiro fold do split. O teste desse fold nunca entra na poda nem na
+    escolha; ele só aparece em results["best"] (test_loss, test_acc, test_ci95).
+    Retorna o dicionário salvo em results/sweeps/<name>.json.
+    """
+    higher_is_better = metric.endswith("acc")
+    store = open_feature_store() # levanta FileNotFoundError se o preprocessing.py não foi rodado
+    train_indices, test_indices = make_folds(store.labels, store.subjects, split, n_folds=5, seed=seed)[0]
+    # Validação com sujeitos do treino: escolher pelo teste deixaria a acurácia de teste do vencedor otimista
+    train_indices, val_indices = store.subject_split(config.VAL_FRACTION, indices=train_indices)
+
+    sweep_dir = config.SWEEP_DIR / name
+    output_path = config.SWEEP_DIR / f"{name}.json"
+    rng = np.random.default_rng(seed)
+    trials = [{"trial": i, "params": sample_config(space, rng), "status": "running", "rungs": []}
+              for i in range(n_trials)]
+    rungs = rung_schedule(min_epochs, max_epochs, eta)
+
+    results = {
+        "config": {
+            "n_trials": n_trials, "min_epochs": min_epochs, "max_epochs": max_epochs, "eta": eta, "rungs": rungs,
+            "metric": metric, "split": split, "seed": seed, "val_fraction": config.VAL_FRACTION,
+            "space": {k: list(v) for k, v in space.items()},
+        },
+        "trials": trials,
+        "best": None,
+    }
+
+    if n_workers is None:
+        n_workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+    print(f"Sweep '{name}': {n_trials} trials, rungs {rungs} epochs, eta {eta}, metric {metric}, "
+          f"{n_workers} processes x {threads_per_worker} threads")
+
+    start = time.perf_counter()
+    alive = list(range(n_trials))
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                             initializer=init_worker, initargs=(threads_per_worker,)) as executor:
+        for level, epochs in enumerate(rungs):
+            futures = {i: executor.submit(run_trial, i, trials[i]["params"], epochs, sweep_dir / f"trial_{i:03d}",
+                                          train_indices, val_indices, test_indices, seed + i)
+                       for i in alive}
+            for i, future in futures.items():
+                try:
+                    trials[i]["rungs"].append(future.result())
+                except Exception as e:
+                    # Configuração inválida (ex: classe com menos janelas que K + Q) não derruba a busca
+                    trials[i]["status"] = "failed"
+                    trials[i]["error"] = repr(e)
+
+            scored = [i for i in alive if trials[i]["status"] != "failed"]
+            # Só a validação decide; o test_* de cada degrau fica no JSON mas não é olhado aqui
+            scored.sort(key=lambda i: trials[i]["rungs"][-1][metric], reverse=higher_is_better)
+            for i in scored:
+                r = trials[i]["rungs"][-1]
+                print(f" -> rung {level} ({epochs:>3} epochs) trial {i:03d}: {metric} {r[metric]:.4f} {trials[i]['params']}")
+
+            if level + 1 < len(rungs):
+                # Os melhores 1/eta seguem; o resto é podado aqui
+                keep = max(1, len(scored) // eta)
+                for i in scored[keep:]:
+                    trials[i]["status"] = "pruned"
+                    if not keep_pruned:
+                        shutil.rmtree(sweep_dir / f"trial_{i:03d}", ignore_errors=True)
+                alive = scored[:keep]
+            else:
+                for i in scored:
+                    trials[i]["status"] = "completed"
+                alive = scored
+
+            if scored:
+                best = trials[scored[0]]
+                results["best"] = {"trial": best["trial"], "params": best["params"], **best["rungs"][-1],
+                                   "checkpoint_dir": str(sweep_dir / f"trial_{best['trial']:03d}")}
+            results["wall_seconds"] = time.perf_counter() - start
+            # Salva a cada degrau: uma busca interrompida deixa o progresso registrado
+            save_results(results, output_path)
+
+    if results["best"] is not None:
+        best = results["best"]
+        print(f"Best trial {best['trial']:03d} ({best['epochs']} epochs): {metric} {best[metric]:.4f} | "
+              f"Val Acc {best['val_acc']*100:.2f}% | Test Acc {best['test_acc']*100:.2f}% ± "
+              f"{best['test_ci95']*100:.2f} -> {best['params']}")
+    print(f"Total time: {results['wall_seconds']:.1f}s. Saved in {output_path}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep with successive halving")
+    parser.add_argument("--name", default="sweep")
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--min-epochs", type=int, default=5)
+    parser.add_argument("--max-epochs", type=int, default=45)
+    parser.add_argument("--eta", type=int, default=3, help="Keep the best 1/eta trials at each rung")
+    parser.add_argument("--metric", choices=["val_loss", "val_acc"], default=config.EARLY_STOP_METRIC)
+    parser.add_argument("--split", choices=["subject", "random"], default="subject")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel trials (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="PyTorch threads per process")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-pruned", action="store_true", help="Keep the checkpoints of pruned trials")
+    args = parser.parse_args()
+
+    run_sweep(args.name, n_trials=args.trials, min_epochs=args.min_epochs, max_epochs=args.max_epochs, eta=args.eta,
+              metric=args.metric, split=args.split, n_workers=args.workers, threads_per_worker=args.threads,
+              seed=args.seed, keep_pruned=args.keep_pruned)
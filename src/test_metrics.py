@@ -1,7 +1,10 @@
 import torch
 import numpy as np
 from model import EEGEmbedding
+from feature_store import open_feature_store
 import utils as utils
+from episodes import evaluate_episodes
+import config
 from sklearn.metrics import classification_report, confusion_matrix
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -11,34 +14,37 @@ device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 print(f"Starting Metrics on the Device: {device}")
 
 # 1. Carregar Modelo
-model = EEGEmbedding().to(device)
-model.load_state_dict(torch.load('results/saved_models/eeg_model.pth', map_location=device))
+# O tamanho do embedding vem dos próprios pesos
+state_dict = torch.load('results/saved_models/eeg_model.pth', map_location=device)
+model = EEGEmbedding(embedding_dim=state_dict["fc1.weight"].shape[0]).to(device)
+model.load_state_dict(state_dict)
 model.eval()
 
-# 2. Carregar Dados
-X = np.load('data/processed/X_stew.npy')
-Y = np.load('data/processed/Y_stew.npy')
-total_samples = len(Y)
+# 2. Carregar Dados (Feature Store com mmap, as janelas são lidas em blocos)
+store = open_feature_store()
 
 # 3. Separar em Treino (Referências) e Teste (Validação)
-# Vamos usar 80% para criar os protótipos e testar nos 20% restantes
-split_idx = int(total_samples * 0.8)
+# Isolamento de Sujeito: 80% dos sujeitos criam os protótipos e os 20% restantes são testados
+ref_idx, test_idx = store.subject_split(test_fraction=0.2)
 
-# Dados para criar os protótipos
-X_ref = torch.from_numpy(X[:split_idx]).float().to(device)
-Y_ref = torch.from_numpy(Y[:split_idx]).long().to(device)
+print(f"Reference Data: {len(ref_idx)} samples")
+print(f"Test Data:      {len(test_idx)} samples")
 
-# Dados para TESTAR (A IA nunca viu esses para criar o mapa)
-X_test = torch.from_numpy(X[split_idx:]).float().to(device)
-Y_test = torch.from_numpy(Y[split_idx:]).long().to(device)
+def embed_indices(indices, batch_size=256):
+    # Gera os embeddings bloco a bloco. Só os vetores de 64 números ficam na memória.
+    embeddings = []
+    with torch.no_grad():
+        for X_batch, _ in store.iter_batches(indices, batch_size=batch_size):
+            embeddings.append(model(torch.from_numpy(X_batch).to(device)))
+    return torch.cat(embeddings)
 
-print(f"Reference Data: {len(Y_ref)} samples")
-print(f"Test Data:      {len(Y_test)} samples")
+Y_ref = torch.from_numpy(store.labels[ref_idx]).long().to(device)
+Y_test = torch.from_numpy(store.labels[test_idx]).long().to(device)
 
 # 4. Gerar Protótipos usando os dados de Referência
 print("Generating Map Reference")
 with torch.no_grad():
-    embeddings_ref = model(X_ref)
+    embeddings_ref = embed_indices(ref_idx)
     prototypes = utils.get_prototypes(embeddings_ref, Y_ref, 2)
 
 # 5. Rodar o Teste em Lote
@@ -47,15 +53,14 @@ y_true = []
 y_pred = []
 
 with torch.no_grad():
-    # Gera embeddings para todos os dados de teste de uma vez
-    embeddings_test = model(X_test)
+    # Gera embeddings para todos os dados de teste
+    embeddings_test = embed_indices(test_idx)
     
-    # Calcula distâncias para Relaxado (0) e Burnout (1)
-    dists_0 = utils.calc_euclidiean_distance(embeddings_test, prototypes[0].unsqueeze(0))
-    dists_1 = utils.calc_euclidiean_distance(embeddings_test, prototypes[1].unsqueeze(0))
+    # Calcula distâncias para Relaxado (0) e Burnout (1): tabela (N_teste, 2)
+    dists = utils.calc_distance_matrix(embeddings_test, prototypes)
     
-    # Compara: Se dist0 < dist1, prediz 0. Senão, prediz 1.
-    predictions = (dists_1 < dists_0).long()
+    # Prediz a classe do protótipo mais perto
+    predictions = torch.argmin(dists, dim=1)
     
     # Salva para métricas
     y_pred = predictions.cpu().numpy()
@@ -75,6 +80,12 @@ print("\nMatriz de Confusão:")
 cm = confusion_matrix(y_true, y_pred)
 print(cm)
 
+# Avaliação Episódica: milhares de episódios N-way K-shot com suporte dos sujeitos de referência
+# e query dos sujeitos de teste, sobre os embeddings já calculados acima
+episodic = evaluate_episodes(embeddings_ref, Y_ref, embeddings_test, Y_test)
+print(f"\nEpisodic Accuracy ({config.EPISODE_N_WAY}-way {config.EPISODE_K_SHOT}-shot, {episodic['episodes']} episodes): "
+      f"{episodic['accuracy']*100:.2f}% ± {episodic['ci95']*100:.2f}")
+
 # Salvar imagem da Matriz
 try:
     plt.figure(figsize=(8, 6))
@@ -1,92 +1,71 @@
+import argparse
+from contextlib import nullcontext
+from pathlib import Path
 import numpy as np
 import torch
 import torch.optim as optim
-from torch.utils.data import TensorDataset, DataLoader, random_split
 
 from model import EEGEmbedding
+from data_loader import EEGDataset, make_loader
+from episodes import EpisodeSampler, split_episode, evaluate_episodes
+from checkpoint import EarlyStopping, capture_rng_state, restore_rng_state, save_checkpoint, save_best_model, load_checkpoint
+from execution import ExecutionMode
+from prototypes import save_prototypes_for_model
+from profiling import NULL_TIMER, StageTimer, make_profiler, make_run_dir
+import config
 import utils
 
 # Escolhe se usa Placa de Video (GPU) ou o Processador (CPU)
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-print("Loading Full Dataset")
-try:
-    X_numpy = np.load('data/processed/X_stew.npy')
-    Y_numpy = np.load('data/processed/Y_stew.npy')
-except FileNotFoundError:
-    print("ERROR: .NPY FILE NOT FOUND. Run preprocessing.py first.")
-    exit()
-
-# Código sem o Random Split para o estudo do Ablation Study
-# Convertendo para tensors e enviando para o device
-X_tensor = torch.from_numpy(X_numpy).float().to(device)
-Y_tensor = torch.from_numpy(Y_numpy).long().to(device)
-full_dataset = TensorDataset(X_tensor, Y_tensor)
-
-# Definindo o ponto de corte 80/20
-total_size = len(full_dataset)
-train_size = int(0.8 * total_size)
-test_size = total_size - train_size
-
-# Fatiamento Sequencial (Slicing)
-# Isso garante que os primeiros 80% fiquem no treino
-# E os últimos 20% fiquem no teste
-# train_dataset = TensorDataset(X_tensor[:train_size], Y_tensor[:train_size])
-# test_dataset = TensorDataset(X_tensor[train_size:], Y_tensor[train_size:])
-
-# --- Mudança aqui para o Ablation Study ---
-# Comentar as linhas 22 e 23 e Descomentar a linha abaixo
-train_dataset, test_dataset = random_split(full_dataset, [train_size, test_size])
-
-# Criando loaders finais
-# shuffle=True no treino para variar o treinamento dentro do grupo de treino
-train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True)
-# shuffle=False no teste para manter a ordem e consistência
-test_loader = DataLoader(test_dataset, batch_size=32, shuffle=False)
-
-print(f"Total samples: {total_size}") 
-print(f"Train samples: {len(train_dataset)}")
-print(f"Test samples:  {len(test_dataset)}")
-
-# O optimizer é o treinador da rede, ele calcula a matemática para ajustar os pesos
-""" 
-Foi usado o Adam porque ele adapta a velocidade de aprendizado automaticamente e
-ele é bom para dados complexos e ruidosos. 
-
-Os parâmetros:
-    1. params: diz quais pesos ele tem permissão para mexer. Foi usado o 
-        models.parameters() para entregar a lista de todos os pesos da rede.
-    2. lr(Learning Rate): é a taxa de aprendizado. 0.01(1e-3) é um valor padrão seguro.
-        Se for muito alto, a rede pula a resposta certa. Se for muito baixo,
-        ela demora uma eternidade para aprender.
-"""
-
-# Inicializar o Modelo
-model = EEGEmbedding().to(device)
-
-optimizer = optim.Adam(params=model.parameters(), lr=0.0001)
-criterion = torch.nn.CrossEntropyLoss()
-
-print("Dataset Loaded. Starting Training Process")
-
-num_epochs = 50
-
-for epoch in range(num_epochs):
+def make_loaders(train_dataset, test_dataset, num_workers=config.LOADER_WORKERS, k_shot=config.EPISODE_K_SHOT,
+                 n_query=config.EPISODE_N_QUERY):
+    # Criando loaders finais
+    # Treino em episódios N-way K-shot: cada batch é um episódio (suporte + query) sorteado das tabelas por classe
+    # O número de episódios por época cobre o grupo de treino uma vez, em média
+    episode_size = config.EPISODE_N_WAY * (k_shot + n_query)
+    # A semente do sorteio vem do gerador do PyTorch: com torch.manual_seed, os episódios também se repetem
+    train_sampler = EpisodeSampler(train_dataset.labels, k_shot=k_shot, n_query=n_query,
+                                   n_episodes=max(1, len(train_dataset) // episode_size),
+                                   seed=int(torch.randint(2**31, (1,))))
+    train_loader = make_loader(train_dataset, batch_sampler=train_sampler, num_workers=num_workers)
+    # shuffle=False no teste para manter a ordem e consistência (os embeddings são calculados uma vez por validação)
+    test_loader = make_loader(test_dataset, batch_size=256, shuffle=False, num_workers=num_workers)
+    return train_loader, test_loader
+
+def train_one_epoch(model, train_loader, optimizer, criterion, device=device, timer=NULL_TIMER, profiler=None,
+                    execution=None):
+    """
+    Um ciclo de treino sobre os episódios do train_loader. Retorna (loss médio, acurácia média).
+    timer (profiling.StageTimer) mede cada etapa do passo; profiler (torch.profiler) avança um passo por episódio.
+    execution (execution.ExecutionMode ou texto como "bf16+channels_last") define como o forward roda;
+    model deve ser o módulo devolvido por execution.prepare().
+    """
+    execution = ExecutionMode.parse(execution)
+    # Formato dos episódios vem do EpisodeSampler do loader
+    n_way, k_shot = train_loader.sampler.n_way, train_loader.sampler.k_shot
     model.train()
     total_train_loss = 0
     total_train_acc = 0
     train_batches = 0
-    # Criar um loop que cria um ciclo de treino que se repete várias vezes
-    for inputs, targets in train_loader:
-
-        # Por segurança
-        inputs, targets = inputs.to(device), targets.to(device)
+    batches = iter(train_loader)
+    while True:
+
+        # Espera do DataLoader + cópia para o device
+        with timer.stage("data"):
+            batch = next(batches, None)
+            if batch is not None:
+                # Os episódios chegam na CPU (memória fixada com GPU): a cópia para o device é assíncrona
+                inputs = batch[0].to(device, non_blocking=True)
+        if batch is None:
+            break
 
         # limpa a memória do passo anterior (zera os gradientes)
         optimizer.zero_grad()
 
         # faz a previsão (forward = o modelo trabalha), gera os embeddings (vetores de 64 números)
-        embeddings = model(inputs)
+        with timer.stage("forward"):
+            embeddings = execution.embed(model, inputs, device)
 
         # calcula o erro, função de perda
         """
@@ -96,26 +75,19 @@ for epoch in range(num_epochs):
             3. usar uma função chamada LogSoftmax/CrossEntropy para transformar as distâncias em probabilidade
         """
 
-        # Few-Shot Logic
-            # Se o batch for muito pequeno no final (sobra), pula para evitar erro
-        if len(targets) < 2: continue
-            # Passar os embeddings gerados, os targets verdadeiros e o número de classes
-        prototypes = utils.get_prototypes(embeddings, targets, 2)
-        
-            # Calcular as distâncias
-                # Distância de cada amostra até Protótipo 0 (relaxado)
-        dist_0 = utils.calc_euclidiean_distance(embeddings, prototypes[0])
-                # Distância de cada amostra até  Protótipo 1 (burnout)
-        dist_1 = utils.calc_euclidiean_distance(embeddings, prototypes[1])
-
-        # Empilhar as distâncias lado a lado para formar uma tabela (Batch, 2)
-        # Coluna 0: distância pro relaxado | Coluna 1: distância pro burnout
-        dists = torch.stack([dist_0, dist_1], dim=1)
-
-        # usa-se o -dists pois CrossEntropy gosta de números maiores para a classe certa
-        # mas na distância, o melhor é o menor número (mais perto)
-        # colocando negativo, a menor distância vira o maior número
-        loss = criterion(-dists, targets)
+        with timer.stage("prototypes"):
+            # Few-Shot Logic
+                # Os K embeddings de suporte de cada classe viram o protótipo dela
+                # As queries são classificadas pela distância até os protótipos (targets relativos ao episódio)
+            prototypes, query, targets = split_episode(embeddings, n_way, k_shot)
+
+                # Calcular as distâncias de cada query até cada protótipo, formando uma tabela (Queries, N_way)
+            dists = utils.calc_distance_matrix(query, prototypes)
+
+            # usa-se o -dists pois CrossEntropy gosta de números maiores para a classe certa
+            # mas na distância, o melhor é o menor número (mais perto)
+            # colocando negativo, a menor distância vira o maior número
+            loss = criterion(-dists, targets)
 
         # Cálculo da Acurácia
         # torch.argmin() pois é calculado a menor distância entre os pontos, e a menor distância é retornada
@@ -130,66 +102,288 @@ for epoch in range(num_epochs):
         accuracy = correct_predictions.mean()
 
         # descobre quem errou (calcula os gradientes)
-        loss.backward()
+        with timer.stage("backward"):
+            loss.backward()
 
         # Se o gradiente for maior que 1.0, corta ele para 1.0
         # Isso impede que o erro de ir para o infinito (NaN)
-        torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
+        with timer.stage("clip"):
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=1.0)
 
         # corrige os pesos (atualiza a rede)
-        optimizer.step()
+        with timer.stage("optimizer"):
+            optimizer.step()
 
         # A função do .item() é pegar o valor do tensor para que ele seja um valor operável em Python (int, float)
         total_train_loss += loss.item()
         total_train_acc += accuracy.item()
         train_batches += 1
 
+        if profiler is not None:
+            profiler.step()
+
     # Calcula a média da época inteira
-    avg_train_loss = total_train_loss / train_batches
-    avg_train_acc = total_train_acc / train_batches
-
-    # A cada 5 épocas, é testado o modelo nos dados que nunca viu (test set) e imprime o status
-    if (epoch + 1) % 5 == 0:
-        model.eval() # Congela o modelo (desativa dropout e batchnorm se houver)
-        total_val_loss = 0
-        total_val_acc = 0
-        val_batches = 0
-
-        with torch.no_grad(): # Desliga o cálculo pesado de gradientes para economizar na memória na validação
-            for inputs, targets in test_loader:
-                inputs, targets = inputs.to(device), targets.to(device) # Garante envio para a CPU
-
-                embeddings = model(inputs)
-                if len(targets) < 2: continue # Pula os batches quebrados
-                
-                # Recalcula protótipos baseados no batch de teste
-                prototypes = utils.get_prototypes(embeddings, targets, 2)
-                dist_0 = utils.calc_euclidiean_distance(embeddings, prototypes[0])
-                dist_1 = utils.calc_euclidiean_distance(embeddings, prototypes[1])
-                dists = torch.stack([dist_0, dist_1], dim=1)
-                
-                loss = criterion(-dists, targets)
-                
-                # Acurácia de Teste
-                predicted_class = torch.argmin(dists, dim=1)
-                accuracy = (predicted_class == targets).float().mean()
-                
-                total_val_loss += loss.item()
-                total_val_acc += accuracy.item()
-                val_batches += 1
-        
-        #Médias de Validação
-        avg_val_loss = total_val_loss / val_batches
-        avg_val_acc = total_val_acc / val_batches
-
-        print(f"Epoch: {epoch+1}/{num_epochs}")
-        print(f"   Train -> Loss: {avg_train_loss:.4f} | Acc: {avg_train_acc*100:.2f}%")
-        print(f"   Test  -> Error (Loss): {avg_val_loss:.4f} | Acc: {avg_val_acc*100:.2f}%")
-        print("-" * 60)
-
-
-print("Training Completed")
-
-# salvar o cérebro treinado num arquivo
-torch.save(model.state_dict(), 'results/saved_models/eeg_model.pth')
-print("Model saved in results/models/eeg_model.pth")
\ No newline at end of file
+    return total_train_loss / train_batches, total_train_acc / train_batches
+
+def validate(model, test_loader, test_labels, device=device, n_episodes=config.EVAL_EPISODES, execution=None):
+    # Testa o modelo nos dados que nunca viu (test set). Retorna o dicionário do evaluate_episodes
+    execution = ExecutionMode.parse(execution)
+    model.eval() # Congela o modelo (desativa dropout e batchnorm se houver)
+
+    with torch.no_grad(): # Desliga o cálculo pesado de gradientes para economizar na memória na validação
+        # Embeddings do teste calculados uma única vez
+        test_embeddings = torch.cat([execution.embed(model, inputs.to(device, non_blocking=True), device)
+                                     for inputs, _ in test_loader])
+
+        # Milhares de episódios N-way K-shot sobre os embeddings em cache, em lote (média + intervalo de 95%)
+        return evaluate_episodes(test_embeddings, test_labels, n_episodes=n_episodes)
+
+def train_model(train_dataset, test_dataset, num_epochs=50, lr=0.0001, eval_every=5, device=device,
+                num_workers=config.LOADER_WORKERS, verbose=True, profile=config.PROFILE_TRAINING, trace=False,
+                profile_dir=None, checkpoint_dir=None, checkpoint_every=config.CHECKPOINT_EVERY, resume=False,
+                patience=None, monitor=config.EARLY_STOP_METRIC, execution=None, embedding_dim=config.EMBEDDING_DIM,
+                k_shot=config.EPISODE_K_SHOT, n_query=config.EPISODE_N_QUERY, val_dataset=None):
+    """
+    Treina um EEGEmbedding do zero em episódios e valida a cada eval_every épocas (e na última).
+    Retorna (modelo, histórico), com uma entrada do histórico por validação:
+    {"epoch", "train_loss", "train_acc", "val_loss", "val_acc", "val_ci95"}.
+    val_dataset: grupo de validação (ex: sujeitos tirados do treino com FeatureStore.subject_split). Com ele, as
+    validações, o early stopping e a melhor época usam só o val_dataset, e o test_dataset é avaliado uma vez no fim,
+    no modelo devolvido (chaves "test_loss", "test_acc", "test_ci95" na última entrada do histórico).
+    Sem ele, as validações são no test_dataset.
+    profile=True mede as etapas de cada época (entrada "profile" no histórico e stages.json em profile_dir);
+    trace=True também grava traces do Chrome do torch.profiler em profile_dir/traces.
+    profile_dir=None cria results/profiling/<data-hora>.
+    checkpoint_dir salva o last.pt a cada checkpoint_every épocas e o best.pth a cada melhora do monitor;
+    resume=True continua do last.pt de checkpoint_dir (mesma divisão treino/teste).
+    patience=N para após N validações sem melhora do monitor e devolve o modelo da melhor validação
+    (exige val_dataset: escolher a época pelo teste deixaria a acurácia de teste otimista).
+    execution escolhe o modo de execução (execution.py); o modelo devolvido e os checkpoints são sempre o EEGEmbedding em fp32.
+    embedding_dim, k_shot e n_query (o tamanho do episódio, o "batch" do treino) são os hiperparâmetros do sweep.py.
+    """
+    if patience is not None and val_dataset is None:
+        raise ValueError("Early stopping needs a val_dataset: selecting the epoch on the test split biases the test accuracy")
+    # Grupo acompanhado nas validações: o de validação, se houver, senão o de teste
+    monitored = test_dataset if val_dataset is None else val_dataset
+    split_name = "Test " if val_dataset is None else "Val  "
+    train_loader, val_loader = make_loaders(train_dataset, monitored, num_workers=num_workers, k_shot=k_shot,
+                                            n_query=n_query)
+    episode_size = config.EPISODE_N_WAY * (k_shot + n_query)
+
+    # Instrumentação opcional: sem profile/trace, o timer é o NULL_TIMER e o profiler um nullcontext
+    timer, profiler = NULL_TIMER, None
+    if profile or trace:
+        profile_dir = make_run_dir() if profile_dir is None else profile_dir
+        timer = StageTimer(device=device)
+    if trace:
+        profiler = make_profiler(profile_dir / "traces", device=device)
+
+    # O optimizer é o treinador da rede, ele calcula a matemática para ajustar os pesos
+    """
+    Foi usado o Adam porque ele adapta a velocidade de aprendizado automaticamente e
+    ele é bom para dados complexos e ruidosos.
+
+    Os parâmetros:
+        1. params: diz quais pesos ele tem permissão para mexer. Foi usado o
+            models.parameters() para entregar a lista de todos os pesos da rede.
+        2. lr(Learning Rate): é a taxa de aprendizado. 0.01(1e-3) é um valor padrão seguro.
+            Se for muito alto, a rede pula a resposta certa. Se for muito baixo,
+            ela demora uma eternidade para aprender.
+    """
+
+    # Inicializar o Modelo
+    model = EEGEmbedding(embedding_dim=embedding_dim).to(device)
+    # runner: o módulo que roda o forward (o próprio model, ou a versão compilada com os mesmos pesos)
+    execution = ExecutionMode.parse(execution)
+    runner = execution.prepare(model)
+
+    optimizer = optim.Adam(params=model.parameters(), lr=lr)
+    criterion = torch.nn.CrossEntropyLoss()
+
+    # Acompanha a melhor validação (e para o treino se patience não for None)
+    stopper = EarlyStopping(patience=patience, metric=monitor)
+    history = []
+    start_epoch = 0
+    stopped = False
+
+    checkpoint = load_checkpoint(checkpoint_dir) if resume and checkpoint_dir is not None else None
+    if checkpoint is not None:
+        # Retomar com outra divisão treino/teste misturaria os dois grupos
+        val_indices = None if val_dataset is None else val_dataset.indices
+        if not (np.array_equal(checkpoint["train_indices"], train_dataset.indices)
+                and np.array_equal(checkpoint["test_indices"], test_dataset.indices)
+                and np.array_equal(checkpoint.get("val_indices"), val_indices)):
+            raise ValueError("Checkpoint was trained on a different train/val/test split")
+        model.load_state_dict(checkpoint["model"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        stopper.load_state_dict(checkpoint["early_stopping"])
+        train_loader.sampler.load_state_dict(checkpoint["sampler"])
+        restore_rng_state(checkpoint["rng"])
+        history = checkpoint["history"]
+        start_epoch = checkpoint["epoch"]
+        stopped = checkpoint["stopped"]
+        if verbose:
+            print(f"Resuming from epoch {start_epoch} ({checkpoint_dir})")
+
+    with profiler if profiler is not None else nullcontext():
+        for epoch in range(start_epoch, num_epochs):
+            if stopped:
+                break
+            timer.start_epoch()
+            avg_train_loss, avg_train_acc = train_one_epoch(runner, train_loader, optimizer, criterion, device=device,
+                                                            timer=timer, profiler=profiler, execution=execution)
+            # Registro de tempo da época (None sem instrumentação). A validação fica de fora da medida
+            epoch_profile = timer.end_epoch(epoch + 1, len(train_loader) * episode_size)
+
+            # A cada 5 épocas, é testado o modelo nos dados que nunca viu (validação, ou o test set) e imprime o status
+            if (epoch + 1) % eval_every == 0 or epoch + 1 == num_epochs:
+                val_result = validate(runner, val_loader, monitored.labels, device=device, execution=execution)
+
+                #Médias de Validação
+                entry = {
+                    "epoch": epoch + 1,
+                    "train_loss": avg_train_loss,
+                    "train_acc": avg_train_acc,
+                    "val_loss": val_result["loss"],
+                    "val_acc": val_result["accuracy"],
+                    "val_ci95": val_result["ci95"],
+                }
+                if epoch_profile is not None:
+                    entry["profile"] = epoch_profile
+                history.append(entry)
+
+                if stopper.step(entry, model) and checkpoint_dir is not None:
+                    save_best_model(stopper.best_state, checkpoint_dir)
+                stopped = stopper.should_stop
+
+                if verbose:
+                    print(f"Epoch: {epoch+1}/{num_epochs}")
+                    print(f"   Train -> Loss: {avg_train_loss:.4f} | Acc: {avg_train_acc*100:.2f}%")
+                    print(f"   {split_name} -> Error (Loss): {val_result['loss']:.4f} | Acc: {val_result['accuracy']*100:.2f}% ± {val_result['ci95']*100:.2f} ({val_result['episodes']} episodes)")
+                    if epoch_profile is not None:
+                        print(timer.summary_line(epoch_profile))
+                    print("-" * 60)
+
+            # Checkpoint no fim da época (e sempre na última ou na parada antecipada)
+            if checkpoint_dir is not None and ((epoch + 1) % checkpoint_every == 0 or stopped or epoch + 1 == num_epochs):
+                save_checkpoint({
+                    "epoch": epoch + 1,
+                    "model": model.state_dict(),
+                    "optimizer": optimizer.state_dict(),
+                    "early_stopping": stopper.state_dict(),
+                    "sampler": train_loader.sampler.state_dict(),
+                    "rng": capture_rng_state(),
+                    "history": history,
+                    "stopped": stopped,
+                    "train_indices": train_dataset.indices,
+                    "test_indices": test_dataset.indices,
+                    "val_indices": None if val_dataset is None else val_dataset.indices,
+                }, checkpoint_dir)
+
+            if stopped and verbose:
+                print(f"Early stopping: no {monitor} improvement in {patience} validations "
+                      f"(best: epoch {stopper.best_epoch}, {monitor} {stopper.best:.4f})")
+
+    # Com early stopping, o modelo devolvido é o da melhor validação (e não o da última época)
+    if patience is not None and stopper.best_state is not None:
+        model.load_state_dict(stopper.best_state)
+
+    # Teste uma vez só, no modelo escolhido pela validação
+    if val_dataset is not None and history:
+        test_loader = make_loader(test_dataset, batch_size=256, shuffle=False, num_workers=num_workers)
+        test_result = validate(runner, test_loader, test_dataset.labels, device=device, execution=execution)
+        history[-1].update({"test_loss": test_result["loss"], "test_acc": test_result["accuracy"],
+                            "test_ci95": test_result["ci95"]})
+        if verbose:
+            print(f"Test -> Error (Loss): {test_result['loss']:.4f} | Acc: {test_result['accuracy']*100:.2f}% ± {test_result['ci95']*100:.2f} "
+                  f"(model from epoch {stopper.best_epoch if patience is not None else history[-1]['epoch']})")
+
+    if timer.enabled:
+        timer.save(profile_dir / "stages.json")
+        if verbose:
+            print(f"Profiling saved in {profile_dir}")
+
+    return model, history
+
+# Guard: com workers no DataLoader (spawn no Windows/macOS) os processos filhos reimportam este arquivo
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Few-shot training (prototypical network)")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--lr", type=float, default=0.0001)
+    parser.add_argument("--embedding-dim", type=int, default=config.EMBEDDING_DIM)
+    parser.add_argument("--profile", action="store_true", help="Per-stage timers, samples/s and peak memory per epoch")
+    parser.add_argument("--trace", action="store_true", help="Also export torch.profiler Chrome traces")
+    parser.add_argument("--checkpoint-dir", default=str(config.CHECKPOINT_DIR))
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint in --checkpoint-dir")
+    parser.add_argument("--patience", type=int, default=config.EARLY_STOP_PATIENCE,
+                        help="Validations without improvement on the validation subjects before stopping "
+                             "(0 disables early stopping)")
+    parser.add_argument("--execution", default=config.EXECUTION_MODE,
+                        help="fp32 or a '+' combination of bf16, channels_last and compile")
+    args = parser.parse_args()
+
+    print("Loading Full Dataset")
+    try:
+        # Dataset preguiçoso: as janelas ficam no Feature Store (mmap) e são lidas batch a batch pelos workers
+        full_dataset = EEGDataset()
+    except FileNotFoundError:
+        print("ERROR: .NPY FILE NOT FOUND. Run preprocessing.py first.")
+        exit()
+
+    # Código sem o Random Split para o estudo do Ablation Study
+    # (o estudo completo, com vários folds em paralelo, está no cross_validation.py)
+
+    # Definindo o ponto de corte 80/20
+    total_size = len(full_dataset)
+    train_size = int(0.8 * total_size)
+    test_size = total_size - train_size
+
+    # Fatiamento Sequencial (Slicing)
+    # Isso garante que os primeiros 80% fiquem no treino
+    # E os últimos 20% fiquem no teste
+    # train_indices, test_indices = np.arange(train_size), np.arange(train_size, total_size)
+
+    # --- Mudança aqui para o Ablation Study ---
+    # Comentar a linha acima e Descomentar as linhas abaixo
+    # Mesma divisão do random_split: uma permutação aleatória cortada em 80/20
+    permutation = torch.randperm(total_size).numpy()
+    train_indices, test_indices = permutation[:train_size], permutation[train_size:]
+
+    # Validação (early stopping e melhor época) com sujeitos tirados do treino: o teste só é avaliado no fim
+    train_indices, val_indices = full_dataset.store.subject_split(config.VAL_FRACTION, indices=train_indices)
+
+    # Ao retomar, a divisão vem do checkpoint (a permutação acima é nova a cada execução)
+    checkpoint = load_checkpoint(args.checkpoint_dir) if args.resume else None
+    if checkpoint is not None:
+        train_indices, test_indices = checkpoint["train_indices"], checkpoint["test_indices"]
+        val_indices = checkpoint.get("val_indices")
+    elif args.resume:
+        print(f"No checkpoint in {args.checkpoint_dir}. Starting from scratch")
+
+    train_dataset = EEGDataset(indices=train_indices)
+    val_dataset = EEGDataset(indices=val_indices) if val_indices is not None else None
+    test_dataset = EEGDataset(indices=test_indices)
+
+    print(f"Total samples: {total_size}")
+    print(f"Train samples: {len(train_dataset)}")
+    if val_dataset is not None:
+        print(f"Val samples:   {len(val_dataset)} ({len(np.unique(val_dataset.subjects))} subjects held out of train)")
+    print(f"Test samples:  {len(test_dataset)}")
+
+    print("Dataset Loaded. Starting Training Process")
+
+    model, history = train_model(train_dataset, test_dataset, num_epochs=args.epochs,
+                                 profile=args.profile or config.PROFILE_TRAINING, trace=args.trace,
+                                 checkpoint_dir=Path(args.checkpoint_dir), resume=args.resume,
+                                 patience=args.patience or None, execution=args.execution, lr=args.lr,
+                                 embedding_dim=args.embedding_dim, val_dataset=val_dataset)
+
+    print("Training Completed")
+
+    # salvar o cérebro treinado num arquivo
+    torch.save(model.state_dict(), 'results/saved_models/eeg_model.pth')
+    print("Model saved in results/models/eeg_model.pth")
+
+    # Protótipos de referência ao lado do modelo: o servidor não precisa passar o dataset inteiro pela rede ao iniciar
+    artifact = save_prototypes_for_model(model, 'results/saved_models/eeg_model.pth', device=device)
+    print(f"Prototypes saved in {artifact}")
@@ -12,27 +12,26 @@ A lógica será:
 def calc_euclidiean_distance(x1, x2):
     return torch.nn.functional.pairwise_distance(x1, x2, p=2)
 
+def calc_distance_matrix(embeddings, prototypes):
+    # Distância Euclidiana de cada embedding até cada protótipo, numa única chamada (cdist)
+    # embeddings: (Batch, 64), prototypes: (N_classes, 64) -> (Batch, N_classes)
+    # Sem o atalho por multiplicação de matrizes: o resultado é exato mesmo com o embedding colado no protótipo
+    return torch.cdist(embeddings, prototypes, p=2, compute_mode='donot_use_mm_for_euclid_dist')
+
+def get_prototype_sums(embeddings, targets, num_class):
+    # Soma dos embeddings e quantidade de amostras de cada classe, em uma passada (index_add)
+    # Separado do get_prototypes para poder acumular somas de vários batches/processos antes da média
+    sums = embeddings.new_zeros(num_class, embeddings.size(1)).index_add_(0, targets, embeddings)
+    counts = torch.bincount(targets, minlength=num_class).to(embeddings.dtype)
+    return sums, counts
+
+def prototypes_from_sums(sums, counts):
+    # Média de cada classe. Classe sem nenhuma amostra fica com o vetor de zeros (não quebra a distância)
+    return sums / counts.clamp(min=1).unsqueeze(1)
+
 def get_prototypes(embeddings, targets, num_class):
     # embeddings: Tensor(Batch, 64)
-    # targets: Tensor (Batch) com 0(normal) e 1(burnout). Gerando dois protótipos, um para cada situação
-    prototypes = [] # lista vazia dos prototypes
-
-    for i in range(num_class):
-        # 1. Criar uma máscara para pegar só quem é da classe i
-        mask = (targets == i)
-
-        # 2. Aplica a máscara nos embeddings
-        class_embeddings = embeddings[mask]
-        # proteção se não tiver ninguém da classe no batch
-        if class_embeddings.size(0) == 0:
-            # cria um vetor de zeros temporários só para não quebrar
-            proto = torch.zeros(embeddings.size(1)).to(embeddings.device)
-        else:
-            # 3. Calcular a média dos embeddings
-            proto = torch.mean(class_embeddings, 0)
-
-        prototypes.append(proto)
-
-    # Empilha tudo. Pois o prototype vai ter dois vetores, esta linha pega esses vetores e coloca um em cima do outro, criando um tensor único.
-    # Linha 0: Cérebro normal, Linha 1: Cérebro com burnout
-    return torch.stack(prototypes)
+    # targets: Tensor (Batch) com a classe de cada amostra (0 = normal, 1 = burnout, ... qualquer número de classes)
+    # Retorna um tensor (num_class, 64). Linha 0: Cérebro normal, Linha 1: Cérebro com burnout
+    sums, counts = get_prototype_sums(embeddings, targets, num_class)
+    return prototypes_from_sums(sums, counts)
@@ -5,14 +5,22 @@ matplotlib.use('Agg')
 import matplotlib.pylab as plt
 import io
 import base64
-import mne
 import os
+from functools import lru_cache
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 
 import config
 CHANNELS = config.CHANNELS
 SFREQ = config.SAMPLE_RATE
 
+@lru_cache(maxsize=1)
+def get_topomap_info():
+    # Info + montagem 10-20 montados uma vez só (o MNE só é importado quando o primeiro topomap é pedido)
+    import mne
+    info = mne.create_info(ch_names=CHANNELS, sfreq=SFREQ, ch_types='eeg')
+    montage = mne.channels.make_standard_montage('standard_1020')
+    info.set_montage(montage)
+    return info
 
 def generate_topomap_base64(patient_tensor):
     # Recebe o tensor de dados reais do paciente, calcula a energia por canal
@@ -51,10 +59,9 @@ def generate_topomap_base64(patient_tensor):
             # Fallback se o tensor não for espectograma
             channel_energy = np.sqrt(np.mean(data**2, axis=1))
         
-        # Configuração MNE
-        info = mne.create_info(ch_names=CHANNELS, sfreq=SFREQ, ch_types='eeg')
-        montage = mne.channels.make_standard_montage('standard_1020')
-        info.set_montage(montage)
+        # Configuração MNE (em cache)
+        import mne
+        info = get_topomap_info()
 
         plt.style.use('dark_background')
         fig, ax = plt.subplots(figsize=(5, 5), dpi=300)
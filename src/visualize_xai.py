@@ -9,6 +9,7 @@ import torch
 import numpy as np
 import random
 from model import EEGEmbedding
+from feature_store import open_feature_store
 from xai_utils import GradCAM, plot_explanation
 import matplotlib
 matplotlib.use('Agg')
@@ -20,10 +21,10 @@ print(f"Starting XAI Visualization on device: {device}")
 
 # 2. Carregar o Modelo Treinado
 # Instancia a arquitetura vazia (o esqueleto da rede)
-model = EEGEmbedding().to(device)
-
-# Carrega os "conhecimentos" (pesos) que a rede aprendeu durante o treino
-model.load_state_dict(torch.load('results/saved_models/eeg_model.pth', map_location=device))
+# Carrega os "conhecimentos" (pesos) que a rede aprendeu durante o treino (o tamanho do embedding vem deles)
+state_dict = torch.load('results/saved_models/eeg_model.pth', map_location=device)
+model = EEGEmbedding(embedding_dim=state_dict["fc1.weight"].shape[0]).to(device)
+model.load_state_dict(state_dict)
 
 # Coloca em modo de avaliação (desliga o aprendizado, agora é só prova)
 model.eval()
@@ -32,12 +33,8 @@ model.eval()
 # Precisamos das imagens dos cérebros para testar
 print("Loading data.")
 data_dir = os.path.join(project_root, 'data', 'processed')
-X = np.load(os.path.join(data_dir, 'X_stew.npy')) # As imagens (espectrogramas)
-Y = np.load(os.path.join(data_dir, 'Y_stew.npy')) # Os rótulos (0=Relaxado, 1=Burnout)
-
-# Transforma de Numpy (matemática comum) para Tensor (matemática de IA)
-X_tensor = torch.from_numpy(X).float().to(device)
-Y_tensor = torch.from_numpy(Y).long().to(device)
+store = open_feature_store(data_dir) # As imagens (espectrogramas), abertas com mmap
+Y = store.labels # Os rótulos (0=Relaxado, 1=Burnout)
 
 # 4. Selecionar um Paciente com Burnout
 # Queremos ver o que acontece na cabeça de alguém estressado (Label 1)
@@ -55,7 +52,8 @@ print(f"Patient found: ID {pacient_idx}")
 
 # Prepara a amostra: A rede espera um lote (Batch), então adicionamos uma dimensão extra
 # De (14, 33, 17) vira (1, 14, 33, 17)
-input_tensor = X_tensor[pacient_idx].unsqueeze(0)
+# Só a janela escolhida é lida do disco e transformada em Tensor
+input_tensor = torch.from_numpy(store[pacient_idx]).float().to(device).unsqueeze(0)
 
 # 5. Configurar o Grad-CAM (O "Detetive")
 # Aqui dizemos: "GradCAM, vigie a camada 'conv1' do modelo".
@@ -0,0 +1,101 @@
+"""
+Pool de processos de inferência com os pesos do modelo em memória compartilhada.
+Um BurnoutSystem num processo só não usa mais de um núcleo direito: os gráficos (pyplot) de requisições
+simultâneas são feitos um por vez (plot_lock). Aqui:
+    1- o processo principal carrega o BurnoutSystem uma vez (pesos, artefato dos protótipos, hashes)
+    2- os pesos do EEGEmbedding e os protótipos vão para a memória compartilhada (share_memory_)
+    3- N processos (spawn) recebem esses tensores sem copiar: cada um monta o próprio BurnoutSystem em cima deles
+       (load_shared) com o seu limite de threads do PyTorch
+    4- cada requisição vai para um worker livre e roda inteira lá (pré-processamento, forward, Grad-CAM, gráficos)
+O modelo existe uma vez só na memória; cada worker paga só o próprio interpretador, o PyTorch e os buffers.
+"""
+import asyncio
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import torch
+import config
+
+# BurnoutSystem do worker (um por processo, criado no init_worker)
+SYSTEM = None
+# Barreira da subida do pool (uma tarefa de aquecimento por worker, ver InferencePool.start)
+STARTUP_BARRIER = None
+# Tempo máximo esperando os outros workers chegarem na barreira (inclui os imports da src/ em cada processo)
+STARTUP_TIMEOUT = 120
+
+# Bibliotecas importadas uma vez só no forkserver e divididas (copy-on-write) por todos os workers.
+# Só pacotes instalados: o forkserver não enxerga o sys.path do processo principal (a src/ fica para o init_worker)
+PRELOAD_MODULES = ["torch", "numpy", "scipy.signal", "scipy.fft", "pandas", "sklearn.decomposition", "matplotlib", "cv2"]
+
+def init_worker(state_dict, prototypes, prototype_info, execution, threads, barrier):
+    global SYSTEM, STARTUP_BARRIER
+    from inference import BurnoutSystem
+
+    STARTUP_BARRIER = barrier
+    torch.set_num_threads(threads)
+    SYSTEM = BurnoutSystem(execution=execution, backend="eager")
+    SYSTEM.load_shared(state_dict, prototypes, prototype_info)
+
+def predict_file(filepath, plots=True):
+    # Roda dentro do worker. plots=False pula os gráficos (re-análise em lote, benchmarks)
+    if plots:
+        return SYSTEM.predict_patient(filepath)
+    input_tensor = SYSTEM.preprocess(filepath)
+    with torch.no_grad():
+        embeddings, distances = SYSTEM.backend(input_tensor)
+    return SYSTEM.build_result(input_tensor, embeddings, distances[0], plots=False)
+
+def worker_pid(_):
+    # Tarefa de aquecimento: cada worker segura a sua até todos chegarem, então nenhum pega duas
+    # e os N pids devolvidos são de N processos diferentes
+    STARTUP_BARRIER.wait(timeout=STARTUP_TIMEOUT)
+    return os.getpid()
+
+class InferencePool:
+    def __init__(self, system, workers=config.POOL_WORKERS, threads_per_worker=config.POOL_THREADS):
+        # system: BurnoutSystem já carregado (load_resources) no processo principal
+        if not system.is_ready:
+            raise RuntimeError("BurnoutSystem must be loaded before starting the pool")
+        self.system = system
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.executor = None
+        self.pids = []
+
+    def start(self):
+        # Move os pesos para a memória compartilhada (o modelo do processo principal passa a usar a mesma cópia)
+        state_dict = {name: tensor.detach().share_memory_() for name, tensor in self.system.model.state_dict().items()}
+        prototypes = self.system.prototypes.share_memory_()
+
+        # forkserver: um processo limpo (sem threads) importa o PyTorch e as outras bibliotecas uma vez e os workers
+        # nascem de um fork dele, dividindo essas páginas (com spawn, cada worker pagava ~400 MB só de imports)
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(PRELOAD_MODULES)
+        else:
+            context = multiprocessing.get_context("spawn")
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=context, initializer=init_worker,
+            initargs=(state_dict, prototypes, self.system.prototype_info, self.system.execution.name,
+                      self.threads_per_worker, context.Barrier(self.workers)))
+        # Sobe todos os workers agora (e não na primeira requisição): cada submit sem worker livre cria um processo,
+        # e cada worker responde o próprio pid
+        self.pids = sorted(set(self.executor.map(worker_pid, range(self.workers))))
+        print(f"Inference pool: {len(self.pids)} processes x {self.threads_per_worker} threads, shared weights")
+        return self
+
+    def submit(self, filepath, plots=True):
+        return self.executor.submit(predict_file, filepath, plots)
+
+    async def predict(self, filepath, plots=True):
+        # Versão para o event loop do servidor
+        return await asyncio.wrap_future(self.submit(filepath, plots))
+
+    def predict_many(self, filepaths, plots=False):
+        # Vários arquivos distribuídos entre os workers, resultados na ordem de filepaths
+        return list(self.executor.map(predict_file, filepaths, [plots] * len(filepaths)))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
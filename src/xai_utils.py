@@ -17,8 +17,17 @@ class GradCAM:
         self.activations = None
 
         # Ganchos (Hooks) para capturar os dados durante o fluxo
-        target_layer.register_forward_hook(self.save_activation)
-        target_layer.register_full_backward_hook(self.save_gradient)
+        # Guardados para o remove(): sem isso, cada GradCAM novo no mesmo modelo deixa mais dois ganchos pendurados
+        self.handles = [
+            target_layer.register_forward_hook(self.save_activation),
+            target_layer.register_full_backward_hook(self.save_gradient),
+        ]
+
+    def remove(self):
+        # Tira os ganchos da camada (o modelo volta a ser o que era antes do GradCAM)
+        for handle in self.handles:
+            handle.remove()
+        self.handles = []
 
     def save_activation(self, module, input, output):
         self.activations = output
@@ -31,7 +40,8 @@ class GradCAM:
         with torch.enable_grad():
             # O "Pulo do Gato": Força o tensor de entrada a rastrear gradientes
             # Isso constrói o grafo necessário para o backward hook funcionar
-            x.requires_grad_(True)
+            # (numa cópia rasa: o tensor de quem chamou não é alterado)
+            x = x.detach().requires_grad_(True)
 
             # 1. Forward Pass
             self.model.zero_grad()
@@ -0,0 +1,66 @@
+"""
+Paridade do filtro passa-banda (src/filters.py) com o raw.filter do MNE, que era o caminho original do preprocessing.
+Rodar da raiz do projeto: python -m pytest -q tests
+"""
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Diretório atual do arquivo test_filters.py
+curren_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Sobe um nível para chegar na raiz do projeto e entra na src
+project_root = os.path.abspath(os.path.join(curren_dir, '..'))
+sys.path.append(os.path.join(project_root, 'src'))
+
+mne = pytest.importorskip("mne")
+
+import config
+from filters import bandpass_filter, design_bandpass_fir
+
+SFREQ = config.SAMPLE_RATE
+# Coeficientes do FIR: mesma conta do MNE, só arredondamento
+DESIGN_TOLERANCE = 1e-12
+# Erro máximo relativo à amplitude do sinal filtrado pelo MNE (float64 nos dois lados)
+FLOAT64_TOLERANCE = 1e-10
+# Janelas em float32 (PREPROCESS_DTYPE padrão) contra o MNE em float64
+FLOAT32_TOLERANCE = 1e-5
+
+def emotiv_like(duration, seed=42):
+    # Offset DC (~4000 µV) + ruído, em float32 como sai do stew_reader
+    rng = np.random.default_rng(seed)
+    return (4000 + rng.standard_normal((len(config.CHANNELS), int(duration * SFREQ))) * 20).astype(np.float32)
+
+def mne_filter(data):
+    info = mne.create_info(ch_names=config.CHANNELS, sfreq=SFREQ, ch_types='eeg')
+    raw = mne.io.RawArray(data.astype(np.float64), info, verbose=False)
+    raw.filter(config.FILTER_LOW, config.FILTER_HIGH, verbose=False)
+    return raw.get_data()
+
+def relative_difference(reference, result):
+    return float(np.max(np.abs(reference - result)) / np.max(np.abs(reference)))
+
+def test_design_matches_mne():
+    h_mne = mne.filter.create_filter(None, SFREQ, config.FILTER_LOW, config.FILTER_HIGH, verbose=False)
+    h = design_bandpass_fir(float(SFREQ), float(config.FILTER_LOW), float(config.FILTER_HIGH))
+    assert h.shape == h_mne.shape
+    assert np.max(np.abs(h - h_mne)) < DESIGN_TOLERANCE
+
+# 3s: sinal mais curto que o filtro (o padding das bordas muda); 10s: upload curto; DURATION: gravação STEW inteira
+@pytest.mark.filterwarnings("ignore:filter_length .* is longer than the signal")
+@pytest.mark.parametrize("duration", [3, 10, config.DURATION])
+def test_bandpass_matches_mne_raw_filter(duration):
+    data = emotiv_like(duration)
+    reference = mne_filter(data)
+    result = bandpass_filter(data.astype(np.float64), SFREQ, config.FILTER_LOW, config.FILTER_HIGH)
+    assert result.shape == reference.shape
+    assert result.dtype == np.float64
+    assert relative_difference(reference, result) < FLOAT64_TOLERANCE
+
+def test_float32_bandpass_close_to_mne():
+    data = emotiv_like(config.DURATION)
+    result = bandpass_filter(data, SFREQ, config.FILTER_LOW, config.FILTER_HIGH)
+    assert result.dtype == np.float32
+    assert relative_difference(mne_filter(data), result) < FLOAT32_TOLERANCE
@@ -22,12 +22,23 @@ from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from src.inference import BurnoutSystem
+from src.batching import MicroBatcher
+from src.admission import BoundedExecutor, Overloaded
+from src.worker_pool import InferencePool
+from src import config
 
 
 burnout_system = BurnoutSystem()
+# Junta as janelas de requisições simultâneas em um forward só (batching.py). None = um forward por requisição
+batcher = None
+# Threads do trabalho de CPU + limite de requisições dentro do servidor (admission.py), criado no lifespan
+executor = None
+# Processos de inferência com os pesos compartilhados (worker_pool.py), só no SERVER_MODE = "processes"
+pool = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global batcher, executor, pool
     print("Starting Server and Load the AI resources")
     model_path = os.path.join(project_root, 'results', 'saved_models', 'eeg_model.pth')
     data_path = os.path.join(project_root, 'data', 'processed')
@@ -36,7 +47,28 @@ async def lifespan(app: FastAPI):
         print("Warning: The system started but failed to load model. API will answer but inference will fail.")
     else:
         print("System ready and loaded.")
+    if success and config.SERVER_MODE == "processes":
+        # Cada requisição roda inteira num worker: o limite de requisições em andamento acompanha os processos
+        pool = InferencePool(burnout_system, config.POOL_WORKERS, config.POOL_THREADS).start()
+        executor = BoundedExecutor(config.POOL_WORKERS, config.SERVER_QUEUE_DEPTH)
+    else:
+        executor = BoundedExecutor(config.SERVER_WORKERS, config.SERVER_QUEUE_DEPTH)
+        # No int8 o embedding depende do lote (quantização dinâmica): cada requisição faz o próprio forward
+        if success and config.BATCHER_ENABLED and not burnout_system.backend.batch_invariant:
+            print(f"Micro-batching off: the {burnout_system.backend.name} backend is not batch invariant")
+        elif success and config.BATCHER_ENABLED:
+            batcher = MicroBatcher(burnout_system.embed_windows)
+            await batcher.start()
+            print(f"Micro-batching on (up to {batcher.max_windows} windows / {config.BATCHER_MAX_WAIT_MS} ms)")
     yield
+    if batcher is not None:
+        await batcher.stop()
+        batcher = None
+    if pool is not None:
+        pool.shutdown()
+        pool = None
+    executor.shutdown()
+    executor = None
 # Inicializa o app
 # Ponto principal da interação para criar toda a API do projeto
 app = FastAPI(title="NeuroCompute API", lifespan=lifespan)
@@ -88,16 +120,34 @@ async def predict(file : UploadFile = File(...)): # File(...) significa obrigat
         raise HTTPException(status_code=500, detail="AI System is not ready.")
     if not file.filename.endswith(".txt"):
         raise HTTPException(status_code=400, detail="Only .txt is allowed.")
-    
-    temp_filename = f"temp_{file.filename}"
-    try:
-        suffix = ".txt"
-        # Copia o fluxo de bits do upload para um arquivo físico no disco
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            temp_filename = tmp.name
 
-        result = burnout_system.predict_patient(temp_filename)
+    # Servidor cheio: recusa na hora, com a sugestão de quando tentar de novo
+    try:
+        with executor.admit():
+            return await analyze(file)
+    except Overloaded as e:
+        raise HTTPException(status_code=config.SERVER_OVERLOAD_STATUS, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
+
+def save_upload(upload):
+    # Copia o fluxo de bits do upload para um arquivo físico no disco
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".txt") as tmp:
+        shutil.copyfileobj(upload, tmp)
+        return tmp.name
+
+async def analyze(file):
+    temp_filename = None
+    try:
+        # Todo o trabalho de CPU roda nas threads do executor: o event loop continua recebendo as outras requisições
+        temp_filename = await executor.run(save_upload, file.file)
+        if pool is not None:
+            result = await pool.predict(temp_filename)
+        elif batcher is not None:
+            input_tensor = await executor.run(burnout_system.preprocess, temp_filename)
+            embeddings = await batcher.submit(input_tensor)
+            result = await executor.run(burnout_system.build_result, input_tensor, embeddings)
+        else:
+            result = await executor.run(burnout_system.predict_patient, temp_filename)
 
         return {
             "filename": file.filename,
@@ -111,7 +161,7 @@ async def predict(file : UploadFile = File(...)): # File(...) significa obrigat
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        if 'temp_filename' in locals() and os.path.exists(temp_filename):
+        if temp_filename is not None and os.path.exists(temp_filename):
             try:
                 os.remove(temp_filename)
             except: